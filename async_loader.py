@@ -0,0 +1,194 @@
+from __future__ import annotations
+import asyncio
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from functools import partial
+
+from lazy_imports import lazy_module
+
+from database_manager import batch_statements
+
+pd = lazy_module('pandas')
+
+
+async def in_thread(func, *args):
+    """
+    runs a blocking call in the loop's default executor; asyncio.to_thread
+    without its python 3.9 requirement.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+
+
+async def create_mysql_pool(dbName: str, size: int = 4):
+    """
+    opens an aiomysql connection pool with the same credentials as DBConnect.
+    aiomysql is only needed for the async loading path, so it is imported here.
+    """
+    import aiomysql
+
+    return await aiomysql.create_pool(host='localhost', user='root', password=os.getenv('mysqlPass'),
+                                      db=dbName, minsize=1, maxsize=size, autocommit=False,
+                                      charset='utf8mb4')
+
+
+class _SqliteCursor:
+    def __init__(self, conn: sqlite3.Connection):
+        self._cur = conn.cursor()
+
+    async def execute(self, query: str, args=()):
+        await in_thread(self._cur.execute, query, args)
+
+    async def executemany(self, query: str, rows: list):
+        await in_thread(self._cur.executemany, query, rows)
+
+    async def fetchall(self):
+        return self._cur.fetchall()
+
+    async def close(self):
+        self._cur.close()
+
+
+class _SqliteConnection:
+    paramstyle = '?'
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+    @asynccontextmanager
+    async def cursor(self):
+        cur = _SqliteCursor(self._conn)
+        try:
+            yield cur
+        finally:
+            await cur.close()
+
+    async def commit(self):
+        await in_thread(self._conn.commit)
+
+    async def rollback(self):
+        await in_thread(self._conn.rollback)
+
+    def close(self):
+        self._conn.close()
+
+
+class SqlitePool:
+    """
+    a local stand-in for an aiomysql pool backed by a sqlite file.
+    it exposes the subset of the aiomysql interface the writer uses
+    (acquire, cursor, execute(many), commit, rollback) and runs the
+    blocking sqlite calls in worker threads.
+    """
+    def __init__(self, path: str, size: int = 4):
+        self._free = asyncio.Queue()
+        self._conns = [_SqliteConnection(path) for _ in range(size)]
+        for conn in self._conns:
+            self._free.put_nowait(conn)
+
+    @asynccontextmanager
+    async def acquire(self):
+        conn = await self._free.get()
+        try:
+            yield conn
+        finally:
+            self._free.put_nowait(conn)
+
+    def close(self):
+        for conn in self._conns:
+            conn.close()
+
+    async def wait_closed(self):
+        return None
+
+
+class AsyncTweetWriter:
+    """
+    keeps several batched inserts in flight over a connection pool.
+
+    each batch (a tweet frame plus its hashtag and mention rows) is
+    written in its own transaction on one pooled connection: it is
+    committed as a whole or rolled back as a whole. At most
+    max_in_flight batches are being written at any time; submit waits
+    for a free slot, which backpressures the caller. The batch's rollup
+    rows are added in the same transaction.
+    """
+    def __init__(self, pool, max_in_flight: int = 4, table_name: str = 'TweetInformation'):
+        self.pool = pool
+        self.table_name = table_name
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks = set()
+        self._errors = []
+        self.batches = 0
+        self.rows = 0
+
+    async def write(self, df: pd.DataFrame, hashtags: pd.DataFrame = None, mentions: pd.DataFrame = None,
+                    originals: pd.DataFrame = None, users: pd.DataFrame = None) -> int:
+        """
+        writes one batch in a single transaction.
+        originals are the OriginalTweets rows of a compacted batch and
+        users the user dimension rows, upserted into Users.
+        returns the number of tweet rows written.
+        """
+        async with self.pool.acquire() as conn:
+            mark = getattr(conn, 'paramstyle', '%s')
+            statements = batch_statements(mark, df, hashtags, mentions, originals, users, self.table_name)
+            try:
+                async with conn.cursor() as cur:
+                    for query, rows in statements:
+                        await cur.executemany(query, rows)
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+        self.batches += 1
+        self.rows += len(df)
+        return len(df)
+
+    async def _write_slot(self, batch: tuple, done=None):
+        try:
+            await self.write(*batch)
+            if done is not None:
+                done()
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._slots.release()
+
+    async def submit(self, df: pd.DataFrame, hashtags: pd.DataFrame = None, mentions: pd.DataFrame = None,
+                     originals: pd.DataFrame = None, users: pd.DataFrame = None, done=None):
+        """
+        schedules one batch, waiting first until fewer than max_in_flight are running.
+        done, if given, is called once the batch is committed.
+        raises the error of an earlier failed batch, if any.
+        """
+        if self._errors:
+            raise self._errors[0]
+        await self._slots.acquire()
+        task = asyncio.create_task(self._write_slot((df, hashtags, mentions, originals, users), done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """
+        waits for all submitted batches.
+        raises the first batch error, if any.
+        """
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+        if self._errors:
+            raise self._errors[0]
+
+
+async def load_batches(pool, batches, max_in_flight: int = 4, table_name: str = 'TweetInformation') -> int:
+    """
+    writes an iterable of (tweets, hashtags, mentions[, originals, users]) batches concurrently.
+    returns the number of tweet rows written.
+    """
+    writer = AsyncTweetWriter(pool, max_in_flight=max_in_flight, table_name=table_name)
+    for batch in batches:
+        await writer.submit(*batch)
+    await writer.drain()
+
+    return writer.rows
@@ -0,0 +1,326 @@
+"""
+extracts a directory (or glob) of tweet dumps in parallel, one file per task.
+
+    python batch_ingest.py ../data/hourly/ --out processed/ --processes 8
+    python batch_ingest.py '../data/2022-08-*.json.gz' --out processed/ --sentiment-backend lexicon
+
+files are handed to the worker pool largest first, so one big file does
+not start last and keep the pool waiting. Each file is extracted in
+chunks and written partitioned by the day its tweets were created:
+
+    processed/tweets/day=2022-08-17/<file>-<path hash>.csv
+    processed/hashtags/day=2022-08-17/<file>-<path hash>.csv
+    processed/mentions/day=2022-08-17/<file>-<path hash>.csv
+
+a file's outputs are written under temporary names and renamed once the
+whole file is done, then the file is appended to processed/manifest.jsonl.
+A rerun skips every file in the manifest whose size and mtime are
+unchanged, so after a crash only unfinished files are extracted again.
+A changed file replaces the outputs of its previous version.
+
+with --dedup-index, tweets already extracted from another file, or by an
+earlier run, are dropped when read (see dedup_index). Each file is its
+own run of the index, committed once the file is in the manifest, so a
+file whose entry was never written keeps no fingerprints and is
+extracted whole again. The run is kept in the manifest so re-extracting
+a changed file first forgets the tweets of its previous version.
+
+with --shards, each plain (uncompressed) dump is itself split into line
+aligned byte ranges that are parsed and extracted by that many processes
+(see sharded_reader), for a few files too large for one process each.
+Compressed dumps are still read from the start.
+
+    python batch_ingest.py ../data/huge.json --out processed/ --processes 1 --shards 8
+"""
+from __future__ import annotations
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
+
+DUMP_SUFFIXES = ('.json', '.jsonl', '.json.gz', '.json.bz2', '.json.zst', '.jsonl.gz', '.jsonl.bz2', '.jsonl.zst')
+
+MANIFEST = 'manifest.jsonl'
+
+TABLES = ['tweets', 'hashtags', 'mentions']
+
+_PART = '.part' # suffix of outputs of a file still being extracted
+
+
+def discover(source: str) -> list:
+    """
+    a function that lists the tweet dumps of a directory (recursively) or glob pattern.
+    returns (path, size) pairs, largest first.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(root, name) for root, _, names in os.walk(source) for name in names]
+        paths = [p for p in paths if p.endswith(DUMP_SUFFIXES)]
+    else:
+        paths = [p for p in glob.glob(source, recursive=True) if os.path.isfile(p)]
+    files = [(os.path.abspath(p), os.path.getsize(p)) for p in paths]
+
+    return sorted(files, key=lambda x: (-x[1], x[0]))
+
+
+def _stem(json_file: str) -> str:
+    # hourly dumps of different days often share a file name
+    name = os.path.basename(json_file)
+    for suffix in sorted(DUMP_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    digest = hashlib.blake2b(os.path.abspath(json_file).encode(), digest_size=4).hexdigest()
+    return f"{name}-{digest}"
+
+
+def _fingerprint(json_file: str) -> dict:
+    stat = os.stat(json_file)
+    return {'file': os.path.abspath(json_file), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def read_manifest(out_dir: str) -> dict:
+    """
+    a function that loads the manifest of an output directory.
+    returns {file path: manifest entry} of the files already extracted.
+    """
+    path = os.path.join(out_dir, MANIFEST)
+    done = {}
+    if os.path.exists(path):
+        with open(path) as fd:
+            for line in fd:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # a line cut short by a crash
+                done[entry['file']] = entry
+    return done
+
+
+def _append_manifest(out_dir: str, entry: dict):
+    with open(os.path.join(out_dir, MANIFEST), 'a') as fd:
+        fd.write(json.dumps(entry) + '\n')
+        fd.flush()
+        os.fsync(fd.fileno())
+
+
+def _tweet_days(created_at) -> pd.Series:
+    created = pd.to_datetime(pd.Series(created_at, dtype=object), format='%a %b %d %H:%M:%S %z %Y',
+                             utc=True, errors='coerce')
+    return created.dt.strftime('%Y-%m-%d').fillna('unknown')
+
+
+def process_file(json_file: str, out_dir: str, chunk_size: int = 10000, filters=None,
+                 sentiment_backend: str = 'textblob', sentiment_cache: str = None, dedup_index: str = None,
+                 shards: int = 0) -> dict:
+    """
+    a function that extracts one dump into day partitioned csv files.
+    it runs in a worker process; outputs only get their final names once
+    every chunk of the file was written. With shards, a plain dump is
+    read and extracted by that many processes, one byte range each.
+    returns the manifest entry of the file.
+    """
+    from dedup_index import open_index
+
+    if shards and dedup_index is not None:
+        raise ValueError("shards and dedup_index cannot be combined: the dedup index checks tweets in file order")
+    dedup = None
+    if dedup_index is not None:
+        dedup = open_index(dedup_index)
+        dedup.begin()
+        dropped = dedup.dropped
+    try:
+        entry = _process_file(json_file, out_dir, chunk_size, filters, sentiment_backend, sentiment_cache, dedup,
+                              shards)
+    except BaseException:
+        if dedup is not None:
+            dedup.abandon()
+        raise
+    if dedup is not None:
+        # committed by ingest once the entry is in the manifest
+        entry.update(duplicates=dedup.dropped - dropped, dedup_run=dedup.detach())
+    return entry
+
+
+def extract_frames(tweets: list, filters=None, sentiment_backend: str = 'textblob',
+                   sentiment_cache: str = None) -> dict:
+    """
+    a function that extracts one chunk of tweets into the tweet, hashtag
+    and mention frames, each with the day its tweet was created.
+    returns {table: frame}.
+    """
+    from extract_dataframe import TweetDfExtractor
+
+    extractor = TweetDfExtractor(tweets, filters, sentiment_backend, sentiment_cache)
+    df = extractor.get_tweet_df()
+    days = _tweet_days(df['created_at'])
+    day_of = dict(zip(df['tweet_id'], days))
+    frames = {'tweets': df.assign(day=days.values), 'hashtags': extractor.find_hashtag_rows(),
+              'mentions': extractor.find_mention_rows()}
+    for table in ['hashtags', 'mentions']:
+        frames[table] = frames[table].assign(day=frames[table]['tweet_id'].map(day_of).fillna('unknown'))
+    return frames
+
+
+def _process_file(json_file: str, out_dir: str, chunk_size: int, filters, sentiment_backend: str,
+                  sentiment_cache: str, dedup, shards: int = 0) -> dict:
+    from extract_dataframe import iter_json_chunks
+    from sharded_reader import iter_parallel, can_shard
+
+    start = time.perf_counter()
+    entry = _fingerprint(json_file)
+    stem = _stem(json_file)
+    written = {} # (table, day) -> temporary path
+    counts = {table: 0 for table in TABLES}
+    for stale in glob.glob(os.path.join(glob.escape(out_dir), '*', 'day=*', glob.escape(stem) + '.csv' + _PART)):
+        os.remove(stale) # left by an attempt that crashed
+
+    if shards and can_shard(json_file):
+        # the worker of each byte range parses and extracts it, only the frames come back
+        extract = functools.partial(extract_frames, filters=filters, sentiment_backend=sentiment_backend,
+                                    sentiment_cache=sentiment_cache)
+        chunks = iter_parallel(json_file, shards, extract, chunk_size)
+    else:
+        # filtered while reading, so the dedup index only records tweets that are extracted
+        chunks = (extract_frames(tweets, None, sentiment_backend, sentiment_cache)
+                  for tweets in iter_json_chunks(json_file, chunk_size, dedup, filters))
+
+    for frames in chunks:
+        for table, frame in frames.items():
+            counts[table] += len(frame)
+            for day, part in frame.groupby('day', sort=True):
+                key = (table, day)
+                if key not in written:
+                    directory = os.path.join(out_dir, table, f"day={day}")
+                    os.makedirs(directory, exist_ok=True)
+                    written[key] = os.path.join(directory, stem + '.csv' + _PART)
+                    part.drop(columns='day').to_csv(written[key], index=False)
+                else:
+                    part.drop(columns='day').to_csv(written[key], index=False, mode='a', header=False)
+
+    outputs = []
+    for path in written.values():
+        final = path[:-len(_PART)]
+        os.replace(path, final)
+        outputs.append(os.path.relpath(final, out_dir))
+
+    entry.update(tweets=counts['tweets'], hashtags=counts['hashtags'], mentions=counts['mentions'],
+                 days=sorted({day for _, day in written}), outputs=sorted(outputs),
+                 seconds=round(time.perf_counter() - start, 3))
+    return entry
+
+
+def _record(out_dir: str, dedup_index: str, entry: dict):
+    # the file's fingerprints only count once its manifest entry is written,
+    # otherwise a rerun would drop every tweet of the file as a duplicate
+    run = entry.get('dedup_run') if dedup_index is not None else None
+    if run is not None:
+        from dedup_index import open_index
+        index = open_index(dedup_index)
+    try:
+        _append_manifest(out_dir, entry)
+    except BaseException:
+        if run is not None:
+            index.forget(run)
+        raise
+    if run is not None:
+        index.commit(run)
+
+
+def ingest(source: str, out_dir: str, processes: int = None, chunk_size: int = 10000, filters=None,
+           sentiment_backend: str = 'textblob', sentiment_cache: str = None, dedup_index: str = None,
+           shards: int = 0) -> pd.DataFrame:
+    """
+    a function that extracts every dump matched by source that the
+    manifest of out_dir does not list yet, largest first over a pool of
+    processes, recording each file in the manifest as soon as it is done.
+    A file that fails does not stop the others; once every file was
+    tried, the first error is raised. shards is passed to process_file.
+    returns a dataframe of the manifest entries written by this run.
+    """
+    if shards and dedup_index is not None:
+        raise ValueError("shards and dedup_index cannot be combined: the dedup index checks tweets in file order")
+    os.makedirs(out_dir, exist_ok=True)
+    done = read_manifest(out_dir)
+    todo = []
+    for path, _ in discover(source):
+        entry = done.get(path)
+        fingerprint = _fingerprint(path)
+        if entry is None or (entry['size'], entry['mtime']) != (fingerprint['size'], fingerprint['mtime']):
+            todo.append(path)
+            for output in (entry or {}).get('outputs', []):
+                if os.path.exists(os.path.join(out_dir, output)):
+                    os.remove(os.path.join(out_dir, output))
+            if dedup_index is not None and (entry or {}).get('dedup_run') is not None:
+                from dedup_index import open_index
+                open_index(dedup_index).forget(entry['dedup_run'])
+
+    results, errors = [], []
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        for path in todo:
+            try:
+                entry = process_file(path, out_dir, chunk_size, filters, sentiment_backend, sentiment_cache,
+                                     dedup_index, shards)
+            except Exception as e:
+                errors.append(e)
+                continue
+            _record(out_dir, dedup_index, entry)
+            results.append(entry)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            # submitted in size order, so the largest files start first
+            futures = [pool.submit(process_file, path, out_dir, chunk_size, filters, sentiment_backend,
+                                   sentiment_cache, dedup_index, shards) for path in todo]
+            # a failed file must not keep its finished siblings out of the manifest
+            for future in as_completed(futures):
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                _record(out_dir, dedup_index, entry)
+                results.append(entry)
+
+    if errors:
+        raise errors[0]
+    return pd.DataFrame(results, columns=['file', 'size', 'mtime', 'tweets', 'hashtags', 'mentions',
+                                          'days', 'outputs', 'seconds', 'duplicates'])
+
+
+def main(argv=None) -> int:
+    from extract_dataframe import TweetFilter
+
+    parser = argparse.ArgumentParser(description='extract a directory or glob of tweet dumps in parallel')
+    parser.add_argument('source', help='directory of dumps or a glob pattern (quote it)')
+    parser.add_argument('--out', default='processed', help='output directory, also holds the manifest')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: cpu count)')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--langs', nargs='*', default=None, help='keep only these languages')
+    parser.add_argument('--sentiment-backend', choices=['textblob', 'lexicon'], default='textblob')
+    parser.add_argument('--sentiment-cache', default=None, help='sqlite file of scores kept between runs')
+    parser.add_argument('--dedup-index', default=None,
+                        help='sqlite file of the tweets already extracted; they are skipped when read again')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='extract each plain dump as this many byte ranges in parallel (0 = read it whole)')
+    args = parser.parse_args(argv)
+
+    filters = TweetFilter(langs=args.langs) if args.langs else None
+    results = ingest(args.source, args.out, args.processes, args.chunk_size, filters,
+                     args.sentiment_backend, args.sentiment_cache, args.dedup_index, args.shards)
+    skipped = len(read_manifest(args.out)) - len(results)
+    print(f"{len(results)} files extracted ({results['tweets'].sum()} tweets), "
+          f"{skipped} already in {os.path.join(args.out, MANIFEST)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
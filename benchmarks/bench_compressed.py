@@ -0,0 +1,96 @@
+"""
+read throughput of compressed tweet dumps against the uncompressed file.
+
+    python -m benchmarks.bench_compressed -n 100000 --out compressed.json
+
+each format is read once with decompression in a background thread and
+once inline, both as raw lines and through read_json.
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from extract_dataframe import read_json
+from compressed_input import open_tweet_file
+from synthetic_tweets import SyntheticTweets
+from benchmarks.run_benchmarks import _best_of, _git_revision
+
+
+def _compress(json_file: str) -> dict:
+    files = {'plain': json_file}
+    with open(json_file, 'rb') as src, gzip.open(json_file + '.gz', 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    files['gzip'] = json_file + '.gz'
+    with open(json_file, 'rb') as src, bz2.open(json_file + '.bz2', 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    files['bz2'] = json_file + '.bz2'
+    try:
+        import zstandard
+        with open(json_file, 'rb') as src, open(json_file + '.zst', 'wb') as dst:
+            zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+        files['zstd'] = json_file + '.zst'
+    except ImportError:
+        print('zstandard not installed, skipping zstd')
+    return files
+
+
+def _count_lines(path: str, threaded: bool) -> int:
+    with open_tweet_file(path, threaded=threaded) as fd:
+        return sum(1 for _ in fd)
+
+
+def run(n: int = 100000, repeat: int = 3, seed: int = 42, workdir: str = None) -> dict:
+    """
+    returns the result document with seconds and MB/s of uncompressed
+    data per format and mode.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='tweet-bench-')
+    json_file = os.path.join(workdir, f'tweets-{n}-{seed}.json')
+    if not os.path.exists(json_file):
+        SyntheticTweets(seed=seed).write_jsonl(json_file, n)
+    size_mb = os.path.getsize(json_file) / 2 ** 20
+
+    results = {}
+    for kind, path in _compress(json_file).items():
+        for threaded in (False, True):
+            mode = 'threaded' if threaded else 'inline'
+            seconds, _ = _best_of(lambda: _count_lines(path, threaded), repeat)
+            results[f'lines.{kind}.{mode}'] = {'seconds': round(seconds, 6), 'mb_per_s': round(size_mb / seconds, 1),
+                                               'file_mb': round(os.path.getsize(path) / 2 ** 20, 2)}
+        seconds, _ = _best_of(lambda: read_json(path), repeat)
+        results[f'read_json.{kind}'] = {'seconds': round(seconds, 6), 'rows': n,
+                                        'rows_per_s': round(n / seconds, 1)}
+
+    return {'revision': _git_revision(), 'params': {'n': n, 'repeat': repeat, 'seed': seed,
+            'uncompressed_mb': round(size_mb, 2)}, 'results': results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='compare reading compressed and plain tweet dumps')
+    parser.add_argument('-n', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=None)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    doc = run(n=args.n, repeat=args.repeat, seed=args.seed, workdir=args.workdir)
+    for name, res in doc['results'].items():
+        rate = f"{res['mb_per_s']:10.1f} MB/s" if 'mb_per_s' in res else f"{res['rows_per_s']:10.1f} rows/s"
+        print(f"{name:28s} {res['seconds'] * 1000:12.2f} ms {rate}")
+
+    if args.out:
+        with open(args.out, 'w') as fd:
+            json.dump(doc, fd, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+load test of the dashboard's data functions (dashboard_data) on a sqlite stand-in.
+
+    python -m benchmarks.bench_dashboard -n 100000 --sessions 50 --renders 5 --out dashboard.json
+    python -m benchmarks.bench_dashboard -n 100000 --sessions 50 --skip wordCloud
+
+the database is seeded with n synthetic tweets through the loader (tweet,
+hashtag and rollup tables). Then `sessions` simulated analysts render the
+dashboard `renders` times each, concurrently. Streamlit reruns the whole
+script on every interaction, so one render makes every widget's queries,
+with the widget state (hashtags, filters, page, ranking size) picked at
+random from what the previous render showed.
+
+DBConnect is pointed at the stand-in for the run; its connections count
+the queries and the bytes of the rows they return (utf-8 length of text,
+8 bytes per number). Reported per widget and per render: p50/p95/p99
+latency, queries and bytes.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+import database_manager
+from database_manager import TWEET_COLUMNS, ROLLUPS, insert_tweet_batch, insert_entity_table, update_rollups
+from dashboard_data import (DEFAULT_VIEW_COLUMNS, hashtag_choices, filter_choices, table_page, cloud_text,
+                            author_ranking, language_share, timeline_languages, sentiment_timeline)
+from extract_dataframe import iter_json_chunks, TweetDfExtractor
+from synthetic_tweets import SyntheticTweets
+from benchmarks.run_benchmarks import _git_revision
+
+_current = threading.local() # .stats of the widget being rendered by this thread
+
+
+class _Stats:
+    def __init__(self):
+        self.queries = 0
+        self.bytes = 0
+
+
+def _row_bytes(rows) -> int:
+    n = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, str):
+                n += len(value.encode('utf-8', 'surrogatepass'))
+            elif isinstance(value, bytes):
+                n += len(value)
+            elif value is not None:
+                n += 8
+    return n
+
+
+class CountingCursor:
+    """
+    a sqlite cursor that takes mysql '%s' markers, like the production
+    driver, and counts queries and fetched bytes into the thread's stats.
+    """
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=()):
+        stats = getattr(_current, 'stats', None)
+        if stats is not None:
+            stats.queries += 1
+        return self._cursor.execute(query.replace('%s', '?'), params)
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        stats = getattr(_current, 'stats', None)
+        if stats is not None:
+            stats.bytes += _row_bytes(rows)
+        return rows
+
+    def close(self):
+        self._cursor.close()
+
+
+class CountingConnection:
+    """
+    a sqlite connection handing out CountingCursors.
+    """
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path)
+
+    def cursor(self):
+        return CountingCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+@contextmanager
+def standin(db_file: str):
+    """
+    points database_manager.DBConnect at the sqlite file for the duration.
+    """
+    original = database_manager.DBConnect
+
+    def connect(dbName=None):
+        conn = CountingConnection(db_file)
+        return conn, conn.cursor()
+
+    database_manager.DBConnect = connect
+    try:
+        yield
+    finally:
+        database_manager.DBConnect = original
+
+
+def seed_database(db_file: str, n: int, seed: int = 42, chunk_size: int = 10000) -> int:
+    """
+    creates the dashboard's tables in a sqlite file and loads n synthetic
+    tweets into them with the loader.
+    returns the number of tweets loaded.
+    """
+    fd, json_file = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    SyntheticTweets(seed=seed).write_jsonl(json_file, n)
+    conn = sqlite3.connect(db_file)
+    conn.execute(f"CREATE TABLE TweetInformation (id INTEGER PRIMARY KEY, {', '.join(TWEET_COLUMNS)})")
+    conn.execute('CREATE INDEX idx_tweet_id ON TweetInformation (tweet_id)')
+    conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position, PRIMARY KEY (tweet_id, position))')
+    conn.execute('CREATE INDEX idx_hashtag ON TweetHashtags (hashtag, tweet_id)')
+    conn.execute('CREATE TABLE TweetMentions (tweet_id, screen_name, position, PRIMARY KEY (tweet_id, position))')
+    for table, (keys, counters) in ROLLUPS.items():
+        conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+    loaded = 0
+    try:
+        for tweets in iter_json_chunks(json_file, chunk_size):
+            extractor = TweetDfExtractor(tweets, sentiment_backend='lexicon')
+            df, hashtags = extractor.get_tweet_df(), extractor.find_hashtag_rows()
+            loaded += insert_tweet_batch(conn, df)
+            insert_entity_table(None, hashtags, 'TweetHashtags', 'hashtag', conn=conn)
+            update_rollups(conn, df, hashtags)
+    finally:
+        conn.close()
+        os.remove(json_file)
+    return loaded
+
+
+# the widgets of dashboard_manager in page order, each calling the same
+# dashboard_data function; a widget's state comes from what the session
+# saw on the previous render.
+
+def _paged_table(session: dict, key: str, filters=None, hashtags=None):
+    view = (repr(filters), repr(hashtags))
+    if session.get(f"{key}_view") != view:
+        session[f"{key}_view"] = view
+        session[f"{key}_cursor"] = 0
+    size = session['rng'].choice([25, 50, 100, 250])
+    df, _, _ = table_page(session[f"{key}_cursor"], size, session['columns'], filters=filters, hashtags=hashtags)
+    # the analyst pages forward now and then
+    if len(df) == size and session['rng'].random() < 0.3:
+        session[f"{key}_cursor"] = int(df['id'].iloc[-1])
+
+
+def selectHashTag(session: dict):
+    tags = hashtag_choices()
+    rng = session['rng']
+    chosen = rng.sample(tags, k=min(len(tags), rng.choice([0, 1, 2])))
+    if chosen:
+        _paged_table(session, 'hashtags', hashtags=chosen)
+
+
+def selectLocAndAuth(session: dict):
+    rng = session['rng']
+    locations, languages = (list(x) for x in filter_choices())
+    filters = {'location': rng.sample(locations, k=min(len(locations), rng.choice([0, 0, 1]))),
+               'language': rng.sample(languages, k=min(len(languages), rng.choice([0, 1])))}
+    _paged_table(session, 'tweets', filters=filters)
+
+
+def wordCloud(session: dict):
+    cloud_text()
+
+
+def stBarChart(session: dict):
+    author_ranking(session['rng'].randint(0, 50))
+
+
+def langPie(session: dict):
+    language_share()
+
+
+def sentimentTimeline(session: dict):
+    languages = timeline_languages()
+    chosen = session['rng'].sample(languages, k=min(len(languages), session['rng'].choice([0, 1])))
+    sentiment_timeline(chosen)
+
+
+WIDGETS = {'selectHashTag': selectHashTag, 'selectLocAndAuth': selectLocAndAuth, 'wordCloud': wordCloud,
+           'stBarChart': stBarChart, 'langPie': langPie, 'sentimentTimeline': sentimentTimeline}
+
+
+def _session(index: int, renders: int, widgets: list, seed: int) -> list:
+    session = {'rng': random.Random(seed * 7919 + index), 'columns': DEFAULT_VIEW_COLUMNS}
+    records = []
+    for render in range(renders):
+        for name in widgets:
+            _current.stats = _Stats()
+            start = time.perf_counter()
+            WIDGETS[name](session)
+            seconds = time.perf_counter() - start
+            records.append({'session': index, 'render': render, 'widget': name, 'seconds': seconds,
+                            'queries': _current.stats.queries, 'bytes': _current.stats.bytes})
+        _current.stats = None
+    return records
+
+
+def _summary(frame: pd.DataFrame, renders: int) -> dict:
+    ms = frame['seconds'].to_numpy() * 1000
+    return {'p50_ms': round(float(np.percentile(ms, 50)), 3), 'p95_ms': round(float(np.percentile(ms, 95)), 3),
+            'p99_ms': round(float(np.percentile(ms, 99)), 3),
+            'queries_per_render': round(frame['queries'].sum() / renders, 2),
+            'bytes_per_render': int(frame['bytes'].sum() / renders)}
+
+
+def run(n: int = 10000, sessions: int = 10, renders: int = 3, seed: int = 42, widgets: list = None,
+        db_file: str = None) -> dict:
+    """
+    seeds the stand-in (unless db_file already exists) and runs the
+    sessions concurrently.
+    returns the result document with the latency, query and byte
+    figures per widget and for whole renders.
+    """
+    widgets = list(widgets or WIDGETS)
+    if db_file is None:
+        db_file = os.path.join(tempfile.mkdtemp(prefix='dashboard-bench-'), f'tweets-{n}-{seed}.db')
+    if not os.path.exists(db_file):
+        with redirect_stdout(io.StringIO()):
+            seed_database(db_file, n, seed)
+
+    start = time.perf_counter()
+    with standin(db_file), redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(_session, i, renders, widgets, seed) for i in range(sessions)]
+        records = [record for future in futures for record in future.result()]
+    wall = time.perf_counter() - start
+
+    df = pd.DataFrame(records)
+    total = renders * sessions
+    results = {name: _summary(df[df['widget'] == name], total) for name in widgets}
+    per_render = df.groupby(['session', 'render'], as_index=False)[['seconds', 'queries', 'bytes']].sum()
+    results['render'] = _summary(per_render, total)
+    results['render']['renders_per_s'] = round(total / wall, 2)
+
+    return {'revision': _git_revision(), 'created': time.time(),
+            'params': {'n': n, 'sessions': sessions, 'renders': renders, 'seed': seed, 'widgets': widgets},
+            'results': results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='load test the dashboard data functions on a sqlite stand-in')
+    parser.add_argument('-n', type=int, default=10000, help='synthetic tweets to seed')
+    parser.add_argument('--sessions', type=int, default=10, help='concurrent simulated analysts')
+    parser.add_argument('--renders', type=int, default=3, help='renders per session')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip', nargs='*', default=[], choices=list(WIDGETS), help='widgets to leave out')
+    parser.add_argument('--db', default=None, help='sqlite file to reuse between runs (seeded when missing)')
+    parser.add_argument('--out', default=None, help='write results json here')
+    args = parser.parse_args(argv)
+
+    widgets = [name for name in WIDGETS if name not in args.skip]
+    doc = run(n=args.n, sessions=args.sessions, renders=args.renders, seed=args.seed, widgets=widgets,
+              db_file=args.db)
+    print(f"{'':20s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s} {'queries':>8s} {'bytes':>12s}")
+    for name, res in doc['results'].items():
+        print(f"{name:20s} {res['p50_ms']:10.2f} {res['p95_ms']:10.2f} {res['p99_ms']:10.2f} "
+              f"{res['queries_per_render']:8.2f} {res['bytes_per_render']:12d}")
+    print(f"{doc['results']['render']['renders_per_s']} renders/s")
+
+    if args.out:
+        with open(args.out, 'w') as fd:
+            json.dump(doc, fd, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+import cost of our modules, measured with python -X importtime.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time extract_dataframe cli --out import_time.json
+
+each module is imported in a fresh interpreter; the report lists its
+cumulative import time and the heaviest modules it pulled in.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODULES = ['cli', 'extract_dataframe', 'clean_tweets_dataframe', 'database_manager', 'pipeline_runner',
+           'lexicon_sentiment']
+
+_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def import_profile(module: str) -> dict:
+    """
+    imports module in a fresh interpreter with -X importtime.
+    returns {imported module: cumulative microseconds} for every module it loaded.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    profile = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            profile[match.group(4)] = int(match.group(2))
+    return profile
+
+
+def run(modules: list = None, repeat: int = 3, top: int = 5) -> dict:
+    """
+    returns, per module, the best cumulative import time over repeat runs
+    and the heaviest top-level third party imports of the last run.
+    """
+    results = {}
+    for module in modules or MODULES:
+        best, profile = None, {}
+        for _ in range(repeat):
+            profile = import_profile(module)
+            us = profile.get(module, 0)
+            best = us if best is None else min(best, us)
+        heavy = sorted(((name, us) for name, us in profile.items() if name != module and '.' not in name),
+                       key=lambda x: -x[1])[:top]
+        results[module] = {'cumulative_ms': round(best / 1000, 2), 'modules_loaded': len(profile),
+                           'heaviest': [{'module': name, 'ms': round(us / 1000, 2)} for name, us in heavy]}
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='measure module import time')
+    parser.add_argument('modules', nargs='*', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    results = run(args.modules or None, args.repeat)
+    for module, res in results.items():
+        heavy = ', '.join(f"{x['module']} {x['ms']}ms" for x in res['heaviest'])
+        print(f"{module:26s} {res['cumulative_ms']:9.2f} ms  {res['modules_loaded']:4d} modules  ({heavy})")
+
+    if args.out:
+        with open(args.out, 'w') as fd:
+            json.dump(results, fd, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+timed benchmarks of the extract, clean and load steps on a synthetic dump.
+
+    python -m benchmarks.run_benchmarks -n 10000 --out results.json
+    python -m benchmarks.run_benchmarks -n 10000 --compare results.json
+
+each benchmark is run `repeat` times and the best time is kept. Results
+are stored as json together with the generator parameters and the git
+revision, and --compare exits non-zero when a benchmark got slower than
+the stored result by more than the threshold.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from extract_dataframe import read_json, TweetDfExtractor, TweetFilter
+from clean_tweets_dataframe import Clean_Tweets
+from database_manager import (TWEET_COLUMNS, ROLLUPS, insert_tweet_batch, insert_entity_table, update_rollups,
+                              top_authors)
+from sentiment_cache import SentimentCache
+from synthetic_tweets import SyntheticTweets, DEFAULT_LANGS, _parse_langs
+
+FIND_METHODS = ['find_created_time', 'find_source', 'find_full_text', 'find_screen_name', 'find_lang',
+                'find_retweet_count', 'find_hashtags', 'find_friends_count', 'find_statuses_count',
+                'find_followers_count', 'find_mentions', 'find_tweet_id', 'find_hashtag_rows',
+                'find_mention_rows', 'is_sensitive', 'find_location', 'find_favourite_count']
+
+CLEAN_STEPS = ['drop_unwanted_column', 'drop_duplicate', 'convert_to_datetime',
+               'convert_to_numbers', 'remove_non_english_tweets']
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _best_of(func, repeat: int, setup=None) -> tuple:
+    """
+    runs func repeat times, calling setup (untimed) before each run.
+    returns the best time and the last result.
+    """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(arg) if setup else func()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _sqlite_standin(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS TweetInformation ({', '.join(TWEET_COLUMNS)})")
+    conn.execute('CREATE TABLE IF NOT EXISTS TweetHashtags (tweet_id, hashtag, position)')
+    conn.execute('CREATE TABLE IF NOT EXISTS TweetMentions (tweet_id, screen_name, position)')
+    for table, (keys, counters) in ROLLUPS.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(keys + counters)}, "
+                     f"PRIMARY KEY ({', '.join(keys)}))")
+    conn.commit()
+    return conn
+
+
+def run(n: int = 10000, repeat: int = 3, seed: int = 42, retweet_ratio: float = 0.6, langs: dict = None,
+        only: list = None, workdir: str = None) -> dict:
+    """
+    generates the synthetic dump and times every step.
+    only limits the run to benchmarks whose name contains one of the given strings.
+    returns the result document.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='tweet-bench-')
+    json_file = os.path.join(workdir, f'tweets-{n}-{seed}.json')
+    generator = SyntheticTweets(seed=seed, retweet_ratio=retweet_ratio, langs=langs)
+    if not os.path.exists(json_file):
+        generator.write_jsonl(json_file, n)
+
+    results = {}
+
+    def selected(name):
+        return not only or any(x in name for x in only)
+
+    def bench(name, func, rows, setup=None):
+        if not selected(name):
+            return None
+        seconds, result = _best_of(func, repeat, setup)
+        results[name] = {'seconds': round(seconds, 6), 'rows': rows,
+                         'rows_per_s': round(rows / seconds, 1) if seconds else None}
+        return result
+
+    _, tweets = read_json(json_file)
+    bench('read_json', lambda: read_json(json_file), n)
+
+    extractor = TweetDfExtractor(tweets)
+    for name in FIND_METHODS:
+        bench(f'extract.{name}', getattr(extractor, name), n)
+    clean_text, _ = extractor.find_full_text()
+    bench('extract.find_sentiments', lambda: extractor.find_sentiments(clean_text), n)
+    if selected('extract.find_sentiments.lexicon'):
+        lexicon_extractor = TweetDfExtractor(tweets, sentiment_backend='lexicon')
+        lexicon_extractor.find_sentiments(clean_text[:1]) # load the lexicon outside the timing
+        bench('extract.find_sentiments.lexicon', lambda: lexicon_extractor.find_sentiments(clean_text), n)
+    if selected('extract.find_sentiments.cached'):
+        cache = SentimentCache(os.path.join(workdir, 'sentiment_cache.sqlite'))
+        cached_extractor = TweetDfExtractor(tweets, sentiment_cache=cache)
+        cached_extractor.find_sentiments(clean_text) # a re-run over the same tweets, every text is a hit
+        bench('extract.find_sentiments.cached', lambda: cached_extractor.find_sentiments(clean_text), n)
+        cache.close()
+    # a fresh extractor per run, get_tweet_df caches its columns
+    bench('extract.get_tweet_df', lambda: TweetDfExtractor(tweets).get_tweet_df(), n)
+    counts = ['created_at', 'retweet_count', 'followers_count', 'friends_count']
+    bench('extract.get_tweet_df.counts', lambda: TweetDfExtractor(tweets).get_tweet_df(columns=counts), n)
+    bench('extract.get_compact_df', lambda: TweetDfExtractor(tweets).get_compact_df(), n)
+    bench('extract.get_user_df', lambda: TweetDfExtractor(tweets).get_user_df(), n)
+    english = TweetFilter(langs={'en'}, start='2020-12-31')
+    bench('extract.get_tweet_df.pushdown', lambda: TweetDfExtractor(tweets, english).get_tweet_df(), n)
+
+    with redirect_stdout(io.StringIO()):
+        df = extractor.get_tweet_df()
+        cleaner = Clean_Tweets(df)
+    staged = df
+    for step in CLEAN_STEPS:
+        source = staged
+        bench(f'clean.{step}', lambda frame: getattr(cleaner, step)(frame), len(source),
+              setup=lambda: source.copy())
+        with redirect_stdout(io.StringIO()):
+            staged = getattr(cleaner, step)(source.copy())
+
+    hashtags = extractor.find_hashtag_rows()
+    db_file = os.path.join(workdir, 'bench.db')
+
+    def fresh_db():
+        if os.path.exists(db_file):
+            os.remove(db_file)
+        return _sqlite_standin(db_file)
+
+    def insert(conn):
+        insert_tweet_batch(conn, staged)
+        insert_entity_table(None, hashtags, 'TweetHashtags', 'hashtag', conn=conn)
+
+    def load(conn):
+        insert(conn)
+        conn.close()
+
+    bench('load.sqlite', load, len(staged), setup=fresh_db)
+
+    def load_rollups(conn):
+        update_rollups(conn, staged, hashtags)
+        conn.close()
+
+    bench('rollups.update', load_rollups, len(staged), setup=fresh_db)
+
+    # a ranking chart, from the raw rows and from the rollup the loader keeps
+    if selected('query.top_authors'):
+        conn = fresh_db()
+        insert(conn)
+        update_rollups(conn, staged, hashtags)
+        bench('query.top_authors.raw', lambda: conn.execute(
+            "SELECT screen_name, COUNT(*) AS n FROM TweetInformation GROUP BY 1 ORDER BY n DESC LIMIT 50").fetchall(), n)
+        bench('query.top_authors.rollup', lambda: top_authors(None, 50, conn=conn), n)
+        conn.close()
+
+    return {'revision': _git_revision(), 'python': platform.python_version(), 'created': time.time(),
+            'params': {'n': n, 'repeat': repeat, 'seed': seed, 'retweet_ratio': retweet_ratio,
+                       'langs': langs or DEFAULT_LANGS},
+            'results': results}
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """
+    returns (name, baseline seconds, current seconds, ratio) for every
+    benchmark that got slower than the baseline by more than threshold.
+    """
+    regressions = []
+    for name, res in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or not base['seconds']:
+            continue
+        ratio = res['seconds'] / base['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((name, base['seconds'], res['seconds'], round(ratio, 2)))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark the tweet extract/clean/load steps')
+    parser.add_argument('-n', type=int, default=10000, help='number of synthetic tweets (1k to 10M)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--retweet-ratio', type=float, default=0.6)
+    parser.add_argument('--langs', type=_parse_langs, default=None, help='e.g. en=0.6,de=0.3,am=0.1')
+    parser.add_argument('--only', nargs='*', default=None, help='run only benchmarks containing these names')
+    parser.add_argument('--workdir', default=None, help='where to keep the generated dump between runs')
+    parser.add_argument('--out', default=None, help='write results json here')
+    parser.add_argument('--compare', default=None, help='baseline results json to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown before failing')
+    args = parser.parse_args(argv)
+
+    doc = run(n=args.n, repeat=args.repeat, seed=args.seed, retweet_ratio=args.retweet_ratio,
+              langs=args.langs, only=args.only, workdir=args.workdir)
+    for name, res in doc['results'].items():
+        print(f"{name:40s} {res['seconds'] * 1000:12.2f} ms {res['rows_per_s'] or 0:14.1f} rows/s")
+
+    if args.out:
+        with open(args.out, 'w') as fd:
+            json.dump(doc, fd, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fd:
+            baseline = json.load(fd)
+        regressions = compare(doc, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before:.4f}s -> {after:.4f}s ({ratio}x)")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
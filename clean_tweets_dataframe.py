@@ -1,5 +1,8 @@
-import pandas as pd
+from __future__ import annotations
 import re
+from lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
 class Clean_Tweets:
     """
     The PEP8 Standard AMAZING!!!
@@ -29,13 +32,15 @@ class Clean_Tweets:
         print('Duplicate rows successfully removed')
         
         return df
-    def convert_to_datetime(self, df:pd.DataFrame)->pd.DataFrame:
+    def convert_to_datetime(self, df:pd.DataFrame, start='2020-12-31')->pd.DataFrame:
         """
-        convert column to datetime
+        convert column to datetime and drop tweets created before start
+        (None keeps every date)
         """
         df['created_at'] = pd.to_datetime(df['created_at'])
         
-        df = df[df['created_at'] >= '2020-12-31' ]
+        if start is not None:
+            df = df[df['created_at'] >= start ]
 
         print('Strings successfully converted to datetime object')
         
@@ -47,23 +52,24 @@ class Clean_Tweets:
         favorite_count etc to numbers
         """
         
-        df['polarity'] = pd.to_numeric(df['polarity'])
-        df['favourites_count'] = pd.to_numeric(df['favourites_count'])
-        df['subjectivity'] = pd.to_numeric(df['subjectivity'])
-        df['retweet_count'] = pd.to_numeric(df['retweet_count'])
-        df['friends_count'] = pd.to_numeric(df['friends_count'])
-        df['followers_count'] = pd.to_numeric(df['followers_count'])
+        # the profile counts are absent from tweet frames whose users were moved to the user dimension
+        for column in ['polarity', 'favourites_count', 'subjectivity', 'retweet_count', 'friends_count',
+                       'followers_count']:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column])
        
         print('Strings successfully converted to numeric object')
         
         return df
     
-    def remove_non_english_tweets(self, df:pd.DataFrame)->pd.DataFrame:
+    def remove_non_english_tweets(self, df:pd.DataFrame, langs=('en',))->pd.DataFrame:
         """
-        remove non english tweets from lang
+        remove non english tweets from lang, or those of any language
+        outside langs (None keeps every language)
         """
         
-        df = df[df['language']=='en']
+        if langs is not None:
+            df = df[df['language'].isin(list(langs))]
 
         print('Non-English languages succesfully removed')
         
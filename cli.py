@@ -0,0 +1,220 @@
+"""
+command line entry point for the extract, clean and load steps.
+
+    python cli.py extract ../data/Economic_Twitter_Data.json --out processed_tweet_data.csv
+    python cli.py extract ../data/Economic_Twitter_Data.json --memory-budget 512MB --out tweets.parquet
+    python cli.py clean processed_tweet_data.csv --out fintech.csv
+    python cli.py load fintech.csv --db tweets
+    python cli.py load tweets.csv --originals tweets_originals.csv --db tweets
+    python cli.py run ../data/Economic_Twitter_Data.json --db tweets
+    python cli.py rebuild-rollups --db tweets --start 2022-08-01 --end 2022-09-01
+    python cli.py sketch ../data/Economic_Twitter_Data.json --processes 4 --out tweets.sketch
+    python cli.py ingest ../data/hourly/ --out processed --processes 8
+    python cli.py sentiment-cache warm ../data/Economic_Twitter_Data.json --cache sentiment.sqlite
+    python cli.py dedup-index stats --index seen.sqlite
+
+only argparse is imported up front; pandas, textblob and the database
+drivers are imported by the command that needs them, so --help and
+short-lived worker invocations start fast.
+"""
+import argparse
+import os
+import sys
+
+
+def extract(args):
+    from extract_dataframe import read_json, TweetDfExtractor, TweetFilter, TWEET_FACT_COLUMNS
+
+    filters = None
+    if args.langs or args.start or args.end:
+        filters = TweetFilter(langs=args.langs or None, start=args.start, end=args.end)
+    if args.memory_budget:
+        from memory_budget import extract_within_budget, write_result
+
+        if args.compact_retweets or args.user_dimension:
+            sys.exit('--compact-retweets and --user-dimension cannot be combined with --memory-budget')
+        result = extract_within_budget(args.json_file, args.memory_budget, filters=filters, columns=args.columns,
+                                       sentiment_backend=args.sentiment_backend,
+                                       sentiment_cache=args.sentiment_cache)
+        print(f"{write_result(result, args.out)} tweets written to {args.out}")
+        return
+    _, tweet_list = read_json(args.json_file)
+    extractor = TweetDfExtractor(tweet_list, filters, args.sentiment_backend, args.sentiment_cache)
+    if args.user_dimension:
+        users_out = os.path.splitext(args.out)[0] + '_users.csv'
+        users = extractor.get_user_df()
+        users.to_csv(users_out, index=False)
+        print(f"{len(users)} users written to {users_out}")
+        args.columns = args.columns or TWEET_FACT_COLUMNS
+    if args.compact_retweets:
+        df, originals = extractor.get_compact_df(columns=args.columns)
+        originals_out = os.path.splitext(args.out)[0] + '_originals.csv'
+        originals.to_csv(originals_out, index=False)
+        print(f"{len(originals)} retweeted tweets written to {originals_out}")
+    else:
+        df = extractor.get_tweet_df(columns=args.columns)
+    df.to_csv(args.out, index=False)
+    print(f"{len(df)} tweets written to {args.out}")
+
+
+def clean(args):
+    import pandas as pd
+    from clean_tweets_dataframe import Clean_Tweets
+
+    if args.memory_budget:
+        from memory_budget import clean_within_budget, write_result
+
+        result = clean_within_budget(args.csv_file, args.memory_budget)
+        print(f"{write_result(result, args.out)} tweets written to {args.out}")
+        return
+    df = pd.read_csv(args.csv_file)
+    cleaner = Clean_Tweets(df)
+    df = cleaner.drop_unwanted_column(df)
+    df = cleaner.drop_duplicate(df)
+    df = cleaner.convert_to_datetime(df)
+    df = cleaner.convert_to_numbers(df)
+    df = cleaner.remove_non_english_tweets(df)
+    df.to_csv(args.out, index=False)
+    print(f"{len(df)} tweets written to {args.out}")
+
+
+def load(args):
+    import pandas as pd
+    from database_manager import (DBConnect, load_batch, insert_user_batch, insert_original_batch,
+                                  explode_entity_column)
+    from extract_dataframe import ID_COLUMNS
+
+    # a column of ids with gaps would otherwise be read as float and rounded
+    read_csv = lambda path: pd.read_csv(path, dtype={name: 'Int64' for name in ID_COLUMNS})
+    df = read_csv(args.csv_file)
+    conn, cur = DBConnect(args.db)
+    if args.users:
+        print(f"{insert_user_batch(conn, read_csv(args.users))} users upserted into {args.db}.Users")
+    if args.originals:
+        # stored before the retweets that reference them
+        print(f"{insert_original_batch(conn, read_csv(args.originals))} retweeted tweets loaded into "
+              f"{args.db}.OriginalTweets")
+    n = 0
+    for start in range(0, len(df), args.batch_size):
+        batch = df.iloc[start:start + args.batch_size]
+        # the entity rows feed TweetHashtags/TweetMentions and the hashtag rollup
+        hashtags = mentions = None
+        if 'tweet_id' in batch.columns:
+            if 'hashtags' in batch.columns:
+                hashtags = explode_entity_column(batch, 'hashtags', 'text')
+            if 'user_mentions' in batch.columns:
+                mentions = explode_entity_column(batch, 'user_mentions', 'screen_name')
+        n += load_batch(conn, batch, hashtags, mentions, table_name=args.table)
+    cur.close()
+    conn.close()
+    print(f"{n} tweets loaded into {args.db}.{args.table}")
+
+
+def rebuild_rollups(args):
+    from database_manager import rebuild_rollups as rebuild
+
+    rebuild(args.db, args.start, args.end)
+    print(f"rollups of {args.db} rebuilt")
+
+
+def sketch(args):
+    from sketches import main as sketch_main
+
+    return sketch_main(args.sketch_args)
+
+
+def ingest(args):
+    from batch_ingest import main as ingest_main
+
+    return ingest_main(args.ingest_args)
+
+
+def run(args):
+    from pipeline_runner import main as pipeline_main
+
+    return pipeline_main(args.pipeline_args)
+
+
+def sentiment_cache(args):
+    from sentiment_cache import main as cache_main
+
+    return cache_main(args.cache_args)
+
+
+def dedup_index(args):
+    from dedup_index import main as dedup_main
+
+    return dedup_main(args.dedup_args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='twitter data extract/clean/load')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('extract', help='json dump -> csv of extracted columns')
+    p.add_argument('json_file')
+    p.add_argument('--out', default='processed_tweet_data.csv')
+    p.add_argument('--columns', nargs='*', default=None, help='only build these columns')
+    p.add_argument('--langs', nargs='*', default=None, help='keep only these languages')
+    p.add_argument('--start', default=None, help='keep tweets created on or after this date')
+    p.add_argument('--end', default=None, help='keep tweets created before this date')
+    p.add_argument('--sentiment-backend', choices=['textblob', 'lexicon'], default='textblob')
+    p.add_argument('--sentiment-cache', default=None, help='sqlite file of scores kept between runs')
+    p.add_argument('--memory-budget', default=None,
+                   help='e.g. 512MB; extract in chunks, spilling to disk beyond it (.parquet/.arrow/.csv out)')
+    p.add_argument('--compact-retweets', action='store_true',
+                   help='write retweets without text and their originals once to <out>_originals.csv')
+    p.add_argument('--user-dimension', action='store_true',
+                   help='write author profiles once per user to <out>_users.csv, tweets keep user_id')
+    p.set_defaults(func=extract)
+
+    p = sub.add_parser('clean', help='extracted csv -> cleaned csv')
+    p.add_argument('csv_file')
+    p.add_argument('--out', default='fintech.csv')
+    p.add_argument('--memory-budget', default=None, help='e.g. 512MB; clean in chunks, spilling to disk beyond it')
+    p.set_defaults(func=clean)
+
+    p = sub.add_parser('load', help='cleaned csv -> mysql table')
+    p.add_argument('csv_file')
+    p.add_argument('--db', default='tweets')
+    p.add_argument('--table', default='TweetInformation')
+    p.add_argument('--batch-size', type=int, default=5000)
+    p.add_argument('--users', default=None, help='user dimension csv written by extract --user-dimension')
+    p.add_argument('--originals', default=None,
+                   help='retweeted tweets csv written by extract --compact-retweets')
+    p.set_defaults(func=load)
+
+    p = sub.add_parser('rebuild-rollups', help='recompute the rollup tables from the raw tables')
+    p.add_argument('--db', default='tweets')
+    p.add_argument('--start', default=None, help='first day to rebuild, YYYY-MM-DD')
+    p.add_argument('--end', default=None, help='day after the last day to rebuild')
+    p.set_defaults(func=rebuild_rollups)
+
+    p = sub.add_parser('sketch', help='distinct counts, top values and quantiles from mergeable sketches',
+                       add_help=False)
+    p.add_argument('sketch_args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=sketch)
+
+    p = sub.add_parser('ingest', help='directory or glob of dumps -> day partitioned csv, in parallel',
+                       add_help=False)
+    p.add_argument('ingest_args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=ingest)
+
+    p = sub.add_parser('run', help='streaming extract/clean/load, see pipeline_runner.py --help', add_help=False)
+    p.add_argument('pipeline_args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=run)
+
+    p = sub.add_parser('sentiment-cache', help='warm, export or inspect the sentiment cache', add_help=False)
+    p.add_argument('cache_args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=sentiment_cache)
+
+    p = sub.add_parser('dedup-index', help='inspect or seed the index of tweets already ingested', add_help=False)
+    p.add_argument('dedup_args', nargs=argparse.REMAINDER)
+    p.set_defaults(func=dedup_index)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import bz2
+import gzip
+import io
+import queue
+import threading
+
+READ_SIZE = 2 ** 20 # bytes handed from the decompression thread per step
+
+_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+
+_EXTENSIONS = {'.gz': 'gzip', '.gzip': 'gzip', '.bz2': 'bz2', '.zst': 'zstd', '.zstd': 'zstd'}
+
+
+def detect_compression(json_file: str) -> str:
+    """
+    a function that tells how a tweet dump is compressed, from its magic
+    bytes, falling back to the file extension.
+    returns 'gzip', 'bz2', 'zstd' or None for plain files.
+    """
+    with open(json_file, 'rb') as fd:
+        head = fd.read(4)
+    for magic, kind in _MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    for ext, kind in _EXTENSIONS.items():
+        if json_file.endswith(ext):
+            return kind
+    return None
+
+
+def open_decompressed(json_file: str, compression: str = None):
+    """
+    a function that opens a tweet dump as a binary stream of decompressed bytes.
+    zstd needs the optional zstandard package.
+    """
+    compression = compression or detect_compression(json_file)
+    if compression is None:
+        return open(json_file, 'rb')
+    if compression == 'gzip':
+        return gzip.open(json_file, 'rb')
+    if compression == 'bz2':
+        return bz2.open(json_file, 'rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("reading .zst tweet dumps needs the zstandard package: pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(json_file, 'rb'), closefd=True)
+    raise ValueError(f"unknown compression: {compression}")
+
+
+class ThreadedReader(io.RawIOBase):
+    """
+    a read only stream that decompresses in a background thread.
+
+    the thread reads READ_SIZE blocks from the decompressing stream into a
+    bounded queue while the caller decodes json from the previous blocks.
+    gzip, bz2 and zstd release the GIL while inflating, so decompression and
+    decoding really overlap. The queue bounds memory to max_blocks blocks.
+    """
+    def __init__(self, raw, max_blocks: int = 8):
+        self._raw = raw
+        self._queue = queue.Queue(maxsize=max_blocks)
+        self._buffer = b''
+        self._eof = False
+        self._error = None
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._fill, name='decompress', daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        try:
+            while not self._closing.is_set():
+                block = self._raw.read(READ_SIZE)
+                self._put(block)
+                if not block:
+                    return
+        except Exception as e:
+            self._error = e
+            self._put(b'')
+
+    def _put(self, block: bytes):
+        while not self._closing.is_set():
+            try:
+                self._queue.put(block, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._buffer and not self._eof:
+            self._buffer = self._queue.get()
+            if not self._buffer:
+                self._eof = True
+                if self._error is not None:
+                    raise self._error
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._closing.set()
+            self._thread.join()
+            self._raw.close()
+        super().close()
+
+
+def open_tweet_file(json_file: str, threaded: bool = None):
+    """
+    a function that opens a plain or compressed (.gz, .bz2, .zst) tweet dump
+    as a buffered binary stream whose lines are the json tweets.
+    compressed files are decompressed in a separate thread unless threaded is False.
+    """
+    compression = detect_compression(json_file)
+    raw = open_decompressed(json_file, compression)
+    if threaded is None:
+        threaded = compression is not None
+    if not threaded:
+        return raw if compression is None else io.BufferedReader(raw, READ_SIZE)
+
+    return io.BufferedReader(ThreadedReader(raw), READ_SIZE)
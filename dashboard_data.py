@@ -0,0 +1,97 @@
+"""
+the data behind the dashboard, one function per widget, without any
+streamlit. dashboard_manager renders what these return and
+benchmarks/bench_dashboard.py load tests them, so both always make the
+same queries.
+"""
+from database_manager import (db_execute_fetch, top_hashtags, fetch_page, count_estimate, distinct_values,
+                              top_authors, language_counts, hourly_sentiment)
+
+DB_NAME = 'tweets'
+
+# columns shown until the user picks others; the text columns are the
+# bulk of a row, so they are only fetched once chosen
+DEFAULT_VIEW_COLUMNS = ['created_at', 'screen_name', 'language', 'polarity', 'subjectivity',
+                        'retweet_count', 'location']
+
+
+def load_data(dbName: str = DB_NAME):
+    """
+    a function that reads the whole TweetInformation table.
+    """
+    query = "select * from TweetInformation"
+    return db_execute_fetch(query, dbName=dbName, rdf=True)
+
+
+def hashtag_choices(dbName: str = DB_NAME, limit: int = 500) -> list:
+    """
+    a function that returns the most used hashtags, offered in the hashtag picker.
+    """
+    return list(top_hashtags(dbName=dbName, limit=limit)['hashtag'])
+
+
+def filter_choices(dbName: str = DB_NAME) -> tuple:
+    """
+    a function that returns the locations and languages offered as tweet filters.
+    """
+    return (distinct_values(dbName=dbName, column='location'),
+            distinct_values(dbName=dbName, column='language'))
+
+
+def table_page(after_id: int, limit: int, columns: list, filters: dict = None, hashtags: list = None,
+               dbName: str = DB_NAME) -> tuple:
+    """
+    a function that reads one page of a tweet view, starting after the
+    row id after_id, and the number of rows in the view.
+    returns the page, the row count and whether the count is exact.
+    """
+    df = fetch_page(dbName=dbName, after_id=after_id, limit=limit, columns=columns,
+                    filters=filters, hashtags=hashtags)
+    total, exact = count_estimate(dbName=dbName, filters=filters, hashtags=hashtags)
+    return df, total, exact
+
+
+def cloud_text(dbName: str = DB_NAME) -> str:
+    """
+    a function that returns the lowercased clean text of every tweet, the word cloud's input.
+    """
+    df = load_data(dbName)
+    cleanText = ''
+    for text in df['clean_text']:
+        tokens = str(text).lower().split()
+
+        cleanText += " ".join(tokens) + " "
+    return cleanText
+
+
+def author_ranking(num: int, dbName: str = DB_NAME):
+    """
+    a function that returns the num authors with the most tweets.
+    """
+    dfCount = top_authors(dbName=dbName, limit=num).rename(columns={'tweet_count': 'Tweet_count'})
+    dfCount["screen_name"] = dfCount["screen_name"].astype(str)
+    return dfCount
+
+
+def language_share(dbName: str = DB_NAME):
+    """
+    a function that returns the number of tweets per language.
+    """
+    dfLangCount = language_counts(dbName=dbName).rename(columns={'tweet_count': 'Tweet_count'})
+    dfLangCount["language"] = dfLangCount["language"].astype(str)
+    dfLangCount.loc[dfLangCount['Tweet_count'] < 10, 'lang'] = 'Other languages'
+    return dfLangCount
+
+
+def timeline_languages(dbName: str = DB_NAME) -> list:
+    """
+    a function that returns the languages the sentiment timeline can be narrowed to.
+    """
+    return list(language_counts(dbName=dbName)['language'])
+
+
+def sentiment_timeline(languages: list = None, dbName: str = DB_NAME):
+    """
+    a function that returns tweets, polarity and subjectivity per hour, indexed by hour.
+    """
+    return hourly_sentiment(dbName=dbName, languages=languages).set_index('hour')
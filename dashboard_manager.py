@@ -1,42 +1,58 @@
-import numpy as np
-import pandas as pd
 import streamlit as st
-import altair as alt
-from wordcloud import WordCloud
-import plotly.express as px
-from add_data import db_execute_fetch
+from lazy_imports import lazy_module
+from database_manager import TWEET_COLUMNS
+from dashboard_data import (DEFAULT_VIEW_COLUMNS, hashtag_choices, filter_choices, table_page, cloud_text,
+                            author_ranking, language_share, timeline_languages, sentiment_timeline)
+
+# the charting libraries load on first use, not on every page start
+alt = lazy_module('altair')
+px = lazy_module('plotly.express')
+wordcloud = lazy_module('wordcloud')
 
 st.set_page_config(page_title="Day 5", layout="wide")
 
-def loadData():
-    query = "select * from TweetInformation"
-    df = db_execute_fetch(query, dbName="tweets", rdf=True)
-    return df
+def pagedTable(key, filters=None, hashtags=None):
+    """
+    shows a tweet view one page at a time. Pages are read with keyset
+    pagination; the ids each visited page started after are kept in the
+    session so Previous goes back without rereading earlier pages.
+    """
+    view = (repr(filters), repr(hashtags))
+    if st.session_state.get(f"{key}_view") != view:
+        st.session_state[f"{key}_view"] = view
+        st.session_state[f"{key}_cursors"] = [0]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    columns = st.multiselect("columns", TWEET_COLUMNS, DEFAULT_VIEW_COLUMNS, key=f"{key}_columns")
+    pageSize = st.selectbox("rows per page", [25, 50, 100, 250], index=1, key=f"{key}_size")
+
+    df, total, exact = table_page(cursors[-1], pageSize, columns, filters=filters, hashtags=hashtags)
+
+    first = (len(cursors) - 1) * pageSize
+    filtered = hashtags or any((filters or {}).values())
+    about = "" if exact else "at least " if filtered else "about "
+    st.caption(f"rows {first + 1 if len(df) else first}-{first + len(df)} of {about}{total}")
+    st.write(df)
+
+    colPrev, colNext = st.beta_columns(2)
+    if len(cursors) > 1 and colPrev.button("Previous", key=f"{key}_prev"):
+        cursors.pop()
+        st.experimental_rerun()
+    if len(df) == pageSize and colNext.button("Next", key=f"{key}_next"):
+        cursors.append(int(df['id'].iloc[-1]))
+        st.experimental_rerun()
 
 def selectHashTag():
-    df = loadData()
-    hashTags = st.multiselect("choose combaniation of hashtags", list(df['hashtags'].unique()))
+    hashTags = st.multiselect("choose combaniation of hashtags", hashtag_choices())
     if hashTags:
-        df = df[np.isin(df, hashTags).any(axis=1)]
-        st.write(df)
+        pagedTable("hashtags", hashtags=hashTags)
 
 def selectLocAndAuth():
-    df = loadData()
-    location = st.multiselect("choose Location of tweets", list(df['place_coordinate'].unique()))
-    lang = st.multiselect("choose Language of tweets", list(df['language'].unique()))
-
-    if location and not lang:
-        df = df[np.isin(df, location).any(axis=1)]
-        st.write(df)
-    elif lang and not location:
-        df = df[np.isin(df, lang).any(axis=1)]
-        st.write(df)
-    elif lang and location:
-        location.extend(lang)
-        df = df[np.isin(df, location).any(axis=1)]
-        st.write(df)
-    else:
-        st.write(df)
+    locations, languages = filter_choices()
+    location = st.multiselect("choose Location of tweets", locations)
+    lang = st.multiselect("choose Language of tweets", languages)
+
+    pagedTable("tweets", filters={'location': location, 'language': lang})
 
 def barChart(data, title, X, Y):
     title = title.title()
@@ -46,34 +62,21 @@ def barChart(data, title, X, Y):
     st.altair_chart(msgChart, use_container_width=True)
 
 def wordCloud():
-    df = loadData()
-    cleanText = ''
-    for text in df['clean_text']:
-        tokens = str(text).lower().split()
-
-        cleanText += " ".join(tokens) + " "
-
-    wc = WordCloud(width=650, height=450, background_color='white', min_font_size=5).generate(cleanText)
+    cleanText = cloud_text()
+    wc = wordcloud.WordCloud(width=650, height=450, background_color='white', min_font_size=5).generate(cleanText)
     st.title("Tweet Text Word Cloud")
     st.image(wc.to_array())
 
 def stBarChart():
-    df = loadData()
-    dfCount = pd.DataFrame({'Tweet_count': df.groupby(['original_author'])['clean_text'].count()}).reset_index()
-    dfCount["original_author"] = dfCount["original_author"].astype(str)
-    dfCount = dfCount.sort_values("Tweet_count", ascending=False)
-
     num = st.slider("Select number of Rankings", 0, 50, 5)
+    dfCount = author_ranking(num)
+
     title = f"Top {num} Ranking By Number of tweets"
-    barChart(dfCount.head(num), title, "original_author", "Tweet_count")
+    barChart(dfCount, title, "screen_name", "Tweet_count")
 
 
 def langPie():
-    df = loadData()
-    dfLangCount = pd.DataFrame({'Tweet_count': df.groupby(['language'])['clean_text'].count()}).reset_index()
-    dfLangCount["language"] = dfLangCount["language"].astype(str)
-    dfLangCount = dfLangCount.sort_values("Tweet_count", ascending=False)
-    dfLangCount.loc[dfLangCount['Tweet_count'] < 10, 'lang'] = 'Other languages'
+    dfLangCount = language_share()
     st.title(" Tweets Language pie chart")
     fig = px.pie(dfLangCount, values='Tweet_count', names='language', width=500, height=350)
     fig.update_traces(textposition='inside', textinfo='percent+label')
@@ -86,6 +89,14 @@ def langPie():
         st.write(dfLangCount)
 
 
+def sentimentTimeline():
+    lang = st.multiselect("choose Language of the timeline", timeline_languages())
+    df = sentiment_timeline(lang)
+    st.title("Tweets and Sentiment per Hour")
+    st.line_chart(df[['tweet_count']])
+    st.line_chart(df[['polarity', 'subjectivity']])
+
+
 st.title("Data Display")
 selectHashTag()
 st.markdown("<p style='padding:10px; background-color:#000000;color:#00ECB9;font-size:16px;border-radius:10px;'>Section Break</p>", unsafe_allow_html=True)
@@ -94,4 +105,5 @@ st.title("Data Visualizations")
 wordCloud()
 with st.beta_expander("Show More Graphs"):
     stBarChart()
-    langPie()
\ No newline at end of file
+    langPie()
+    sentimentTimeline()
\ No newline at end of file
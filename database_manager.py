@@ -1,7 +1,11 @@
+from __future__ import annotations
+import ast
 import os
-import pandas as pd
-import mysql.connector as mysql
-from mysql.connector import Error
+import sqlite3
+from lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
+mysql = lazy_module('mysql.connector')
 
 def DBConnect(dbName=None):
     """
@@ -64,7 +68,7 @@ def createTables(dbName: str) -> None:
 
     """
     conn, cur = DBConnect(dbName)
-    sqlFile = 'day5_schema.sql'
+    sqlFile = 'database_schema.sql'
     fd = open(sqlFile, 'r')
     readSqlFile = fd.read()
     fd.close()
@@ -159,6 +163,907 @@ def insert_to_tweet_table(dbName: str, df: pd.DataFrame, table_name: str) -> Non
             print("Error: ", e)
     return
 
+def _placeholder(conn) -> str:
+    """
+    returns the query parameter marker of the connection's driver.
+    sqlite3 (used as a local stand-in) takes '?', mysql takes '%s'.
+    """
+    return '?' if isinstance(conn, sqlite3.Connection) else '%s'
+
+
+def bulk_insert(conn, cur, table_name: str, columns: list, rows: list, query: str = None) -> int:
+    """
+    insert many rows into a table with a single executemany call
+    inside one transaction. The batch is rolled back as a whole on failure.
+
+    Parameters
+    ----------
+    conn :
+        an open database connection
+    cur :
+        a cursor of that connection
+    table_name : str
+        table to insert into
+    columns : list
+        column names, in the order of the values in each row
+    rows : list
+        list of value tuples
+    query : str
+        the insert statement to run instead of a plain INSERT of columns (Default value = None)
+
+    Returns
+    -------
+    number of rows inserted
+    """
+    if not rows:
+        return 0
+    marks = ", ".join([_placeholder(conn)] * len(columns))
+    sqlQuery = query or f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES({marks});"
+    try:
+        cur.executemany(sqlQuery, rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print("Error: ", e)
+        raise
+
+    return len(rows)
+
+
+TWEET_COLUMNS = ['created_at', 'source', 'original_text', 'clean_text', 'polarity',
+                 'subjectivity', 'screen_name', 'language', 'retweet_count', 'friends_count',
+                 'hashtags', 'statuses', 'followers_count', 'user_mentions', 'possibly_sensitive',
+                 'favourites_count', 'location', 'tweet_id', 'retweeted_id', 'user_id']
+
+USER_COLUMNS = ['user_id', 'screen_name', 'followers_count', 'friends_count', 'statuses', 'favourites_count',
+                'location', 'updated_at']
+
+ORIGINAL_COLUMNS = ['tweet_id', 'created_at', 'screen_name', 'language', 'original_text', 'clean_text',
+                    'polarity', 'subjectivity', 'retweet_count']
+
+
+def _to_db_value(value):
+    """
+    converts a dataframe cell into a value the db drivers accept.
+    lists and dicts are stored as their text, missing values as NULL.
+    """
+    if isinstance(value, (list, dict)):
+        return str(value)
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def tweet_rows(df: pd.DataFrame) -> tuple:
+    """
+    converts a tweet frame into insertable rows.
+    columns are matched by name against the TweetInformation schema,
+    anything else in the frame is ignored.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        frame with get_tweet_df columns
+
+    Returns
+    -------
+    list of column names and list of value tuples
+    """
+    columns = [c for c in TWEET_COLUMNS if c in df.columns]
+    rows = [tuple(_to_db_value(v) for v in row) for row in df[columns].itertuples(index=False, name=None)]
+
+    return columns, rows
+
+
+def entity_rows(df: pd.DataFrame) -> list:
+    """
+    converts an exploded entity frame (tweet_id, tag, position) into insertable rows.
+    """
+    return list(zip(df['tweet_id'].astype('int64').tolist(), df['tag'].tolist(),
+                    df['position'].astype('int64').tolist()))
+
+
+def insert_tweet_batch(conn, df: pd.DataFrame, table_name: str = 'TweetInformation') -> int:
+    """
+    insert a whole extracted/cleaned tweet frame as one batch.
+
+    Parameters
+    ----------
+    conn :
+        an open database connection
+    df : pd.DataFrame
+        frame with get_tweet_df columns
+    table_name : str
+         (Default value = 'TweetInformation')
+
+    Returns
+    -------
+    number of rows inserted
+    """
+    columns, rows = tweet_rows(df)
+    cur = conn.cursor()
+    n = bulk_insert(conn, cur, table_name, columns, rows)
+    cur.close()
+
+    return n
+
+
+def original_rows(df: pd.DataFrame) -> tuple:
+    """
+    converts an original tweets frame, as returned by
+    TweetDfExtractor.get_compact_df, into insertable rows.
+
+    Returns
+    -------
+    list of column names and list of value tuples
+    """
+    columns = [c for c in ORIGINAL_COLUMNS if c in df.columns]
+    rows = [tuple(_to_db_value(v) for v in row) for row in df[columns].itertuples(index=False, name=None)]
+
+    return columns, rows
+
+
+def insert_original_query(conn, columns: list, mark: str = None) -> str:
+    """
+    returns the insert of OriginalTweets rows. An original retweeted in
+    several batches is stored by the first one, later copies are ignored.
+    """
+    mark = mark or _placeholder(conn)
+    verb = 'INSERT OR IGNORE' if isinstance(conn, sqlite3.Connection) or mark == '?' else 'INSERT IGNORE'
+    return f"{verb} INTO OriginalTweets ({', '.join(columns)}) VALUES({', '.join([mark] * len(columns))})"
+
+
+def insert_original_batch(conn, df: pd.DataFrame) -> int:
+    """
+    insert the original tweets of a compacted batch, skipping those already stored.
+
+    Parameters
+    ----------
+    conn :
+        an open database connection
+    df : pd.DataFrame
+        frame with ORIGINAL_COLUMNS
+
+    Returns
+    -------
+    number of rows sent
+    """
+    columns, rows = original_rows(df)
+    if not rows:
+        return 0
+    cur = conn.cursor()
+    try:
+        cur.executemany(insert_original_query(conn, columns), rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print("Error: ", e)
+        raise
+    finally:
+        cur.close()
+
+    return len(rows)
+
+
+def user_rows(df: pd.DataFrame) -> list:
+    """
+    converts a user dimension frame, as returned by
+    TweetDfExtractor.get_user_df, into USER_COLUMNS rows in user_id order,
+    so concurrent batches lock the Users rows in the same order.
+    """
+    df = df.sort_values('user_id')
+    return [tuple(_to_db_value(v) for v in row) for row in df[USER_COLUMNS].itertuples(index=False, name=None)]
+
+
+def user_upsert_query(mark: str) -> str:
+    """
+    the statement storing one user profile snapshot. A known user is
+    only updated when the snapshot is at least as new as the stored one,
+    so batches may be loaded in any order. mark is the driver's parameter
+    marker, '?' for the sqlite stand-in and '%s' for mysql.
+    """
+    profile = USER_COLUMNS[1:]
+    query = f"INSERT INTO Users ({', '.join(USER_COLUMNS)}) VALUES({', '.join([mark] * len(USER_COLUMNS))})"
+    if mark == '?':
+        updates = ', '.join(f"{c} = excluded.{c}" for c in profile)
+        return (f"{query} ON CONFLICT(user_id) DO UPDATE SET {updates} "
+                f"WHERE Users.updated_at IS NULL OR excluded.updated_at >= Users.updated_at;")
+    # mysql assigns left to right, so updated_at is compared before it is replaced
+    newer = "updated_at IS NULL OR VALUES(updated_at) >= updated_at"
+    updates = ', '.join(f"{c} = IF({newer}, VALUES({c}), {c})" for c in profile)
+    return f"{query} ON DUPLICATE KEY UPDATE {updates};"
+
+
+def insert_user_batch(conn, df: pd.DataFrame) -> int:
+    """
+    upsert the user dimension of a batch into the Users table.
+
+    Parameters
+    ----------
+    conn :
+        an open database connection
+    df : pd.DataFrame
+        frame with USER_COLUMNS, one row per user_id
+
+    Returns
+    -------
+    number of rows sent
+    """
+    rows = user_rows(df)
+    if not rows:
+        return 0
+    cur = conn.cursor()
+    try:
+        cur.executemany(user_upsert_query(_placeholder(conn)), rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print("Error: ", e)
+        raise
+    finally:
+        cur.close()
+
+    return len(rows)
+
+
+def insert_entity_query(conn, table_name: str, tag_column: str, mark: str = None) -> str:
+    """
+    returns the insert of entity rows. The child tables are keyed on
+    (tweet_id, position), so rows of a tweet loaded again are ignored
+    instead of failing the batch.
+    """
+    mark = mark or _placeholder(conn)
+    verb = 'INSERT OR IGNORE' if isinstance(conn, sqlite3.Connection) or mark == '?' else 'INSERT IGNORE'
+    return f"{verb} INTO {table_name} (tweet_id, {tag_column}, position) VALUES({mark}, {mark}, {mark})"
+
+
+def insert_entity_table(dbName: str, df: pd.DataFrame, table_name: str, tag_column: str, conn=None) -> int:
+    """
+    bulk load an exploded entity frame (tweet_id, tag, position), as returned by
+    TweetDfExtractor.find_hashtag_rows/find_mention_rows, into its child table.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    df : pd.DataFrame
+        exploded entity rows
+    table_name : str
+        TweetHashtags or TweetMentions
+    tag_column : str
+        name of the tag column in the table (hashtag or screen_name)
+    conn :
+        an open connection to use instead of DBConnect(dbName) (Default value = None)
+
+    Returns
+    -------
+    number of rows inserted, counting those already stored
+    """
+    if conn is None:
+        conn, cur = DBConnect(dbName)
+    else:
+        cur = conn.cursor()
+
+    rows = entity_rows(df)
+    n = bulk_insert(conn, cur, table_name, ['tweet_id', tag_column, 'position'], rows,
+                    query=insert_entity_query(conn, table_name, tag_column))
+    cur.close()
+
+    return n
+
+
+# rollup tables: group by keys -> summed counters. Buckets are the
+# 'YYYY-MM-DD HH' / 'YYYY-MM-DD' prefixes of the stored created_at text,
+# so incremental updates and SUBSTR based rebuilds agree.
+ROLLUPS = {
+    'TweetsPerHourLanguage': (['hour', 'language'], ['tweet_count', 'polarity_sum', 'subjectivity_sum']),
+    'TweetsPerAuthorDay': (['day', 'screen_name'], ['tweet_count']),
+    'HashtagsPerDay': (['day', 'hashtag'], ['tweet_count']),
+}
+
+
+def _parse_created_at(values: pd.Series) -> pd.Series:
+    """
+    parses created_at as utc timestamps with explicit formats: the twitter
+    format of extracted frames, then ISO 8601 for cleaned frames and csv
+    files, so no batch falls back to per-element dateutil parsing.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.to_datetime(values, utc=True)
+    created = pd.to_datetime(values, format='%a %b %d %H:%M:%S %z %Y', utc=True, errors='coerce')
+    retry = created.isna() & values.notna()
+    if retry.any():
+        created[retry] = pd.to_datetime(values[retry].astype(str), format='ISO8601', utc=True, errors='coerce')
+    return created
+
+
+def rollup_rows(df: pd.DataFrame, hashtags: pd.DataFrame = None) -> dict:
+    """
+    aggregates one tweet batch into rollup rows.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        frame with created_at, language, screen_name, polarity, subjectivity and tweet_id
+    hashtags : pd.DataFrame
+        exploded hashtag rows (tweet_id, tag, position) of the batch (Default value = None)
+
+    Returns
+    -------
+    dict of table name -> list of value tuples, keys then counters, sorted by key
+    """
+    if 'created_at' not in df.columns or df.empty:
+        return {}
+    created = _parse_created_at(df['created_at'])
+    keep = created.notna()
+    column = lambda name: df[name][keep] if name in df.columns else pd.Series(None, index=df.index[keep], dtype=object)
+    # group on truncated timestamps and only format the (few) bucket keys
+    frame = pd.DataFrame({'hour': created[keep].dt.floor('h'),
+                          'language': column('language').fillna('').astype(str),
+                          'screen_name': column('screen_name').fillna('').astype(str),
+                          'polarity': pd.to_numeric(column('polarity'), errors='coerce'),
+                          'subjectivity': pd.to_numeric(column('subjectivity'), errors='coerce')})
+    frame['day'] = frame['hour'].dt.floor('D')
+
+    out = {}
+    hourly = frame.groupby(['hour', 'language']).agg(tweet_count=('hour', 'size'), polarity_sum=('polarity', 'sum'),
+                                                     subjectivity_sum=('subjectivity', 'sum'))
+    out['TweetsPerHourLanguage'] = hourly.reset_index()
+    out['TweetsPerAuthorDay'] = frame.groupby(['day', 'screen_name']).size().rename('tweet_count').reset_index()
+
+    if hashtags is not None and 'tweet_id' in df.columns:
+        days = pd.Series(frame['day'].values, index=df.loc[keep, 'tweet_id'].values)
+        days = days[~days.index.duplicated()]
+        tagged = pd.DataFrame({'day': hashtags['tweet_id'].map(days), 'hashtag': hashtags['tag'],
+                               'tweet_id': hashtags['tweet_id']}).dropna(subset=['day'])
+        out['HashtagsPerDay'] = tagged.groupby(['day', 'hashtag'])['tweet_id'].nunique().rename('tweet_count').reset_index()
+
+    # rows in key order, so concurrent batches lock rollup rows in the same order
+    rows = {}
+    for table, agg in out.items():
+        keys, counters = ROLLUPS[table]
+        agg = agg.sort_values(keys)
+        agg[keys[0]] = agg[keys[0]].dt.strftime('%Y-%m-%d %H' if keys[0] == 'hour' else '%Y-%m-%d')
+        rows[table] = list(zip(*[agg[c].tolist() for c in keys + counters]))
+
+    return rows
+
+
+def rollup_upsert_query(table_name: str, mark: str) -> str:
+    """
+    the statement adding one rollup row to the stored counters,
+    inserting it when its key is new. mark is the driver's parameter
+    marker, '?' for the sqlite stand-in and '%s' for mysql.
+    """
+    keys, counters = ROLLUPS[table_name]
+    columns = keys + counters
+    query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES({', '.join([mark] * len(columns))})"
+    if mark == '?':
+        updates = ', '.join(f"{c} = {c} + excluded.{c}" for c in counters)
+        return f"{query} ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates};"
+    updates = ', '.join(f"{c} = {c} + VALUES({c})" for c in counters)
+    return f"{query} ON DUPLICATE KEY UPDATE {updates};"
+
+
+def update_rollups(conn, df: pd.DataFrame, hashtags: pd.DataFrame = None) -> int:
+    """
+    adds one loaded tweet batch to the rollup tables in one transaction.
+
+    Parameters
+    ----------
+    conn :
+        an open database connection
+    df : pd.DataFrame
+        the tweet batch just inserted
+    hashtags : pd.DataFrame
+        its exploded hashtag rows (Default value = None)
+
+    Returns
+    -------
+    number of rollup rows written
+    """
+    mark = _placeholder(conn)
+    cur = conn.cursor()
+    n = 0
+    try:
+        for table_name, rows in rollup_rows(df, hashtags).items():
+            if rows:
+                cur.executemany(rollup_upsert_query(table_name, mark), rows)
+                n += len(rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print("Error: ", e)
+        raise
+    finally:
+        cur.close()
+
+    return n
+
+
+def batch_statements(mark: str, df: pd.DataFrame, hashtags: pd.DataFrame = None, mentions: pd.DataFrame = None,
+                     originals: pd.DataFrame = None, users: pd.DataFrame = None,
+                     table_name: str = 'TweetInformation') -> list:
+    """
+    the statements that load one batch: original tweets, users, tweets,
+    hashtag and mention rows, then the rollup upserts, in that order.
+
+    Parameters
+    ----------
+    mark : str
+        the driver's parameter marker, '?' for the sqlite stand-in and '%s' for mysql
+    df : pd.DataFrame
+        frame with get_tweet_df columns
+    hashtags, mentions : pd.DataFrame
+        its exploded entity rows (Default value = None)
+    originals : pd.DataFrame
+        OriginalTweets rows of a compacted batch (Default value = None)
+    users : pd.DataFrame
+        user dimension rows, upserted into Users (Default value = None)
+    table_name : str
+         (Default value = 'TweetInformation')
+
+    Returns
+    -------
+    list of (query, rows), skipping those without rows
+    """
+    statements = []
+    if originals is not None and len(originals):
+        columns, rows = original_rows(originals)
+        statements.append((insert_original_query(None, columns, mark), rows))
+    if users is not None and len(users):
+        statements.append((user_upsert_query(mark), user_rows(users)))
+    columns, rows = tweet_rows(df)
+    statements.append((f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES({', '.join([mark] * len(columns))});",
+                       rows))
+    for entities, entity_table, tag_column in [(hashtags, 'TweetHashtags', 'hashtag'),
+                                               (mentions, 'TweetMentions', 'screen_name')]:
+        if entities is not None:
+            statements.append((insert_entity_query(None, entity_table, tag_column, mark), entity_rows(entities)))
+    for rollup_table, rows in rollup_rows(df, hashtags).items():
+        statements.append((rollup_upsert_query(rollup_table, mark), rows))
+
+    return [(query, rows) for query, rows in statements if rows]
+
+
+def load_batch(conn, df: pd.DataFrame, hashtags: pd.DataFrame = None, mentions: pd.DataFrame = None,
+               originals: pd.DataFrame = None, users: pd.DataFrame = None,
+               table_name: str = 'TweetInformation') -> int:
+    """
+    loads one batch with its entity rows and rollup updates in a single
+    transaction, so the rollup tables never get out of step with
+    TweetInformation. The batch is rolled back as a whole on failure.
+
+    Parameters
+    ----------
+    conn :
+        an open database connection
+    df : pd.DataFrame
+        frame with get_tweet_df columns
+    hashtags, mentions, originals, users : pd.DataFrame
+        see batch_statements (Default value = None)
+    table_name : str
+         (Default value = 'TweetInformation')
+
+    Returns
+    -------
+    number of tweet rows inserted
+    """
+    cur = conn.cursor()
+    try:
+        for query, rows in batch_statements(_placeholder(conn), df, hashtags, mentions, originals, users, table_name):
+            cur.executemany(query, rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print("Error: ", e)
+        raise
+    finally:
+        cur.close()
+
+    return len(df)
+
+
+def explode_entity_column(df: pd.DataFrame, column: str, key: str) -> pd.DataFrame:
+    """
+    explodes an entity column of an extracted csv (the text of the list of
+    entity dicts, e.g. hashtags) into the rows find_hashtag_rows returns.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        frame with tweet_id and the entity column
+    column : str
+        hashtags or user_mentions
+    key : str
+        the entity field holding the tag, text or screen_name
+
+    Returns
+    -------
+    dataframe of tweet_id, lowercased tag and position
+    """
+    rows = []
+    for tweet_id, value in zip(df['tweet_id'], df[column]):
+        if isinstance(value, str):
+            value = ast.literal_eval(value) if value.startswith('[') else []
+        if not isinstance(value, list) or tweet_id != tweet_id:
+            continue
+        rows.extend((tweet_id, str(x.get(key, '')).lower(), position) for position, x in enumerate(value))
+
+    return pd.DataFrame(rows, columns=['tweet_id', 'tag', 'position'])
+
+
+def rebuild_rollups(dbName: str, start: str = None, end: str = None, conn=None) -> None:
+    """
+    recomputes the rollup tables from the raw tables, for backfills or
+    after loading without the loader. Only days in [start, end) are
+    replaced when given; the deletes and inserts run in one transaction.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    start : str
+        first day to rebuild, 'YYYY-MM-DD' (Default value = None)
+    end : str
+        day after the last day to rebuild (Default value = None)
+    conn :
+        an open connection to use instead of DBConnect(dbName) (Default value = None)
+    """
+    own = conn is None
+    if own:
+        conn, cur = DBConnect(dbName)
+    else:
+        cur = conn.cursor()
+    mark = _placeholder(conn)
+
+    def between(column):
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f"{column} >= {mark}")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{column} < {mark}")
+            params.append(end)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), tuple(params)
+
+    sources = {
+        'TweetsPerHourLanguage': """SELECT SUBSTR(created_at, 1, 13), COALESCE(language, ''), COUNT(*),
+                                    COALESCE(SUM(polarity), 0), COALESCE(SUM(subjectivity), 0)
+                                    FROM TweetInformation{where} GROUP BY 1, 2""",
+        'TweetsPerAuthorDay': """SELECT SUBSTR(created_at, 1, 10), COALESCE(screen_name, ''), COUNT(*)
+                                 FROM TweetInformation{where} GROUP BY 1, 2""",
+        'HashtagsPerDay': """SELECT SUBSTR(t.created_at, 1, 10), h.hashtag, COUNT(DISTINCT h.tweet_id)
+                             FROM TweetHashtags h JOIN TweetInformation t ON t.tweet_id = h.tweet_id{where}
+                             GROUP BY 1, 2""",
+    }
+    try:
+        for table_name, select in sources.items():
+            keys, counters = ROLLUPS[table_name]
+            where, params = between(keys[0])
+            cur.execute(f"DELETE FROM {table_name}{where}", params)
+            column = 't.created_at' if table_name == 'HashtagsPerDay' else 'created_at'
+            where, params = between(column)
+            cur.execute(f"INSERT INTO {table_name} ({', '.join(keys + counters)}) " + select.format(where=where),
+                        params)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print("Error: ", e)
+        raise
+    finally:
+        cur.close()
+        if own:
+            conn.close()
+
+
+def hourly_sentiment(dbName: str, languages: list = None, conn=None) -> pd.DataFrame:
+    """
+    tweets and mean polarity/subjectivity per hour, read from the
+    TweetsPerHourLanguage rollup.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    languages : list
+        only count these languages, all when None (Default value = None)
+    conn :
+        an open connection to use instead of DBConnect(dbName) (Default value = None)
+
+    Returns
+    -------
+    dataframe of hour, tweet_count, polarity and subjectivity
+    """
+    own = conn is None
+    if own:
+        conn, cur = DBConnect(dbName)
+        cur.close()
+
+    where, params = "", ()
+    if languages:
+        where = f" WHERE language IN ({', '.join([_placeholder(conn)] * len(languages))})"
+        params = tuple(languages)
+    query = f"""SELECT hour, SUM(tweet_count) AS tweet_count, SUM(polarity_sum) / SUM(tweet_count) AS polarity,
+                SUM(subjectivity_sum) / SUM(tweet_count) AS subjectivity
+                FROM TweetsPerHourLanguage{where} GROUP BY hour ORDER BY hour"""
+    try:
+        return _fetch_df(conn, query, params)
+    finally:
+        if own:
+            conn.close()
+
+
+def language_counts(dbName: str, conn=None) -> pd.DataFrame:
+    """
+    tweets per language, read from the TweetsPerHourLanguage rollup.
+
+    Returns
+    -------
+    dataframe of language and tweet_count, most tweets first
+    """
+    own = conn is None
+    if own:
+        conn, cur = DBConnect(dbName)
+        cur.close()
+
+    query = """SELECT language, SUM(tweet_count) AS tweet_count FROM TweetsPerHourLanguage
+               GROUP BY language ORDER BY tweet_count DESC"""
+    try:
+        return _fetch_df(conn, query)
+    finally:
+        if own:
+            conn.close()
+
+
+def top_authors(dbName: str, limit: int = 50, conn=None) -> pd.DataFrame:
+    """
+    authors with the most tweets, read from the TweetsPerAuthorDay rollup.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    limit : int
+         (Default value = 50)
+    conn :
+        an open connection to use instead of DBConnect(dbName) (Default value = None)
+
+    Returns
+    -------
+    dataframe of screen_name and tweet_count, most tweets first
+    """
+    own = conn is None
+    if own:
+        conn, cur = DBConnect(dbName)
+        cur.close()
+
+    query = f"""SELECT screen_name, SUM(tweet_count) AS tweet_count FROM TweetsPerAuthorDay
+                GROUP BY screen_name ORDER BY tweet_count DESC LIMIT {_placeholder(conn)}"""
+    try:
+        return _fetch_df(conn, query, (int(limit),))
+    finally:
+        if own:
+            conn.close()
+
+
+def top_hashtags(dbName: str, limit: int = 20) -> pd.DataFrame:
+    """
+    most used hashtags, answered from the HashtagsPerDay rollup.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    limit : int
+         (Default value = 20)
+
+    Returns
+    -------
+    dataframe of hashtag and tweet_count
+    """
+    query = """SELECT hashtag, SUM(tweet_count) AS tweet_count FROM HashtagsPerDay
+               GROUP BY hashtag ORDER BY tweet_count DESC LIMIT %s"""
+    return db_execute_fetch(query, (int(limit),), dbName=dbName, rdf=True)
+
+
+def tweets_with_hashtags(dbName: str, hashtags: list) -> pd.DataFrame:
+    """
+    tweets that use any of the given hashtags, joined through the TweetHashtags index.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    hashtags : list
+        hashtags to look up, matched case-insensitively
+
+    Returns
+    -------
+    dataframe of matching TweetInformation rows
+    """
+    tags = [str(x).lower() for x in hashtags]
+    marks = ", ".join(["%s"] * len(tags))
+    query = f"""SELECT t.* FROM TweetInformation t
+                WHERE t.tweet_id IN (SELECT h.tweet_id FROM TweetHashtags h WHERE h.hashtag IN ({marks}))"""
+    return db_execute_fetch(query, tuple(tags), dbName=dbName, rdf=True)
+
+
+def _fetch_df(conn, query: str, params: tuple = ()) -> pd.DataFrame:
+    cur = conn.cursor()
+    cur.execute(query, params)
+    field_names = [i[0] for i in cur.description]
+    res = cur.fetchall()
+    cur.close()
+    return pd.DataFrame(res, columns=field_names)
+
+
+def _filter_clause(conn, filters: dict = None, hashtags: list = None) -> tuple:
+    """
+    builds the WHERE conditions of a tweet view: every filters column must
+    be one of its values, and with hashtags the tweet must use one of them.
+    column names are checked against TWEET_COLUMNS since they are put in the query text.
+    returns the list of conditions and their parameters.
+    """
+    mark = _placeholder(conn)
+    conditions, params = [], []
+    for column, values in (filters or {}).items():
+        if column not in TWEET_COLUMNS:
+            raise ValueError(f"unknown column: {column}")
+        if values:
+            conditions.append(f"{column} IN ({', '.join([mark] * len(values))})")
+            params.extend(values)
+    if hashtags:
+        tags = [str(x).lower() for x in hashtags]
+        conditions.append(f"tweet_id IN (SELECT tweet_id FROM TweetHashtags WHERE hashtag IN "
+                          f"({', '.join([mark] * len(tags))}))")
+        params.extend(tags)
+
+    return conditions, params
+
+
+def fetch_page(dbName: str, after_id: int = 0, limit: int = 50, columns: list = None, filters: dict = None,
+               hashtags: list = None, table_name: str = 'TweetInformation', conn=None) -> pd.DataFrame:
+    """
+    one page of a tweet view, read with keyset pagination:
+    WHERE id > after_id ORDER BY id LIMIT limit walks the primary key index,
+    so every page costs the same however deep it is, unlike OFFSET.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    after_id : int
+        id of the last row of the previous page, 0 for the first page (Default value = 0)
+    limit : int
+        page size (Default value = 50)
+    columns : list
+        columns to fetch besides id, all of TWEET_COLUMNS when None.
+        leave out the text columns unless they are shown (Default value = None)
+    filters : dict
+        column -> accepted values (Default value = None)
+    hashtags : list
+        keep tweets using any of these hashtags (Default value = None)
+    table_name : str
+         (Default value = 'TweetInformation')
+    conn :
+        an open connection to use instead of DBConnect(dbName) (Default value = None)
+
+    Returns
+    -------
+    dataframe of id and the requested columns, ordered by id
+    """
+    columns = list(TWEET_COLUMNS if columns is None else columns)
+    for column in columns:
+        if column not in TWEET_COLUMNS:
+            raise ValueError(f"unknown column: {column}")
+    own = conn is None
+    if own:
+        conn, cur = DBConnect(dbName)
+        cur.close()
+
+    mark = _placeholder(conn)
+    conditions, params = _filter_clause(conn, filters, hashtags)
+    where = " AND ".join([f"id > {mark}"] + conditions)
+    query = f"SELECT {', '.join(['id'] + columns)} FROM {table_name} WHERE {where} ORDER BY id LIMIT {mark}"
+    try:
+        return _fetch_df(conn, query, (int(after_id), *params, int(limit)))
+    finally:
+        if own:
+            conn.close()
+
+
+def count_estimate(dbName: str, filters: dict = None, hashtags: list = None, cap: int = 10000,
+                   table_name: str = 'TweetInformation', conn=None) -> tuple:
+    """
+    the number of rows of a tweet view, without counting a whole table.
+    unfiltered, it is the span of the auto increment ids, read from the
+    ends of the primary key index. Filtered, matching rows are counted up
+    to cap and the count stops there.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    filters : dict
+        as in fetch_page (Default value = None)
+    hashtags : list
+        as in fetch_page (Default value = None)
+    cap : int
+        most rows counted for a filtered view (Default value = 10000)
+    table_name : str
+         (Default value = 'TweetInformation')
+    conn :
+        an open connection to use instead of DBConnect(dbName) (Default value = None)
+
+    Returns
+    -------
+    the count and whether it is exact
+    """
+    own = conn is None
+    if own:
+        conn, cur = DBConnect(dbName)
+        cur.close()
+
+    conditions, params = _filter_clause(conn, filters, hashtags)
+    try:
+        if not conditions:
+            low, high = _fetch_df(conn, f"SELECT MIN(id), MAX(id) FROM {table_name}").iloc[0]
+            if low is None or low != low:
+                return 0, True
+            return int(high) - int(low) + 1, False
+        query = (f"SELECT COUNT(*) FROM (SELECT 1 FROM {table_name} WHERE {' AND '.join(conditions)} "
+                 f"LIMIT {_placeholder(conn)}) capped")
+        n = int(_fetch_df(conn, query, (*params, int(cap) + 1)).iloc[0, 0])
+        return min(n, cap), n <= cap
+    finally:
+        if own:
+            conn.close()
+
+
+def distinct_values(dbName: str, column: str, limit: int = 500, table_name: str = 'TweetInformation',
+                    conn=None) -> list:
+    """
+    the most frequent values of a column, to offer as filter choices
+    without loading the table.
+
+    Parameters
+    ----------
+    dbName : str
+        database name
+    column : str
+        one of TWEET_COLUMNS
+    limit : int
+         (Default value = 500)
+    table_name : str
+         (Default value = 'TweetInformation')
+    conn :
+        an open connection to use instead of DBConnect(dbName) (Default value = None)
+
+    Returns
+    -------
+    list of values, most frequent first
+    """
+    if column not in TWEET_COLUMNS:
+        raise ValueError(f"unknown column: {column}")
+    own = conn is None
+    if own:
+        conn, cur = DBConnect(dbName)
+        cur.close()
+
+    query = (f"SELECT {column}, COUNT(*) AS n FROM {table_name} WHERE {column} IS NOT NULL "
+             f"GROUP BY {column} ORDER BY n DESC LIMIT {_placeholder(conn)}")
+    try:
+        return _fetch_df(conn, query, (int(limit),))[column].tolist()
+    finally:
+        if own:
+            conn.close()
+
+
 def db_execute_fetch(*args, many=False, tablename='', rdf=True, **kwargs) -> pd.DataFrame:
     """
 
@@ -213,4 +1118,16 @@ if __name__ == "__main__":
 
     df = pd.read_csv('fintech.csv')
 
-    insert_to_tweet_table(dbName='tweets', df=df, table_name='TweetInformation')
\ No newline at end of file
+    conn, cur = DBConnect('tweets')
+    cur.close()
+    try:
+        insert_tweet_batch(conn, df)
+    finally:
+        conn.close()
+
+    if os.path.exists('processed_hashtags.csv'):
+        insert_entity_table('tweets', pd.read_csv('processed_hashtags.csv'), 'TweetHashtags', 'hashtag')
+    if os.path.exists('processed_mentions.csv'):
+        insert_entity_table('tweets', pd.read_csv('processed_mentions.csv'), 'TweetMentions', 'screen_name')
+
+    rebuild_rollups(dbName='tweets')
\ No newline at end of file
@@ -17,7 +17,102 @@ CREATE TABLE IF NOT EXISTS `TweetInformation`
     `user_mentions` TEXT DEFAULT NULL,
     `possibly_sensitive` TEXT DEFAULT NULL,
     `favourites_count` INT DEFAULT NULL,
-    `location` TEXT DEFAULT NULL,,
-    PRIMARY KEY (`id`)
+    `location` TEXT DEFAULT NULL,
+    `tweet_id` BIGINT DEFAULT NULL,
+    `retweeted_id` BIGINT DEFAULT NULL,
+    `user_id` BIGINT DEFAULT NULL,
+    PRIMARY KEY (`id`),
+    INDEX `idx_tweet_id` (`tweet_id`),
+    INDEX `idx_retweeted_id` (`retweeted_id`),
+    INDEX `idx_user_id` (`user_id`)
 )
-ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci
\ No newline at end of file
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- one row per author, the profile as of their latest loaded tweet. Tweets
+-- loaded with --user-dimension leave the profile columns of TweetInformation
+-- NULL and reference this table through user_id.
+CREATE TABLE IF NOT EXISTS `Users` 
+(
+    `user_id` BIGINT NOT NULL,
+    `screen_name` VARCHAR(50) DEFAULT NULL,
+    `followers_count` INT DEFAULT NULL,
+    `friends_count` INT DEFAULT NULL,
+    `statuses` INT DEFAULT NULL,
+    `favourites_count` INT DEFAULT NULL,
+    `location` TEXT DEFAULT NULL,
+    `updated_at` DATETIME DEFAULT NULL,
+    PRIMARY KEY (`user_id`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- each retweeted tweet once, scored on its full text. Retweet rows of
+-- TweetInformation (loaded with --compact-retweets) have no text of their
+-- own and point here through retweeted_id.
+CREATE TABLE IF NOT EXISTS `OriginalTweets` 
+(
+    `tweet_id` BIGINT NOT NULL,
+    `created_at` TEXT NOT NULL,
+    `screen_name` VARCHAR(50) DEFAULT NULL,
+    `language` VARCHAR(10) DEFAULT NULL,
+    `original_text` TEXT DEFAULT NULL,
+    `clean_text` TEXT DEFAULT NULL,
+    `polarity` FLOAT DEFAULT NULL,
+    `subjectivity` FLOAT DEFAULT NULL,
+    `retweet_count` INT DEFAULT NULL,
+    PRIMARY KEY (`tweet_id`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `TweetHashtags` 
+(
+    `tweet_id` BIGINT NOT NULL,
+    `hashtag` VARCHAR(140) NOT NULL,
+    `position` SMALLINT NOT NULL,
+    PRIMARY KEY (`tweet_id`, `position`),
+    INDEX `idx_hashtag` (`hashtag`, `tweet_id`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `TweetMentions` 
+(
+    `tweet_id` BIGINT NOT NULL,
+    `screen_name` VARCHAR(50) NOT NULL,
+    `position` SMALLINT NOT NULL,
+    PRIMARY KEY (`tweet_id`, `position`),
+    INDEX `idx_screen_name` (`screen_name`, `tweet_id`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- rollups maintained by the loader (database_manager.update_rollups) and
+-- rebuilt from the tables above by database_manager.rebuild_rollups.
+-- hour is 'YYYY-MM-DD HH' and day 'YYYY-MM-DD' in UTC.
+CREATE TABLE IF NOT EXISTS `TweetsPerHourLanguage` 
+(
+    `hour` CHAR(13) NOT NULL,
+    `language` VARCHAR(10) NOT NULL,
+    `tweet_count` INT NOT NULL,
+    `polarity_sum` DOUBLE NOT NULL,
+    `subjectivity_sum` DOUBLE NOT NULL,
+    PRIMARY KEY (`hour`, `language`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `TweetsPerAuthorDay` 
+(
+    `day` CHAR(10) NOT NULL,
+    `screen_name` VARCHAR(50) NOT NULL,
+    `tweet_count` INT NOT NULL,
+    PRIMARY KEY (`day`, `screen_name`),
+    INDEX `idx_author_screen_name` (`screen_name`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `HashtagsPerDay` 
+(
+    `day` CHAR(10) NOT NULL,
+    `hashtag` VARCHAR(140) NOT NULL,
+    `tweet_count` INT NOT NULL,
+    PRIMARY KEY (`day`, `hashtag`),
+    INDEX `idx_day_hashtag` (`hashtag`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE utf8mb4_unicode_ci
@@ -0,0 +1,259 @@
+"""
+a persistent index of the tweets already ingested, so duplicates are
+dropped when they are read, across files, runs and processes.
+
+    python pipeline_runner.py day2.json --db tweets --dedup-index seen.sqlite
+    python batch_ingest.py ../data/hourly/ --out processed --dedup-index seen.sqlite
+    python dedup_index.py stats --index seen.sqlite
+
+every tweet is reduced to one 64-bit fingerprint: its id, or when it has
+none a blake2b hash of screen_name, text and created_at (stored negative,
+so it never equals an id). Fingerprints live in a sqlite file (WAL mode,
+like the sentiment cache), so memory stays per chunk however many tweets
+were seen; a chunk is checked with a few indexed lookups.
+
+fingerprints are recorded under a run. Until the run is committed (the
+pipeline commits a chunk's run once its batch is loaded, batch_ingest a
+file's once the file is in its manifest) its tweets still count as seen
+for every reader, but if the process dies first, the next open removes
+the dead run's fingerprints so a rerun extracts those tweets again
+instead of dropping them.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+_BATCH = 500 # keys per lookup query, below sqlite's host parameter limit
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    key INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run INTEGER PRIMARY KEY AUTOINCREMENT,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started INTEGER NOT NULL,
+    committed INTEGER
+);
+CREATE INDEX IF NOT EXISTS seen_run ON seen (run);
+"""
+
+_OPEN = {} # (pid, path) -> DedupIndex, see open_index
+
+
+def fingerprint(tweet: dict) -> int:
+    """
+    a function that returns the 64-bit fingerprint of a tweet: its id, or a
+    negative hash of screen_name, text and created_at for tweets without one.
+    """
+    tweet_id = tweet.get('id', None)
+    if tweet_id is not None:
+        return int(tweet_id)
+    user = tweet.get('user', None) or {}
+    text = tweet.get('full_text', None) or tweet.get('text', None) or ''
+    data = f"{user.get('screen_name', '')}\x00{text}\x00{tweet.get('created_at', '')}"
+    digest = hashlib.blake2b(data.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return -1 - (int.from_bytes(digest, 'big') >> 1)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DedupIndex:
+    """
+    the sqlite backed set of fingerprints. One instance may be shared
+    between threads; processes each open their own (see open_index).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.kept = 0
+        self.dropped = 0
+        self.run = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.recover()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def recover(self) -> int:
+        """
+        removes the fingerprints of uncommitted runs whose process on this
+        host is gone, so the tweets they read are taken again.
+        returns the number of runs removed.
+        """
+        host = socket.gethostname()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            open_runs = self._conn.execute("SELECT run, pid FROM runs WHERE committed IS NULL AND host = ?",
+                                           (host,)).fetchall()
+            dead = [run for run, pid in open_runs if pid != os.getpid() and not _alive(pid)]
+            for run in dead:
+                self._conn.execute("DELETE FROM seen WHERE run = ?", (run,))
+                self._conn.execute("DELETE FROM runs WHERE run = ?", (run,))
+        return len(dead)
+
+    def begin(self) -> int:
+        """
+        starts a run; fingerprints recorded from now on belong to it.
+        returns the run id.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            cur = self._conn.execute("INSERT INTO runs (host, pid, started) VALUES (?, ?, ?)",
+                                     (socket.gethostname(), os.getpid(), int(time.time())))
+            self.run = cur.lastrowid
+        return self.run
+
+    def commit(self, run: int = None):
+        """
+        marks the current run, or the given run handed over by detach, as
+        done: its tweets were ingested.
+        """
+        if run is None:
+            run, self.run = self.run, None
+        if run is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("UPDATE runs SET committed = ? WHERE run = ?", (int(time.time()), run))
+
+    def detach(self) -> int:
+        """
+        leaves the current run open for another process to commit, e.g.
+        once it has recorded the run's outputs. Should both processes die
+        first, the run is released like any other dead run.
+        returns the run id.
+        """
+        run, self.run = self.run, None
+        return run
+
+    def abandon(self):
+        """
+        forgets the fingerprints of the current run, after a failed ingest.
+        """
+        if self.run is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM seen WHERE run = ?", (self.run,))
+            self._conn.execute("DELETE FROM runs WHERE run = ?", (self.run,))
+        self.run = None
+
+    def forget(self, run: int):
+        """
+        forgets the fingerprints recorded by a committed run, when what it
+        ingested is thrown away (batch_ingest re-extracting a changed file).
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM seen WHERE run = ?", (run,))
+            self._conn.execute("DELETE FROM runs WHERE run = ?", (run,))
+
+    def filter_new(self, tweets: list) -> list:
+        """
+        drops the tweets already seen, by this or any earlier run and
+        earlier in the list, and records the others under the current
+        run (started if needed). Lookup and insert share one write
+        transaction, so two processes never both keep a tweet.
+        returns the new tweets in their order.
+        """
+        if self.run is None:
+            self.begin()
+        keys = [fingerprint(x) for x in tweets]
+        distinct = list(set(keys))
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            seen = set()
+            for i in range(0, len(distinct), _BATCH):
+                batch = distinct[i:i + _BATCH]
+                marks = ', '.join('?' * len(batch))
+                seen.update(key for key, in self._conn.execute(f"SELECT key FROM seen WHERE key IN ({marks})",
+                                                                batch))
+            new = []
+            for tweet, key in zip(tweets, keys):
+                if key not in seen:
+                    seen.add(key)
+                    new.append((tweet, key))
+            self._conn.executemany("INSERT INTO seen VALUES (?, ?)", [(key, self.run) for _, key in new])
+
+        self.kept += len(new)
+        self.dropped += len(tweets) - len(new)
+        return [tweet for tweet, _ in new]
+
+    def stats(self) -> dict:
+        """
+        returns the number of fingerprints, committed and open runs and the file size.
+        """
+        with self._lock:
+            keys = self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+            runs = dict(self._conn.execute("SELECT committed IS NOT NULL, COUNT(*) FROM runs GROUP BY 1"))
+        return {'path': self.path, 'bytes': os.path.getsize(self.path), 'fingerprints': keys,
+                'committed_runs': runs.get(1, 0), 'open_runs': runs.get(0, 0)}
+
+
+def open_index(path: str) -> DedupIndex:
+    """
+    a function that returns this process's index for path, opening it
+    on first use. Pipelines pass the path to their worker processes and
+    every worker keeps one connection for all its files.
+    """
+    key = (os.getpid(), os.path.abspath(path))
+    if key not in _OPEN:
+        _OPEN[key] = DedupIndex(path)
+    return _OPEN[key]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='persistent index of ingested tweets')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help='fingerprints and runs in the index')
+    p = sub.add_parser('seed', help='record the tweets of dumps as ingested, without extracting them')
+    p.add_argument('json_files', nargs='+')
+    p.add_argument('--chunk-size', type=int, default=10000)
+    for p in sub.choices.values():
+        p.add_argument('--index', default='dedup_index.sqlite')
+    args = parser.parse_args(argv)
+
+    index = DedupIndex(args.index)
+    try:
+        if args.command == 'seed':
+            from extract_dataframe import iter_json_chunks
+
+            for json_file in args.json_files:
+                for _ in iter_json_chunks(json_file, args.chunk_size, dedup=index):
+                    pass
+            index.commit()
+            print(f"{index.kept} tweets recorded, {index.dropped} already in {args.index}")
+        else:
+            print(index.stats())
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
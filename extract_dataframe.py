@@ -1,11 +1,21 @@
+from __future__ import annotations
+import glob
 import json
-import pandas as pd
-from textblob import TextBlob
+import os
 import re
+import sys
+from datetime import datetime, timezone
+from compressed_input import open_tweet_file
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+textblob = lazy_module('textblob')
 
 def read_json(json_file: str)->list:
     """
-    json file reader to open and read json files into a list
+    json file reader to open and read json files into a list.
+    gzip, bz2 and zstd compressed files are decompressed while reading.
     Args:
     -----
     json_file: str - path of a json file
@@ -16,24 +26,136 @@ def read_json(json_file: str)->list:
     """
     
     tweets_data = []
-    for tweets in open(json_file,'r'):
-        tweets_data.append(json.loads(tweets))
+    with open_tweet_file(json_file) as fd:
+        for tweets in fd:
+            if tweets.strip():
+                tweets_data.append(json.loads(tweets))
     
     
     return len(tweets_data), tweets_data
 
 
+def iter_json_chunks(json_file: str, chunk_size: int = 10000, dedup=None, filters=None):
+    """
+    json file reader that yields the tweets in lists of at most
+    chunk_size, so large files can be processed without loading them whole.
+    Args:
+    -----
+    json_file: str - path of a json file
+    chunk_size: int - number of tweets per chunk
+    dedup: DedupIndex - when given, tweets it has already seen (in this
+           or an earlier run) are dropped and chunks left empty are skipped
+    filters: predicates (e.g. TweetFilter) applied before dedup, so the
+           tweets they drop are not recorded as seen
+    
+    Returns
+    -------
+    generator of lists of json
+    """
+    if callable(filters):
+        filters = [filters]
+    chunk = []
+    with open_tweet_file(json_file) as fd:
+        for tweets in fd:
+            if not tweets.strip():
+                continue
+            tweet = json.loads(tweets)
+            if filters is not None and not all(f(tweet) for f in filters):
+                continue
+            chunk.append(tweet)
+            if len(chunk) >= chunk_size:
+                if dedup is not None:
+                    chunk = dedup.filter_new(chunk)
+                if chunk:
+                    yield chunk
+                chunk = []
+    if chunk and dedup is not None:
+        chunk = dedup.filter_new(chunk)
+    if chunk:
+        yield chunk
+
+
+def _as_utc(value)->datetime:
+    """
+    converts a date string or datetime into a timezone aware utc datetime.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class TweetFilter:
+    """
+    a predicate evaluated on the raw tweet dict, before any column
+    is extracted, so dropped tweets never reach sentiment analysis.
+    every criterion left as None is not checked.
+    Args:
+    -----
+    langs: set of language codes to keep, e.g. {'en'}
+    start: keep tweets created at or after this date (inclusive)
+    end: keep tweets created before this date (exclusive)
+    sensitive: keep only tweets whose possibly_sensitive equals this
+    min_followers: keep tweets whose author has at least this many followers
+    """
+    def __init__(self, langs=None, start=None, end=None, sensitive=None, min_followers=None):
+        self.langs = set(langs) if langs is not None else None
+        self.start = _as_utc(start) if start is not None else None
+        self.end = _as_utc(end) if end is not None else None
+        self.sensitive = sensitive
+        self.min_followers = min_followers
+
+    def __call__(self, tweet: dict)->bool:
+        # cheapest checks first, the date is only parsed when needed
+        if self.langs is not None and tweet.get('lang', None) not in self.langs:
+            return False
+        if self.sensitive is not None and bool(tweet.get('possibly_sensitive', False)) != self.sensitive:
+            return False
+        if self.min_followers is not None and (tweet.get('user', {}).get('followers_count', None) or 0) < self.min_followers:
+            return False
+        if self.start is not None or self.end is not None:
+            created_at = tweet.get('created_at', None)
+            if created_at is None:
+                return False
+            created_at = datetime.strptime(created_at, '%a %b %d %H:%M:%S %z %Y')
+            if self.start is not None and created_at < self.start:
+                return False
+            if self.end is not None and created_at >= self.end:
+                return False
+        return True
+
+
 class TweetDfExtractor:
     """
-    this function will parse tweets json into a pandas dataframe
+    this function will parse tweets json into a pandas dataframe.
+    filters are predicates (e.g. TweetFilter) on the raw tweet dicts;
+    tweets failing any of them are dropped before extraction.
+    sentiment_backend selects how find_sentiments scores text:
+    'textblob' (one TextBlob per tweet) or 'lexicon' (the batch scorer
+    in lexicon_sentiment, within lexicon_sentiment.TOLERANCE of textblob).
+    sentiment_cache, a sentiment_cache.SentimentCache or the path of one,
+    makes find_sentiments score only texts it has not scored before.
     
     Return
     ------
     dataframe
     """
-    def __init__(self, tweets_list):
+    def __init__(self, tweets_list, filters=None, sentiment_backend='textblob', sentiment_cache=None):
         
+        if sentiment_backend not in SENTIMENT_BACKENDS:
+            raise ValueError(f"unknown sentiment backend: {sentiment_backend}")
+        self.sentiment_backend = sentiment_backend
+        if isinstance(sentiment_cache, str):
+            from sentiment_cache import open_cache
+            sentiment_cache = open_cache(sentiment_cache)
+        self.sentiment_cache = sentiment_cache
+        if filters is not None:
+            if callable(filters):
+                filters = [filters]
+            tweets_list = [x for x in tweets_list if all(f(x) for f in filters)]
         self.tweets_list = tweets_list
+        self._computed = {} # cached results of get_column producers
 
 
     
@@ -85,13 +207,30 @@ class TweetDfExtractor:
         subjectivity from the list of tweet strings.
         returns a two lists of polarity and subjectivity scores.
         """
+        if self.sentiment_cache is not None:
+            from sentiment_cache import backend_version
+            version = backend_version(self.sentiment_backend)
+            polarity, self.subjectivity = self.sentiment_cache.score(text, version, self._score_sentiments)
+            return polarity, self.subjectivity
+
+        polarity, self.subjectivity = self._score_sentiments(text)
+        return polarity, self.subjectivity
+
+
+    def _score_sentiments(self, text: list)->tuple:
+        if self.sentiment_backend == 'lexicon':
+            import lexicon_sentiment
+            polarity, subjectivity = lexicon_sentiment.score(text)
+            return polarity.tolist(), subjectivity.tolist()
+
         polarity = [] # contains the polarity values from the sentiment analysis.
-        self.subjectivity = [] # contains the subjectivity values from the sentiment analysis.
+        subjectivity = [] # contains the subjectivity values from the sentiment analysis.
         for items in text:
-            self.subjectivity.append(TextBlob(items).sentiment.subjectivity)
-            polarity.append(TextBlob(items).sentiment.polarity)
+            sentiment = textblob.TextBlob(items).sentiment
+            subjectivity.append(sentiment.subjectivity)
+            polarity.append(sentiment.polarity)
         
-        return polarity, self.subjectivity
+        return polarity, subjectivity
     
     
     
@@ -106,18 +245,59 @@ class TweetDfExtractor:
         
         return screen_name
 
+
+    def find_user_id(self)->list:
+        """
+        a function that extracts the id of the tweet's author.
+        returns a list of user ids.
+        """
+        user_id = [] # list of user ids.
+        for items in self.tweets_list:
+            user_id.append(items.get('user', {}).get('id', None))
+        
+        return user_id
+
     
     def find_author_name(self)->list:
         """
         a function that extracts original author screen name.
         returns a list of screen names.
         """
-        author_name = [] # list of original authors' screen names.
+        author_name = [] # list of original authors' screen names, None for tweets that are not retweets.
         for items in self.tweets_list:
-            author_name.append(items.get('retweeted_status', None).get('user', None).get('screen_name', None))
+            original = items.get('retweeted_status', None) or {}
+            author_name.append(original.get('user', {}).get('screen_name', None))
         
         return author_name
 
+
+    def find_retweeted_id(self)->list:
+        """
+        a function that extracts the id of the tweet a retweet retweets.
+        returns a list of tweet ids, None for tweets that are not retweets.
+        """
+        retweeted_id = [] # list of retweeted tweet ids.
+        for items in self.tweets_list:
+            original = items.get('retweeted_status', None) or {}
+            retweeted_id.append(original.get('id', None))
+        
+        return retweeted_id
+
+
+    def find_retweeted_originals(self)->list:
+        """
+        a function that collects the retweeted_status of the retweets,
+        each distinct original tweet once.
+        returns a list of original tweet jsons.
+        """
+        originals = {} # original tweet id -> original tweet
+        for items in self.tweets_list:
+            original = items.get('retweeted_status', None)
+            if original and original.get('id', None) not in originals:
+                originals[original.get('id', None)] = original
+        
+        return list(originals.values())
+
     
     def find_lang(self)->list:
         """
@@ -204,6 +384,56 @@ class TweetDfExtractor:
         return mentions
 
     
+    def find_tweet_id(self)->list:
+        """
+        a function that extracts the tweet id.
+        returns a list of tweet ids.
+        """
+        tweet_id = [] # list of tweet ids.
+        for items in self.tweets_list:
+            tweet_id.append(items.get('id', None))
+        
+        return tweet_id
+
+
+    def explode_entities(self, entity: str, key: str)->pd.DataFrame:
+        """
+        a function that flattens one entity list (e.g. hashtags or
+        user_mentions) of every tweet into long format.
+        returns a dataframe of tweet_id, lowercased tag and position
+        of the tag within its tweet. Tweets without an id have no rows,
+        the child tables key on it.
+        """
+        entities = [(items.get('entities', {}).get(entity, None) or []) if items.get('id', None) is not None else []
+                    for items in self.tweets_list]
+        lengths = np.fromiter((len(x) for x in entities), dtype=np.int64, count=len(entities))
+
+        # repeat each tweet id once per entity and number entities within each tweet
+        tweet_id = np.repeat(np.array(self.find_tweet_id(), dtype=object), lengths)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        position = np.arange(lengths.sum()) - starts
+        tags = pd.Series([x.get(key, '') for items in entities for x in items], dtype=object)
+
+        return pd.DataFrame({'tweet_id': tweet_id, 'tag': tags.str.lower().to_numpy(),
+                             'position': position})
+
+
+    def find_hashtag_rows(self)->pd.DataFrame:
+        """
+        a function that explodes the hashtags used in the tweets.
+        returns a dataframe of tweet_id, hashtag and position.
+        """
+        return self.explode_entities('hashtags', 'text')
+
+
+    def find_mention_rows(self)->pd.DataFrame:
+        """
+        a function that explodes the user mentions in the tweets.
+        returns a dataframe of tweet_id, mentioned screen name and position.
+        """
+        return self.explode_entities('user_mentions', 'screen_name')
+
+    
     def is_sensitive(self)->list:
         """
         a function that extracts sensitivity status.
@@ -237,41 +467,153 @@ class TweetDfExtractor:
         return favourite_count
 
           
-    def get_tweet_df(self, save=False)->pd.DataFrame:
+    def find_source_name(self)->list:
         """
-        a function that inserts the extracted 
-        value lists for each variable into a dataframe. 
-        returns a dataframe with all extracted columns
+        a function that parses the device name out of the source hyperlink.
+        returns a list of source names.
         """
+        source_name = [] # list of device names.
+        for items in self.get_column('source'):
+            match = _SOURCE_NAME.search(items or '')
+            source_name.append(match.group(1).strip() if match else items)
         
-        columns = ['created_at', 'source', 'original_text', 'clean_text', 'polarity', 
-        'subjectivity', 'screen_name', 'language', 'retweet_count', 'friends_count', 
-        'hashtags', 'statuses', 'followers_count', 'user_mentions', 'possibly_sensitive', 
-        'favourites_count', 'location']
-
-        created_at = self.find_created_time()
-        source = self.find_source()
-        clean_text, text = self.find_full_text()
-        polarity, subjectivity = self.find_sentiments(clean_text)
-        screen_name = self.find_screen_name()
-        # original_author = self.find_author_name()
-        lang = self.find_lang()
-        retweet_count = self.find_retweet_count()
-        friends_count = self.find_friends_count()
-        hashtags = self.find_hashtags()
-        statuses_count = self.find_statuses_count()
-        followers_count = self.find_followers_count()
-        mentions = self.find_mentions()
-        location = self.find_location()
-        favourite = self.find_favourite_count();
-        sensitive = self.is_sensitive();
+        return source_name
+
+
+    def find_country(self)->list:
+        """
+        a function that resolves the free text user location into a country,
+        matching its comma separated parts against country and capital names.
+        returns a list of country names, None where nothing matched.
+        """
+        lookup = _country_lookup()
+        country = [] # list of resolved countries.
+        for items in self.get_column('location'):
+            found = None
+            for part in reversed(str(items or '').split(',')):
+                found = lookup.get(part.strip().lower(), None)
+                if found:
+                    break
+            country.append(found)
         
+        return country
+
+
+    def _find_sentiment_columns(self)->tuple:
+        return self.find_sentiments(self.get_column('clean_text'))
+
+
+    def get_column(self, name: str)->list:
+        """
+        a function that returns one extracted column, computing it (and the
+        columns it depends on) on first access. results are cached on the
+        extractor, so expensive columns like polarity are computed only once.
+        returns a list of values.
+        """
+        if name not in COLUMN_SOURCES:
+            raise ValueError(f"unknown column: {name}")
+        producer, index = COLUMN_SOURCES[name]
+        if producer not in self._computed:
+            self._computed[producer] = getattr(self, producer)()
+        result = self._computed[producer]
+        
+        return result if index is None else result[index]
+
+
+    def get_compact_df(self, columns=None)->tuple:
+        """
+        a function that splits the tweets into lightweight rows and the
+        distinct original tweets they retweet. Every original is scored
+        once, on its full text; a retweet row gets no text, references
+        its original through retweeted_id and copies the original's
+        polarity and subjectivity instead of re-scoring its copy.
+        columns selects the tweet frame columns (default: TWEET_DF_COLUMNS),
+        retweeted_id is always added.
+        returns the tweet frame and the original tweets frame (ORIGINAL_COLUMNS).
+        """
+        columns = list(columns) if columns is not None else list(TWEET_DF_COLUMNS)
+        if 'retweeted_id' not in columns:
+            columns.append('retweeted_id')
+        originals = TweetDfExtractor(self.find_retweeted_originals(), sentiment_backend=self.sentiment_backend,
+                                     sentiment_cache=self.sentiment_cache)
+        original_df = originals.get_tweet_df(columns=ORIGINAL_COLUMNS)
+
+        retweeted = self.get_column('retweeted_id')
+        if '_find_sentiment_columns' not in self._computed and ({'polarity', 'subjectivity'} & set(columns)):
+            scores = dict(zip(original_df['tweet_id'], zip(original_df['polarity'], original_df['subjectivity'])))
+            clean_text = self.get_column('clean_text')
+            own = [i for i, x in enumerate(retweeted) if x is None]
+            polarity, subjectivity = self.find_sentiments([clean_text[i] for i in own])
+            own_scores = dict(zip(own, zip(polarity, subjectivity)))
+            merged = [own_scores[i] if x is None else scores[x] for i, x in enumerate(retweeted)]
+            self._computed['_find_sentiment_columns'] = ([x[0] for x in merged], [x[1] for x in merged])
 
-        data = zip(created_at, source, text, clean_text, 
-        polarity, subjectivity, screen_name, lang, retweet_count,
-         friends_count, hashtags, statuses_count, followers_count, 
-         mentions, sensitive, favourite, location)
+        df = self.get_tweet_df(columns=columns)
+        is_retweet = np.array([x is not None for x in retweeted], dtype=bool)
+        for name in ('original_text', 'clean_text'):
+            if name in df.columns:
+                df[name] = df[name].where(~is_retweet, None)
+
+        return df, original_df
+
+
+    def get_user_df(self)->pd.DataFrame:
+        """
+        a function that builds the user dimension of the tweets: one row
+        (USER_COLUMNS) per author holding the profile as of the author's
+        latest tweet. updated_at is the created_at of that tweet as
+        'YYYY-MM-DD HH:MM:SS' UTC, so the loader can keep the newest
+        snapshot across batches by comparing it as text.
+        returns a dataframe with one row per user_id.
+        """
+        profile = [name for name in USER_COLUMNS if name != 'updated_at']
+        df = pd.DataFrame({name: self.get_column(name) for name in profile}, columns=profile)
+        df['user_id'] = pd.array(self.get_column('user_id'), dtype='Int64')
+        created = pd.to_datetime(pd.Series(self.get_column('created_at'), dtype=object),
+                                 format='%a %b %d %H:%M:%S %z %Y', utc=True, errors='coerce')
+        df['updated_at'] = created.values
+        df = df[df['user_id'].notna()]
+        # the stable sort keeps the later of two tweets created in the same second
+        df = df.sort_values('updated_at', kind='stable', na_position='first')
+        df = df.drop_duplicates('user_id', keep='last').astype({'user_id': 'int64'})
+        df['updated_at'] = df['updated_at'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+        return df.sort_values('user_id').reset_index(drop=True)
+
+          
+    def get_tweet_df(self, save=False, columns=None, memory_budget=None)->pd.DataFrame:
+        """
+        a function that inserts the extracted 
+        value lists for each variable into a dataframe. 
+        columns selects which columns to build (default: all of TWEET_DF_COLUMNS);
+        only those and their dependencies are computed.
+        memory_budget (bytes, or a size such as '512MB') builds the frame
+        chunk by chunk and spills chunks beyond the budget to disk; the
+        result is then a memory mapped Arrow table (see memory_budget.py).
+        returns a dataframe with the selected columns
+        """
+        if memory_budget is not None:
+            from memory_budget import collect, write_result
+            frames = (TweetDfExtractor(self.tweets_list[i:i + BUDGET_CHUNK_SIZE], None, self.sentiment_backend,
+                                       self.sentiment_cache).get_tweet_df(columns=columns)
+                      for i in range(0, len(self.tweets_list), BUDGET_CHUNK_SIZE))
+            df = collect(frames, memory_budget)
+            if save:
+                write_result(df, 'processed_tweet_data.csv')
+                print('File Successfully Saved.!!!')
+            return df
+        
+        columns = list(columns) if columns is not None else TWEET_DF_COLUMNS
+        data = {}
+        for name in columns:
+            data[name] = self.get_column(name)
+            if name in ID_COLUMNS:
+                # a float64 column would round ids beyond 2**53
+                data[name] = pd.array(data[name], dtype='Int64')
         df = pd.DataFrame(data=data, columns=columns)
+        # keep the row count when no column was selected
+        if not columns:
+            df = pd.DataFrame(index=range(len(self.tweets_list)))
 
         if save:
             df.to_csv('processed_tweet_data.csv', index=False)
@@ -279,13 +621,96 @@ class TweetDfExtractor:
         
         return df
 
+
+SENTIMENT_BACKENDS = ('textblob', 'lexicon')
+
+# tweets per chunk when get_tweet_df runs within a memory budget
+BUDGET_CHUNK_SIZE = 10000
+
+# columns get_tweet_df builds by default, in order
+TWEET_DF_COLUMNS = ['created_at', 'source', 'original_text', 'clean_text', 'polarity', 
+    'subjectivity', 'screen_name', 'language', 'retweet_count', 'friends_count', 
+    'hashtags', 'statuses', 'followers_count', 'user_mentions', 'possibly_sensitive', 
+    'favourites_count', 'location', 'tweet_id']
+
+# id columns, built as nullable integers so that missing ids keep the others exact
+ID_COLUMNS = ('tweet_id', 'user_id', 'retweeted_id')
+
+# columns of the user dimension built by get_user_df
+USER_COLUMNS = ['user_id', 'screen_name', 'followers_count', 'friends_count', 'statuses', 'favourites_count', 
+    'location', 'updated_at']
+
+# tweet columns left once the profile columns move to the user dimension;
+# screen_name and location stay since the author rollups and the dashboard
+# filters (fetch_page, distinct_values) read them from TweetInformation
+TWEET_FACT_COLUMNS = ['created_at', 'source', 'original_text', 'clean_text', 'polarity', 'subjectivity', 
+    'screen_name', 'language', 'retweet_count', 'hashtags', 'user_mentions', 'possibly_sensitive', 
+    'location', 'tweet_id', 'user_id']
+
+# columns of the original tweets frame of get_compact_df
+ORIGINAL_COLUMNS = ['tweet_id', 'created_at', 'screen_name', 'language', 'original_text', 'clean_text', 
+    'polarity', 'subjectivity', 'retweet_count']
+
+# column -> (extractor method producing it, index into a tuple result)
+COLUMN_SOURCES = {
+    'created_at': ('find_created_time', None),
+    'source': ('find_source', None),
+    'original_text': ('find_full_text', 1),
+    'clean_text': ('find_full_text', 0),
+    'polarity': ('_find_sentiment_columns', 0),
+    'subjectivity': ('_find_sentiment_columns', 1),
+    'screen_name': ('find_screen_name', None),
+    'user_id': ('find_user_id', None),
+    'language': ('find_lang', None),
+    'retweet_count': ('find_retweet_count', None),
+    'friends_count': ('find_friends_count', None),
+    'hashtags': ('find_hashtags', None),
+    'statuses': ('find_statuses_count', None),
+    'followers_count': ('find_followers_count', None),
+    'user_mentions': ('find_mentions', None),
+    'possibly_sensitive': ('is_sensitive', None),
+    'favourites_count': ('find_favourite_count', None),
+    'location': ('find_location', None),
+    'tweet_id': ('find_tweet_id', None),
+    'source_name': ('find_source_name', None),
+    'country': ('find_country', None),
+    'retweeted_id': ('find_retweeted_id', None),
+    'author_name': ('find_author_name', None),
+}
+
+_SOURCE_NAME = re.compile('>([^<]*)<')
+
+_COUNTRIES = None
+
+
+def _country_lookup()->dict:
+    """
+    lowercased country and capital names -> country name, built on first use.
+    """
+    global _COUNTRIES
+    if _COUNTRIES is None:
+        from countries_info import countries
+        _COUNTRIES = {}
+        for item in countries:
+            _COUNTRIES[item['capital'].lower()] = item['name']
+            _COUNTRIES[item['name'].lower()] = item['name']
+    return _COUNTRIES
+
                 
 if __name__ == "__main__":
     # required column to be generated you should be creative and add more features
     
-    _, tweet_list = read_json("../data/Economic_Twitter_Data.json")
+    # a directory or glob of dumps is extracted in parallel by batch_ingest
+    source = sys.argv[1] if len(sys.argv) > 1 else "../data/Economic_Twitter_Data.json"
+    if os.path.isdir(source) or glob.has_magic(source):
+        from batch_ingest import main as ingest_main
+        sys.exit(ingest_main(sys.argv[1:]))
+
+    _, tweet_list = read_json(source)
     tweet = TweetDfExtractor(tweet_list)
     tweet_df = tweet.get_tweet_df(True) 
+    tweet.find_hashtag_rows().to_csv('processed_hashtags.csv', index=False)
+    tweet.find_mention_rows().to_csv('processed_mentions.csv', index=False)
 
     # use all defined functions to generate a dataframe with the specified columns above
 
@@ -0,0 +1,34 @@
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    a stand-in for a module that is imported on first attribute access.
+    heavy dependencies (pandas, textblob, mysql, plotting libraries) are
+    bound through this at module level, so importing our modules and
+    starting a cli or worker does not pay for them until they are used.
+    """
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_module(name: str) -> LazyModule:
+    """
+    returns a lazily imported module, e.g. pd = lazy_module('pandas').
+    """
+    return LazyModule(name)
@@ -0,0 +1,209 @@
+"""
+a vectorised, batch version of TextBlob's PatternAnalyzer.
+
+the pattern en-sentiment lexicon TextBlob ships is loaded once into
+numpy arrays (polarity, subjectivity, intensity, is-modifier per word).
+A whole column of texts is tokenised at once like pattern does it
+(contractions split, so "isn't" is "is n ' t" and never a negation) and
+every token is mapped to its lexicon row in one hash-join, then the
+PatternAnalyzer rules are applied as array comparisons over the
+flattened tokens:
+
+- a known word preceded by a modifier ("very good") takes the modifier's
+  place and is scaled by its intensity,
+- a known word preceded by a negation ("not good", "not a good") has its
+  polarity multiplied by -0.5; the negation carries through the modifiers
+  to the word they modify ("not very good"), which is then scaled by the
+  inverse of the negated modifier's intensity,
+- modifiers and negations stay open across unknown words until pattern
+  would reset them, and a negation right after an -ly modifier ("really
+  not good") negates that modifier instead,
+- every "!" boosts the polarity of the last scored word before it by 1.25,
+- emoticons and "(!)" score like in pattern.
+
+per text scores are the mean over its scored words, summed with
+weighted bincounts (a sparse texts x tokens product). Scores match
+TextBlob within TOLERANCE mean absolute error on tweet text; most texts
+match exactly.
+"""
+from __future__ import annotations
+import re
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+VERSION = 'lexicon-2'
+
+TOLERANCE = 0.05 # documented mean absolute difference to TextBlob polarity/subjectivity
+
+NEGATIONS = ('no', 'not', "n't", 'never')
+
+# clitics pattern's tokenizer splits off before lowercasing; "n't" then
+# falls apart into "n ' t", so contractions are never negations
+CONTRACTIONS = ("'d", "'m", "'s", "'ll", "'re", "'ve", "n't")
+
+_LEXICON = None
+
+_SEP = '\x01' # separates texts in the joined column, tokenised as its own symbol
+
+
+class _Lexicon:
+    def __init__(self):
+        from textblob.en import sentiment as pattern
+        from textblob._text import EMOTICONS
+
+        if not len(pattern):
+            pattern.load()
+        words, rows = [], []
+        for word, senses in pattern.items():
+            p, s, i = senses[None]
+            words.append(word)
+            rows.append((p, s, i, any(pos in senses for pos in pattern.modifiers), False))
+        # emoticons and sarcasm are scored but never modified or negated
+        for (_, p), emoticons in EMOTICONS.items():
+            for e in emoticons:
+                if e.lower() not in words:
+                    words.append(e.lower())
+                    rows.append((p, 1.0, 1.0, False, True))
+        words.append('(!)')
+        rows.append((0.0, 1.0, 1.0, False, True))
+
+        table = np.array(rows, dtype=np.float64)
+        self.vocab = {w: k for k, w in enumerate(words)}
+        self.polarity = table[:, 0]
+        self.subjectivity = table[:, 1]
+        self.intensity = table[:, 2]
+        self.modifier = table[:, 3].astype(bool)
+        self.special = table[:, 4].astype(bool)
+
+        # entries with an apostrophe ("can't") or a space ("used to") never survive pattern's tokenizer
+        symbols = sorted((w for w in words if not w.isalnum() and not w.replace('-', '').isalnum()
+                          and "'" not in w.strip(":;'") and ' ' not in w), key=len, reverse=True)
+        pattern_text = '|'.join(re.escape(x) for x in symbols)
+        # like pattern, punctuation inside a word stays in it ("x.com", "good,bad"), quotes never do
+        self.token_re = re.compile(f"{pattern_text}|[^\\W_]+(?:(?:[^\\s\\w'\"‘’“”]|_)+[^\\W_]+)*|!+|[^\\w\\s]")
+
+
+def lexicon() -> _Lexicon:
+    """
+    the lexicon arrays, loaded on first use.
+    """
+    global _LEXICON
+    if _LEXICON is None:
+        _LEXICON = _Lexicon()
+    return _LEXICON
+
+
+def _shift(a, k: int, fill):
+    out = np.empty_like(a)
+    out[:k] = fill
+    out[k:] = a[:-k] if k else a
+    return out
+
+
+def score(texts) -> tuple:
+    """
+    scores a list (or series) of texts.
+    returns two float arrays, polarity in [-1, 1] and subjectivity in [0, 1].
+    """
+    lex = lexicon()
+    texts = ['' if x is None or x != x else str(x).replace(_SEP, ' ') for x in texts]
+    n_docs = len(texts)
+    if n_docs == 0:
+        return np.zeros(0), np.zeros(0)
+
+    # one regex pass over the whole column, texts separated by a marker token;
+    # contractions are split first, as pattern does ("isn't" -> "is n ' t")
+    joined = (' ' + _SEP + ' ').join(texts)
+    for contraction in CONTRACTIONS:
+        joined = joined.replace(contraction, ' ' + contraction)
+    flat = lex.token_re.findall(joined.lower())
+    if len(flat) == n_docs - 1:
+        return np.zeros(n_docs), np.zeros(n_docs)
+
+    # token properties are computed once per distinct token, then gathered
+    codes, uniques = pd.factorize(pd.Series(flat, dtype=object))
+    uniq = pd.Series(uniques, dtype=object)
+    sep = (uniques == _SEP)[codes]
+    doc = np.cumsum(sep)[~sep]
+    codes = codes[~sep]
+
+    ids = uniq.map(lex.vocab).to_numpy(dtype=np.float64)[codes]
+    known = ~np.isnan(ids)
+    ids = np.where(known, ids, 0).astype(np.int64)
+    special = known & lex.special[ids]
+    word = known & ~special
+    p = np.where(known, lex.polarity[ids], 0.0)
+    s = np.where(known, lex.subjectivity[ids], 0.0)
+    intensity = np.where(known, lex.intensity[ids], 1.0)
+    is_mod = word & lex.modifier[ids]
+    is_neg = uniq.isin(NEGATIONS).to_numpy()[codes]
+    size = uniq.str.len().to_numpy(dtype=np.int64)[codes]
+    ends_ly = is_mod & uniq.str.endswith('ly').to_numpy(dtype=bool)[codes]
+    bangs = np.where(uniq.str.fullmatch('!+').to_numpy(dtype=bool)[codes], size, 0)
+
+    # pattern's state machine: a modifier or negation stays open across
+    # unknown words until one resets it. Every token is compared with the
+    # previous known word of its text (pk) and the tokens in between.
+    idx = np.arange(len(codes))
+    prev = _shift(np.maximum.accumulate(np.where(word, idx, -1)), 1, -1)
+    prev = np.where((prev >= 0) & (doc[np.maximum(prev, 0)] == doc), prev, -1)
+    pk = np.maximum(prev, 0)
+
+    def between(flags, since):
+        # flagged tokens strictly between position since and each token
+        counts = np.cumsum(flags)
+        return _shift(counts, 1, 0) - counts[since]
+
+    # unknown words longer than two letters close a modifier; negations
+    # only close one that does not end in -ly, which takes them instead
+    longer = ~word & (size > 2)
+    m_open = (prev >= 0) & is_mod[pk] & (between(longer & ~is_neg, pk) == 0)
+    m_open &= ends_ly[pk] | (between(longer & is_neg, pk) == 0)
+    # a negation after an open -ly modifier ("really not") negates the modifier and is used up
+    taken = is_neg & m_open & ends_ly[pk]
+
+    # a negation lands on the next known word unless a word longer than one
+    # letter (quotes aside) comes first
+    stripped = uniq.str.strip("'").str.len().to_numpy(dtype=np.int64)[codes]
+    neg = _shift(np.maximum.accumulate(np.where(is_neg, idx, -1)), 1, -1)
+    neg = np.where((neg > prev) & (doc[np.maximum(neg, 0)] == doc), neg, -1)
+    closes_neg = ~word & ~is_neg & (stripped > 1)
+    neg_at = word & (neg >= 0) & ~taken[np.maximum(neg, 0)] & (between(closes_neg, np.maximum(neg, 0)) == 0)
+
+    # a modified word takes the place of the known word before it, scaled by
+    # its intensity, or by the inverse when that word was negated, as in pattern
+    modified = word & m_open
+    factor = np.where(neg_at[pk], 1.0 / intensity[pk], intensity[pk])
+    factor = np.where(modified, factor, 1.0)
+    p = np.clip(p * factor, -1.0, 1.0)
+    s = np.clip(s * factor, -1.0, 1.0)
+    scored = known.copy()
+    scored[prev[modified]] = False
+
+    # modifiers and the word they modify form one chain; a negation landing
+    # anywhere on it ("not very good", "really not good") negates the chain
+    chain = np.cumsum(word & ~modified)
+    chain_neg = np.bincount(np.concatenate([chain[neg_at], chain[pk[taken]]]), minlength=chain[-1] + 1) > 0
+    negated = scored & word & chain_neg[chain]
+
+    # exclamation marks boost the last scored word before them, however far back
+    last_known = np.maximum.accumulate(np.where(known, np.arange(len(known)), -1))
+    target = _shift(last_known, 1, -1)
+    bang = np.flatnonzero((bangs > 0) & (target >= 0))
+    bang = bang[doc[target[bang]] == doc[bang]]
+    if len(bang):
+        power = np.bincount(target[bang], weights=bangs[bang], minlength=len(p))
+        boost = power > 0
+        p[boost] = np.clip(p[boost] * 1.25 ** power[boost], -1.0, 1.0)
+
+    p = np.where(negated, p * -0.5, p)
+
+    count = np.bincount(doc[scored], minlength=n_docs)
+    polarity = np.bincount(doc[scored], weights=p[scored], minlength=n_docs)
+    subjectivity = np.bincount(doc[scored], weights=s[scored], minlength=n_docs)
+    denom = np.maximum(count, 1)
+
+    return polarity / denom, subjectivity / denom
@@ -0,0 +1,296 @@
+"""
+extracts and cleans tweets within a memory budget, spilling to disk.
+
+    python memory_budget.py ../data/Economic_Twitter_Data.json --memory-budget 512MB --out tweets.parquet
+    python memory_budget.py ../data/Economic_Twitter_Data.json --memory-budget 1GB --clean --out fintech.csv
+
+tweets are read and extracted chunk by chunk and the frames are kept in
+a SpillBuffer. Once the frames it holds reach the budget they are
+written to an uncompressed Arrow file in a spill directory and dropped,
+so a dump larger than the worker's memory is extracted instead of
+killing the process. When nothing had to be spilled the result is a
+plain dataframe; otherwise it is an Arrow table memory mapped from the
+spill files, which the OS pages in only as it is read (write it out,
+scan it with to_batches or convert the columns you need with to_pandas).
+The spill files stay on disk while the table maps them and are removed
+once it is released, so keep the table while you use batches sliced
+from it. Either way the hashtags and user_mentions lists come back as their
+text, as in the extracted csv.
+
+pyarrow is only imported once a spill happens or an Arrow/parquet file
+is written, so extractions that fit in the budget do not need it.
+
+the budget bounds the extracted columns held at once; a chunk of raw
+json and the frame being built from it come on top, so lower
+chunk_size on very small workers.
+"""
+from __future__ import annotations
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import weakref
+
+from lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
+
+_UNITS = {'': 1, 'B': 1, 'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30, 'TB': 1 << 40}
+
+
+def parse_size(size) -> int:
+    """
+    a function that reads a byte count such as 536870912, '512MB' or '1.5GB'.
+    returns the number of bytes.
+    """
+    if isinstance(size, (int, float)):
+        return int(size)
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)B?\s*', str(size).upper())
+    if match is None:
+        raise ValueError(f"not a size: {size!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2) + 'B' if match.group(2) else ''])
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """
+    returns the memory used by a frame, including the python strings of its object columns.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _flatten(df: pd.DataFrame) -> pd.DataFrame:
+    # the entity columns hold lists of dicts whose keys vary between tweets;
+    # spill them as the same text to_csv and the db loader store
+    text = {}
+    for name in df.columns:
+        if df[name].dtype == object:
+            values = df[name].dropna()
+            if len(values) and isinstance(values.iloc[0], (list, dict)):
+                text[name] = df[name].map(lambda v: str(v) if isinstance(v, (list, dict)) else v)
+    return df.assign(**text) if text else df
+
+
+class SpillBuffer:
+    """
+    collects frames within a memory budget. A frame that brings the
+    buffered frames to the budget has them all written to one Arrow file
+    in spill_dir (a temporary directory by default) and released.
+
+    use it as a context manager: leaving it removes the spill files,
+    unless a table returned by result() still maps them. Those files are
+    then removed once the last such table is released, so the table stays
+    readable after the buffer is closed, on Windows as well.
+    """
+    def __init__(self, memory_budget, spill_dir: str = None):
+        self.memory_budget = parse_size(memory_budget)
+        self._own_dir = spill_dir is None
+        self.spill_dir = tempfile.mkdtemp(prefix='tweets-spill-') if spill_dir is None else spill_dir
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self.frames = []
+        self.buffered = 0 # bytes of self.frames
+        self.peak = 0 # most bytes buffered at once
+        self.rows = 0
+        self.spills = [] # arrow file paths
+        self.spilled_rows = 0
+        self._mapped = 0 # tables returned by result() that are still alive
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, df: pd.DataFrame):
+        """
+        buffers a frame, spilling the buffer once it reaches the budget.
+        """
+        df = _flatten(df)
+        size = frame_bytes(df)
+        self.frames.append(df)
+        self.buffered += size
+        self.rows += len(df)
+        self.peak = max(self.peak, self.buffered)
+        if self.buffered >= self.memory_budget:
+            self.spill()
+
+    def spill(self):
+        """
+        writes the buffered frames to a new Arrow file and releases them.
+        """
+        if not self.frames:
+            return
+        import pyarrow as pa
+
+        schemas = [pa.Schema.from_pandas(df, preserve_index=False) for df in self.frames]
+        schema = pa.unify_schemas(schemas, promote_options='permissive')
+        path = os.path.join(self.spill_dir, f"spill-{len(self.spills):05d}.arrow")
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            while self.frames:
+                df = self.frames.pop(0)
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                self.spilled_rows += len(df)
+                del df
+        self.spills.append(path)
+        self.buffered = 0
+
+    def result(self):
+        """
+        returns the buffered rows as one dataframe when nothing was spilled,
+        otherwise every row as an Arrow table memory mapped from the spill files.
+        """
+        if not self.spills:
+            if not self.frames:
+                return pd.DataFrame()
+            return pd.concat(self.frames, ignore_index=True)
+        import pyarrow as pa
+
+        self.spill()
+        tables = [pa.ipc.open_file(pa.memory_map(path)).read_all() for path in self.spills]
+        schema = pa.unify_schemas([t.schema for t in tables], promote_options='permissive')
+        table = pa.concat_tables([t.cast(schema) for t in tables])
+        # the files are only removed once no returned table maps them
+        self._mapped += 1
+        weakref.finalize(table, self._unmap)
+        return table
+
+    def _unmap(self):
+        self._mapped -= 1
+        if self._closed:
+            self._remove()
+
+    def close(self):
+        """
+        removes the spill files, or leaves that to the release of the last
+        table result() mapped from them.
+        """
+        self.frames = []
+        self._closed = True
+        self._remove()
+
+    def _remove(self):
+        if self._mapped:
+            return
+        if self._own_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        else:
+            for path in self.spills:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    a function that runs the Clean_Tweets steps on one extracted frame.
+    """
+    from clean_tweets_dataframe import Clean_Tweets
+
+    cleaner = Clean_Tweets(df)
+    df = cleaner.drop_unwanted_column(df)
+    df = cleaner.drop_duplicate(df)
+    df = cleaner.convert_to_datetime(df)
+    df = cleaner.convert_to_numbers(df)
+    df = cleaner.remove_non_english_tweets(df)
+    return df
+
+
+def collect(frames, memory_budget, spill_dir: str = None):
+    """
+    a function that gathers an iterable of frames within memory_budget.
+    returns a dataframe, or a memory mapped Arrow table when frames were
+    spilled; its spill files are removed once the table is released.
+    """
+    with SpillBuffer(memory_budget, spill_dir) as buffer:
+        for df in frames:
+            buffer.add(df)
+        return buffer.result()
+
+
+def extract_within_budget(json_file: str, memory_budget, chunk_size: int = 10000, filters=None,
+                          columns: list = None, clean: bool = False, sentiment_backend: str = 'textblob',
+                          sentiment_cache=None, spill_dir: str = None):
+    """
+    a function that extracts (and with clean, cleans) a json dump chunk by
+    chunk, holding at most about memory_budget bytes of extracted columns.
+    returns a dataframe, or a memory mapped Arrow table when chunks were spilled.
+    """
+    from extract_dataframe import iter_json_chunks, TweetDfExtractor
+
+    def frames():
+        for tweets in iter_json_chunks(json_file, chunk_size):
+            df = TweetDfExtractor(tweets, filters, sentiment_backend, sentiment_cache).get_tweet_df(columns=columns)
+            yield clean_frame(df) if clean else df
+
+    return collect(frames(), memory_budget, spill_dir)
+
+
+def clean_within_budget(csv_file: str, memory_budget, chunk_size: int = 10000, spill_dir: str = None):
+    """
+    a function that cleans an extracted csv chunk by chunk within memory_budget.
+    returns a dataframe, or a memory mapped Arrow table when chunks were spilled.
+    """
+    frames = (clean_frame(df) for df in pd.read_csv(csv_file, chunksize=chunk_size))
+    return collect(frames, memory_budget, spill_dir)
+
+
+def write_result(result, out: str) -> int:
+    """
+    a function that writes a collected result to a csv, parquet or arrow
+    file, chosen by the extension of out. A spilled table is written one
+    record batch at a time.
+    returns the number of rows written.
+    """
+    if isinstance(result, pd.DataFrame) and not out.endswith(('.parquet', '.arrow', '.feather')):
+        _flatten(result).to_csv(out, index=False)
+        return len(result)
+    import pyarrow as pa
+
+    if isinstance(result, pd.DataFrame):
+        result = pa.Table.from_pandas(_flatten(result), preserve_index=False)
+
+    if out.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pq.write_table(result, out)
+    elif out.endswith(('.arrow', '.feather')):
+        with pa.OSFile(out, 'wb') as sink, pa.ipc.new_file(sink, result.schema) as writer:
+            writer.write_table(result)
+    else:
+        header = True
+        for batch in result.to_batches():
+            batch.to_pandas().to_csv(out, index=False, header=header, mode='w' if header else 'a')
+            header = False
+        if header:
+            result.slice(0, 0).to_pandas().to_csv(out, index=False)
+    return result.num_rows
+
+
+def main(argv=None) -> int:
+    from extract_dataframe import TweetFilter
+
+    parser = argparse.ArgumentParser(description='extract (and clean) a tweet dump within a memory budget')
+    parser.add_argument('json_file')
+    parser.add_argument('--memory-budget', default='1GB', help='e.g. 512MB; spill to disk beyond it')
+    parser.add_argument('--out', default='processed_tweet_data.parquet', help='.parquet, .arrow or .csv')
+    parser.add_argument('--clean', action='store_true', help='also run the Clean_Tweets steps')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--spill-dir', default=None, help='where to spill (default: a temporary directory)')
+    parser.add_argument('--columns', nargs='*', default=None, help='only build these columns')
+    parser.add_argument('--langs', nargs='*', default=None, help='keep only these languages')
+    parser.add_argument('--sentiment-backend', choices=['textblob', 'lexicon'], default='textblob')
+    parser.add_argument('--sentiment-cache', default=None, help='sqlite file of scores kept between runs')
+    args = parser.parse_args(argv)
+
+    filters = TweetFilter(langs=args.langs) if args.langs else None
+    result = extract_within_budget(args.json_file, args.memory_budget, args.chunk_size, filters, args.columns,
+                                   args.clean, args.sentiment_backend, args.sentiment_cache, args.spill_dir)
+    n = write_result(result, args.out)
+    print(f"{n} tweets written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
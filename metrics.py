@@ -0,0 +1,319 @@
+from __future__ import annotations
+import cProfile
+import functools
+import json
+import os
+import pstats
+import resource
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
+
+EXTRACTOR_METHODS = ['find_created_time', 'find_source', 'find_full_text', 'find_sentiments',
+                     'find_screen_name', 'find_lang', 'find_retweet_count', 'find_hashtags',
+                     'find_friends_count', 'find_statuses_count', 'find_followers_count',
+                     'find_mentions', 'find_tweet_id', 'find_hashtag_rows', 'find_mention_rows',
+                     'is_sensitive', 'find_location', 'find_favourite_count', 'find_source_name',
+                     'find_country', 'get_tweet_df']
+
+CLEANER_METHODS = ['drop_unwanted_column', 'drop_duplicate', 'convert_to_datetime',
+                   'convert_to_numbers', 'remove_non_english_tweets']
+
+DATABASE_FUNCTIONS = ['createDB', 'createTables', 'preprocess_df', 'insert_to_tweet_table',
+                      'bulk_insert', 'insert_tweet_batch', 'insert_entity_table', 'db_execute_fetch',
+                      'load_batch', 'update_rollups', 'insert_user_batch', 'insert_original_batch']
+
+
+def _rss_bytes() -> int:
+    """
+    current resident set size of the process. Falls back to the
+    peak rss from getrusage where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as fd:
+            return int(fd.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _count_rows(result) -> int:
+    """
+    number of rows in a stage result: the length of a frame or list,
+    the first element of a tuple of lists, or an int returned by a loader.
+    """
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, bool) or result is None:
+        return 0
+    if isinstance(result, int):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+class Metrics:
+    """
+    collects timings, row counts and peak memory per stage.
+
+    every finished call is kept as a record and, if a json lines path is
+    given, appended to that file as one json object. Peak memory is the
+    highest rss seen by a background sampler while the call was running.
+    Setting profile_stage captures cProfile or tracemalloc statistics
+    for every call of that one stage into profile_dir.
+    """
+    def __init__(self, jsonl_path: str = None, sample_interval: float = 0.01,
+                 profile_stage: str = None, profile_mode: str = 'cprofile', profile_dir: str = '.'):
+        if profile_mode not in ('cprofile', 'tracemalloc'):
+            raise ValueError(f"unknown profile mode: {profile_mode}")
+        self.jsonl_path = jsonl_path
+        self.sample_interval = sample_interval
+        self.profile_stage = profile_stage
+        self.profile_mode = profile_mode
+        self.profile_dir = profile_dir
+        self.records = []
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            rss = _rss_bytes()
+            with self._lock:
+                for span in self._spans.values():
+                    if rss > span['peak_rss']:
+                        span['peak_rss'] = rss
+
+    def start(self):
+        """
+        starts the memory sampler thread.
+        """
+        if self._sampler is None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name='metrics-sampler', daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        """
+        stops the memory sampler thread.
+        """
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _profile_path(self, stage: str, suffix: str) -> str:
+        return os.path.join(self.profile_dir, f"{stage}-{os.getpid()}-{len(self.records)}.{suffix}")
+
+    def timed(self, stage: str, func, *args, **kwargs):
+        """
+        calls func, recording it under the given stage name.
+        returns whatever func returns.
+        """
+        span = {'peak_rss': _rss_bytes()}
+        with self._lock:
+            self._spans[id(span)] = span
+
+        profiler = None
+        started_tracing = False # only stop tracemalloc if this call started it
+        if stage == self.profile_stage:
+            if self.profile_mode == 'cprofile':
+                profiler = cProfile.Profile()
+                profiler.enable()
+            elif not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            if stage == self.profile_stage:
+                if profiler is not None:
+                    profiler.disable()
+                    profiler.dump_stats(self._profile_path(stage, 'prof'))
+                else:
+                    snapshot = tracemalloc.take_snapshot()
+                    if started_tracing:
+                        tracemalloc.stop()
+                    with open(self._profile_path(stage, 'txt'), 'w') as fd:
+                        for stat in snapshot.statistics('lineno')[:50]:
+                            fd.write(f"{stat}\n")
+            with self._lock:
+                del self._spans[id(span)]
+            span['peak_rss'] = max(span['peak_rss'], _rss_bytes())
+
+        self.record(stage, seconds, _count_rows(result), span['peak_rss'])
+        return result
+
+    def record(self, stage: str, seconds: float, rows: int, peak_rss: int = 0):
+        """
+        stores one finished call and writes it to the json lines file.
+        """
+        rec = {'ts': time.time(), 'pid': os.getpid(), 'stage': stage,
+               'seconds': seconds, 'rows': rows, 'peak_rss': peak_rss}
+        with self._lock:
+            self.records.append(rec)
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a') as fd:
+                    fd.write(json.dumps(rec) + '\n')
+
+    def summary(self) -> pd.DataFrame:
+        """
+        returns one row per stage with calls, rows, total and mean
+        time, rows per second and peak rss.
+        """
+        columns = ['stage', 'calls', 'rows', 'total_s', 'mean_ms', 'rows_per_s', 'peak_rss_mb']
+        with self._lock:
+            df = pd.DataFrame(self.records, columns=['stage', 'seconds', 'rows', 'peak_rss'])
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        res = df.groupby('stage', sort=False).agg(calls=('seconds', 'size'), rows=('rows', 'sum'),
+                                                  total_s=('seconds', 'sum'), peak_rss=('peak_rss', 'max'))
+        res['mean_ms'] = res['total_s'] / res['calls'] * 1000
+        res['rows_per_s'] = (res['rows'] / res['total_s']).where(res['total_s'] > 0, 0.0)
+        res['peak_rss_mb'] = res['peak_rss'] / 2 ** 20
+        res = res.reset_index().sort_values('total_s', ascending=False)
+
+        return res[columns].round(3)
+
+    def prometheus_text(self) -> str:
+        """
+        returns the per-stage totals in the prometheus text exposition format.
+        """
+        df = self.summary()
+        series = [('tweet_stage_calls_total', 'counter', 'calls', 1),
+                  ('tweet_stage_rows_total', 'counter', 'rows', 1),
+                  ('tweet_stage_seconds_total', 'counter', 'total_s', 1),
+                  ('tweet_stage_peak_rss_bytes', 'gauge', 'peak_rss_mb', 2 ** 20)]
+        lines = []
+        for name, kind, column, scale in series:
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, value in zip(df['stage'], df[column]):
+                value = int(value * scale) if scale != 1 else value
+                lines.append(f'{name}{{stage="{stage}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def serve_prometheus(self, port: int) -> HTTPServer:
+        """
+        serves prometheus_text on http://0.0.0.0:port/metrics from a daemon thread.
+        returns the server, call shutdown() on it to stop.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode()
+                self.send_response(200 if self.path == '/metrics' else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('0.0.0.0', port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+
+def _wrap(metrics: Metrics, stage: str, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return metrics.timed(stage, func, *args, **kwargs)
+    wrapper.__wrapped_metrics__ = func
+    return wrapper
+
+
+def instrument_class(cls, methods: list, metrics: Metrics, prefix: str = None):
+    """
+    wraps the given methods of a class with metrics timers.
+    stages are named <prefix>.<method>, prefix defaulting to the class name.
+    """
+    prefix = prefix or cls.__name__
+    for name in methods:
+        func = getattr(cls, name, None)
+        if func is None:
+            continue
+        func = getattr(func, '__wrapped_metrics__', func)
+        setattr(cls, name, _wrap(metrics, f"{prefix}.{name}", func))
+
+
+def instrument_module(module, names: list, metrics: Metrics, prefix: str = None):
+    """
+    wraps the given functions of a module with metrics timers.
+    """
+    prefix = prefix or module.__name__
+    for name in names:
+        func = getattr(module, name, None)
+        if func is None:
+            continue
+        func = getattr(func, '__wrapped_metrics__', func)
+        setattr(module, name, _wrap(metrics, f"{prefix}.{name}", func))
+
+
+def uninstrument(target, names: list):
+    """
+    restores functions or methods wrapped by instrument_class/instrument_module.
+    """
+    for name in names:
+        func = getattr(target, name, None)
+        if func is not None and hasattr(func, '__wrapped_metrics__'):
+            setattr(target, name, func.__wrapped_metrics__)
+
+
+def instrument_pipeline(metrics: Metrics, modules: list = ()):
+    """
+    wraps every TweetDfExtractor.find_* method, every Clean_Tweets step
+    and the database_manager helpers. Modules that imported database helpers
+    by name (such as pipeline_runner) can be passed in modules so their
+    references are wrapped too; their stages still read database_manager.<name>.
+    only this process is instrumented: extraction running in worker
+    processes (pipeline_runner --extract-processes or --shards) is not timed.
+    """
+    import database_manager
+    from extract_dataframe import TweetDfExtractor
+    from clean_tweets_dataframe import Clean_Tweets
+
+    instrument_class(TweetDfExtractor, EXTRACTOR_METHODS, metrics)
+    instrument_class(Clean_Tweets, CLEANER_METHODS, metrics)
+    instrument_module(database_manager, DATABASE_FUNCTIONS, metrics, 'database_manager')
+    for module in modules:
+        instrument_module(module, DATABASE_FUNCTIONS, metrics, 'database_manager')
+
+    return metrics.start()
+
+
+def uninstrument_pipeline(metrics: Metrics, modules: list = ()):
+    """
+    undoes instrument_pipeline and stops the memory sampler.
+    """
+    import database_manager
+    from extract_dataframe import TweetDfExtractor
+    from clean_tweets_dataframe import Clean_Tweets
+
+    uninstrument(TweetDfExtractor, EXTRACTOR_METHODS)
+    uninstrument(Clean_Tweets, CLEANER_METHODS)
+    uninstrument(database_manager, DATABASE_FUNCTIONS)
+    for module in modules:
+        uninstrument(module, DATABASE_FUNCTIONS)
+    metrics.stop()
+
+
+def print_profile(path: str, limit: int = 30):
+    """
+    prints the top cumulative-time entries of a cProfile dump.
+    """
+    pstats.Stats(path).sort_stats('cumulative').print_stats(limit)
@@ -0,0 +1,470 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import collections
+import functools
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import lazy_module
+
+from extract_dataframe import iter_json_chunks, TweetDfExtractor, TweetFilter, TWEET_FACT_COLUMNS
+from clean_tweets_dataframe import Clean_Tweets
+from database_manager import DBConnect, load_batch
+from async_loader import AsyncTweetWriter, create_mysql_pool, in_thread
+from metrics import Metrics, instrument_pipeline, uninstrument_pipeline
+from dedup_index import open_index
+from sharded_reader import load_line_index, chunk_ranges, read_range, can_shard
+
+pd = lazy_module('pandas')
+
+_DONE = object() # end of stream marker passed between stages
+
+# the rows Clean_Tweets keeps anyway, checked before sentiment is computed
+CLEAN_FILTER = TweetFilter(langs={'en'}, start='2020-12-31')
+
+
+class StageStats:
+    """
+    throughput counters of one pipeline stage.
+    busy is the time spent doing work, wait the time blocked on the
+    neighbouring queues (starved upstream or backpressured downstream).
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.chunks = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.wait = 0.0
+
+    def as_dict(self) -> dict:
+        """
+        returns the counters and rows per busy second.
+        """
+        rate = self.rows / self.busy if self.busy else 0.0
+        return {'stage': self.name, 'chunks': self.chunks, 'rows': self.rows,
+                'busy_s': round(self.busy, 3), 'wait_s': round(self.wait, 3),
+                'rows_per_s': round(rate, 1)}
+
+
+def extract_chunk(tweets: list, filters=None, sentiment_backend: str = 'textblob',
+                  sentiment_cache: str = None, compact: bool = False, users: bool = False) -> tuple:
+    """
+    extracts one chunk of raw tweets, skipping those rejected by filters.
+    sentiment_cache is the path of a sentiment cache file, opened once per process.
+    with compact, retweets become rows pointing at their original
+    (see TweetDfExtractor.get_compact_df). with users, the tweet frame
+    keeps TWEET_FACT_COLUMNS and the profiles go to a user dimension.
+    returns the tweet frame, the exploded hashtag and mention frames, the
+    original tweets frame (None unless compact) and the user dimension
+    (None unless users).
+    """
+    extractor = TweetDfExtractor(tweets, filters, sentiment_backend, sentiment_cache)
+    columns = TWEET_FACT_COLUMNS if users else None
+    if compact:
+        df, originals = extractor.get_compact_df(columns=columns)
+    else:
+        df, originals = extractor.get_tweet_df(columns=columns), None
+    user_df = extractor.get_user_df() if users else None
+    return df, extractor.find_hashtag_rows(), extractor.find_mention_rows(), originals, user_df
+
+
+def clean_criteria(filters) -> tuple:
+    """
+    the languages and start date the clean steps keep for the filters
+    pushed into the extractor: those of a TweetFilter, nothing for no
+    filters, and the Clean_Tweets defaults for any other predicate.
+    returns langs and start, each None when not restricted.
+    """
+    if filters is None:
+        return None, None
+    if isinstance(filters, TweetFilter):
+        # as utc text, which compares with naive and aware created_at columns alike
+        start = None if filters.start is None else filters.start.strftime('%Y-%m-%d %H:%M:%S')
+        return filters.langs, start
+    return ('en',), '2020-12-31'
+
+
+def clean_chunk(chunk: tuple, filters=CLEAN_FILTER) -> tuple:
+    """
+    runs the Clean_Tweets steps on one extracted chunk and drops
+    entity rows of tweets that did not survive cleaning. The language
+    and date steps follow the filters the chunk was extracted with, so
+    they never drop rows those filters asked to keep.
+    """
+    df, hashtags, mentions, originals, users = chunk
+    langs, start = clean_criteria(filters)
+    cleaner = Clean_Tweets(df)
+    df = cleaner.drop_unwanted_column(df)
+    df = cleaner.drop_duplicate(df)
+    df = cleaner.convert_to_datetime(df, start)
+    df = cleaner.convert_to_numbers(df)
+    df = cleaner.remove_non_english_tweets(df, langs)
+
+    kept = set(df['tweet_id'])
+    hashtags = hashtags[hashtags['tweet_id'].isin(kept)]
+    mentions = mentions[mentions['tweet_id'].isin(kept)]
+    if originals is not None:
+        originals = originals[originals['tweet_id'].isin(set(df['retweeted_id'].dropna()))]
+    if users is not None:
+        users = users[users['user_id'].isin(set(df['user_id'].dropna()))]
+
+    return df, hashtags, mentions, originals, users
+
+
+class PipelineRunner:
+    """
+    runs read_json -> TweetDfExtractor -> Clean_Tweets -> loader as
+    threads connected by bounded queues, so decoding, sentiment and
+    db writes overlap. A full queue blocks the producing stage
+    (backpressure), keeping at most queue_size chunks in flight per hop.
+
+    connect is a callable returning an open db connection; it is
+    called once, inside the load thread. Alternatively async_pool is a
+    coroutine function returning an aiomysql style pool; the load stage
+    then keeps up to async_in_flight batches in flight over that pool.
+
+    filters are pushed down into the extractor; the default drops the
+    non english and pre 2020-12-31 tweets cleaning would remove anyway.
+    The clean stage keeps the languages and dates the filters keep.
+
+    with compact_retweets, each retweeted tweet is scored and stored once
+    in OriginalTweets and retweets are loaded without text, pointing at
+    it through retweeted_id. With user_dimension, author profiles are
+    upserted into Users and tweets only keep the user_id. With
+    dedup_index (the path of a dedup index file), tweets ingested by an
+    earlier run are dropped as they are read. Filters then run in the
+    read stage, so only tweets that pass them are recorded. Each chunk
+    is its own run of the index, committed right after its batch is
+    loaded; the chunks not loaded when a stage fails are forgotten, so
+    a rerun loads exactly those.
+
+    with shards, the read stage only splits a plain json lines file into
+    line aligned byte ranges of about chunk_size lines; a pool of that
+    many extract processes parses and extracts them, so decoding is no
+    longer bound to the read thread. Compressed files are read as usual.
+    """
+    def __init__(self, json_file: str, connect=None, chunk_size: int = 5000, queue_size: int = 4,
+                 extract_processes: int = 0, table_name: str = 'TweetInformation',
+                 async_pool=None, async_in_flight: int = 4, filters=CLEAN_FILTER,
+                 sentiment_backend: str = 'textblob', sentiment_cache: str = None,
+                 compact_retweets: bool = False, user_dimension: bool = False, dedup_index: str = None,
+                 shards: int = 0):
+        if shards and dedup_index is not None:
+            raise ValueError("shards and dedup_index cannot be combined: the dedup index checks tweets in file order")
+        self.json_file = json_file
+        self.shards = shards
+        self.dedup_index = dedup_index
+        self.compact_retweets = compact_retweets
+        self.user_dimension = user_dimension
+        self.filters = filters
+        self.sentiment_backend = sentiment_backend
+        self.sentiment_cache = sentiment_cache
+        self.connect = connect
+        self.async_pool = async_pool
+        self.async_in_flight = async_in_flight
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.extract_processes = extract_processes
+        self.table_name = table_name
+        self.stats = {name: StageStats(name) for name in ['read', 'extract', 'clean', 'load']}
+        self._stop = threading.Event()
+        self._errors = []
+        self._dedup = None
+        self._runs = collections.deque() # dedup run of each chunk read and not yet loaded, in order
+        self._open_runs = set() # dedup runs whose batch is not committed yet
+
+    def _put(self, q: queue.Queue, item, stats: StageStats) -> bool:
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                stats.wait += time.perf_counter() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+                stats.wait += time.perf_counter() - start
+                return item
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _run_stage(self, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _read(self, out_q: queue.Queue):
+        if self.shards and can_shard(self.json_file):
+            self._read_ranges(out_q)
+            return
+        stats = self.stats['read']
+        dedup = self._dedup
+        start = time.perf_counter()
+        for tweets in iter_json_chunks(self.json_file, self.chunk_size, dedup,
+                                       self.filters if dedup is not None else None):
+            if dedup is not None:
+                # the next chunk starts a new run
+                run = dedup.detach()
+                self._open_runs.add(run)
+                self._runs.append(run)
+            stats.busy += time.perf_counter() - start
+            stats.chunks += 1
+            stats.rows += len(tweets)
+            if not self._put(out_q, tweets, stats):
+                return
+            start = time.perf_counter()
+        self._put(out_q, _DONE, stats)
+
+    def _read_ranges(self, out_q: queue.Queue):
+        # the extract processes parse the ranges themselves
+        stats = self.stats['read']
+        start = time.perf_counter()
+        offsets = load_line_index(self.json_file)
+        ranges = chunk_ranges(offsets, self.chunk_size, self.shards)
+        stats.busy += time.perf_counter() - start
+        for first, last in ranges:
+            stats.chunks += 1
+            stats.rows += int(offsets.searchsorted(last) - offsets.searchsorted(first))
+            if not self._put(out_q, (first, last), stats):
+                return
+        self._put(out_q, _DONE, stats)
+
+    def _loaded(self, run: int):
+        # the chunk's tweets count as ingested once its batch is committed
+        if run is not None:
+            self._dedup.commit(run)
+            self._open_runs.discard(run)
+
+    def _extract(self, in_q: queue.Queue, out_q: queue.Queue):
+        stats = self.stats['extract']
+        # with a dedup index the read stage has applied the filters already
+        filters = self.filters if self._dedup is None else None
+        extract = functools.partial(extract_chunk, filters=filters, sentiment_backend=self.sentiment_backend,
+                                    sentiment_cache=self.sentiment_cache, compact=self.compact_retweets,
+                                    users=self.user_dimension)
+        sharded = self.shards and can_shard(self.json_file)
+        processes = self.shards if sharded else self.extract_processes
+        if not processes:
+            while True:
+                tweets = self._get(in_q, stats)
+                if tweets is _DONE:
+                    break
+                start = time.perf_counter()
+                chunk = extract(tweets)
+                stats.busy += time.perf_counter() - start
+                stats.chunks += 1
+                stats.rows += len(chunk[0])
+                if not self._put(out_q, chunk, stats):
+                    return
+            self._put(out_q, _DONE, stats)
+            return
+
+        # sentiment is cpu bound, so fan the chunks (or byte ranges, when
+        # sharded) out to processes while keeping their order and at most
+        # two chunks per process in flight
+        pending = []
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            done = False
+            while not done or pending:
+                while not done and len(pending) < 2 * processes:
+                    item = self._get(in_q, stats)
+                    if item is _DONE:
+                        done = True
+                        break
+                    if sharded:
+                        future = pool.submit(read_range, self.json_file, *item, extract)
+                    else:
+                        future = pool.submit(extract, item)
+                    pending.append((time.perf_counter(), future))
+                if not pending:
+                    break
+                submitted, future = pending.pop(0)
+                chunk = future.result()
+                stats.busy += time.perf_counter() - submitted
+                stats.chunks += 1
+                stats.rows += len(chunk[0])
+                if not self._put(out_q, chunk, stats):
+                    return
+        self._put(out_q, _DONE, stats)
+
+    def _clean(self, in_q: queue.Queue, out_q: queue.Queue):
+        stats = self.stats['clean']
+        while True:
+            chunk = self._get(in_q, stats)
+            if chunk is _DONE:
+                break
+            start = time.perf_counter()
+            chunk = clean_chunk(chunk, self.filters)
+            stats.busy += time.perf_counter() - start
+            stats.chunks += 1
+            stats.rows += len(chunk[0])
+            if not self._put(out_q, chunk, stats):
+                return
+        self._put(out_q, _DONE, stats)
+
+    async def _load_async(self, in_q: queue.Queue):
+        stats = self.stats['load']
+        pool = await self.async_pool()
+        writer = AsyncTweetWriter(pool, max_in_flight=self.async_in_flight, table_name=self.table_name)
+        start = time.perf_counter()
+        try:
+            while True:
+                chunk = await in_thread(self._get, in_q, stats)
+                if chunk is _DONE:
+                    break
+                run = self._runs.popleft() if self._dedup is not None else None
+                await writer.submit(*chunk, done=functools.partial(self._loaded, run))
+                stats.chunks += 1
+            await writer.drain()
+        finally:
+            pool.close()
+            await pool.wait_closed()
+        stats.rows = writer.rows
+        stats.busy = max(time.perf_counter() - start - stats.wait, 0.0)
+
+    def _load(self, in_q: queue.Queue):
+        if self.async_pool is not None:
+            asyncio.run(self._load_async(in_q))
+            return
+
+        stats = self.stats['load']
+        conn = self.connect()
+        try:
+            while True:
+                chunk = self._get(in_q, stats)
+                if chunk is _DONE:
+                    break
+                df, hashtags, mentions, originals, users = chunk
+                start = time.perf_counter()
+                load_batch(conn, df, hashtags, mentions, originals, users, self.table_name)
+                self._loaded(self._runs.popleft() if self._dedup is not None else None)
+                stats.busy += time.perf_counter() - start
+                stats.chunks += 1
+                stats.rows += len(df)
+        finally:
+            conn.close()
+
+    def run(self) -> pd.DataFrame:
+        """
+        runs all stages to completion.
+        returns a dataframe with the per-stage throughput stats.
+        raises the first stage error, if any.
+        """
+        raw_q = queue.Queue(maxsize=self.queue_size)
+        extracted_q = queue.Queue(maxsize=self.queue_size)
+        cleaned_q = queue.Queue(maxsize=self.queue_size)
+        if self.dedup_index is not None:
+            self._dedup = open_index(self.dedup_index)
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._read, raw_q), name='read'),
+            threading.Thread(target=self._run_stage, args=(self._extract, raw_q, extracted_q), name='extract'),
+            threading.Thread(target=self._run_stage, args=(self._clean, extracted_q, cleaned_q), name='clean'),
+            threading.Thread(target=self._run_stage, args=(self._load, cleaned_q), name='load'),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if self._dedup is not None:
+            # the run of trailing chunks that held only duplicates, then the chunks never loaded
+            self._dedup.abandon()
+            for run in self._open_runs:
+                self._dedup.forget(run)
+            self._open_runs.clear()
+            self._runs.clear()
+        if self._errors:
+            raise self._errors[0]
+
+        return pd.DataFrame([s.as_dict() for s in self.stats.values()])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='stream a tweet json dump into the database')
+    parser.add_argument('json_file', help='path of the tweets json file')
+    parser.add_argument('--db', default='tweets', help='mysql database name')
+    parser.add_argument('--table', default='TweetInformation')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--queue-size', type=int, default=4, help='max chunks waiting between two stages')
+    parser.add_argument('--extract-processes', type=int, default=0,
+                        help='run extraction in this many processes (0 = in the extract thread)')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='parse and extract a plain json lines file as byte ranges in this many processes')
+    parser.add_argument('--async-connections', type=int, default=0,
+                        help='load through an aiomysql pool of this size with as many batches in flight (0 = one blocking connection)')
+    parser.add_argument('--sentiment-backend', choices=['textblob', 'lexicon'], default='textblob')
+    parser.add_argument('--sentiment-cache', default=None, help='sqlite file of scores kept between runs')
+    parser.add_argument('--compact-retweets', action='store_true',
+                        help='score and store each retweeted tweet once, in OriginalTweets')
+    parser.add_argument('--user-dimension', action='store_true',
+                        help='store author profiles once per user in Users instead of in every tweet row')
+    parser.add_argument('--dedup-index', default=None,
+                        help='sqlite file of the tweets already ingested; they are skipped when read again')
+    parser.add_argument('--langs', nargs='*', default=['en'], help='languages to keep')
+    parser.add_argument('--start', default='2020-12-31', help='keep tweets created on or after this date')
+    parser.add_argument('--end', default=None, help='keep tweets created before this date')
+    parser.add_argument('--sensitive', choices=['yes', 'no'], default=None, help='keep only (non) sensitive tweets')
+    parser.add_argument('--min-followers', type=int, default=None)
+    parser.add_argument('--metrics', action='store_true',
+                        help='time every extractor, cleaner and database step and print a summary table')
+    parser.add_argument('--metrics-jsonl', default=None, help='also append one json line per timed call to this file')
+    parser.add_argument('--prometheus-port', type=int, default=None, help='serve /metrics in prometheus text format')
+    parser.add_argument('--profile-stage', default=None,
+                        help='capture a profile of this stage, e.g. TweetDfExtractor.find_sentiments')
+    parser.add_argument('--profile-mode', choices=['cprofile', 'tracemalloc'], default='cprofile')
+    args = parser.parse_args(argv)
+
+    metrics = None
+    if args.metrics or args.metrics_jsonl or args.prometheus_port or args.profile_stage:
+        metrics = Metrics(jsonl_path=args.metrics_jsonl, profile_stage=args.profile_stage,
+                          profile_mode=args.profile_mode)
+        instrument_pipeline(metrics, modules=[sys.modules[__name__]])
+        if args.prometheus_port:
+            metrics.serve_prometheus(args.prometheus_port)
+
+    sensitive = None if args.sensitive is None else args.sensitive == 'yes'
+    filters = TweetFilter(langs=args.langs or None, start=args.start, end=args.end,
+                          sensitive=sensitive, min_followers=args.min_followers)
+
+    async_pool = None
+    if args.async_connections:
+        async_pool = lambda: create_mysql_pool(args.db, args.async_connections)
+
+    runner = PipelineRunner(args.json_file, lambda: DBConnect(args.db)[0], chunk_size=args.chunk_size,
+                            queue_size=args.queue_size, extract_processes=args.extract_processes,
+                            table_name=args.table, async_pool=async_pool,
+                            async_in_flight=max(args.async_connections, 1), filters=filters,
+                            sentiment_backend=args.sentiment_backend, sentiment_cache=args.sentiment_cache,
+                            compact_retweets=args.compact_retweets, user_dimension=args.user_dimension,
+                            dedup_index=args.dedup_index, shards=args.shards)
+    try:
+        stats = runner.run()
+    finally:
+        if metrics is not None:
+            uninstrument_pipeline(metrics, modules=[sys.modules[__name__]])
+    print(stats.to_string(index=False))
+    if args.dedup_index:
+        index = open_index(args.dedup_index)
+        print(f"{index.dropped} tweets already ingested were skipped")
+    if metrics is not None:
+        print(metrics.summary().to_string(index=False))
+        processes = args.shards or args.extract_processes
+        if processes:
+            print(f"extractor steps ran in {processes} worker processes and are not timed above")
+
+
+if __name__ == "__main__":
+    main()
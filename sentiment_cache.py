@@ -0,0 +1,278 @@
+"""
+a persistent polarity/subjectivity cache shared by runs and processes.
+
+    python sentiment_cache.py warm ../data/Economic_Twitter_Data.json --cache sentiment.sqlite --backend lexicon
+    python sentiment_cache.py export --cache sentiment.sqlite --out sentiment_cache.csv
+    python sentiment_cache.py stats --cache sentiment.sqlite
+
+scores live in a sqlite file keyed by a 16 byte blake2b hash of the
+backend version and the whitespace normalised text, so a text is scored
+once per backend version however many times it is re-read, retweeted or
+re-extracted by another worker. The file runs in WAL mode: any number of
+processes read while one writes, and writers wait on the busy timeout
+instead of failing. Inserts are INSERT OR IGNORE since two processes
+scoring the same text store the same values.
+
+the cache is bounded by max_entries. Rows remember when they were last
+used (refreshed at most every touch_after seconds, so hits rarely write)
+and the least recently used rows are evicted once the bound is exceeded.
+Each instance keeps a running row count, recounted after RECOUNT_AFTER
+inserts to pick up rows other processes added, so writes do not scan
+the table.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+MAX_ENTRIES = 5_000_000
+
+TOUCH_AFTER = 3600 # seconds before a hit refreshes the row's last used time
+
+_BATCH = 500 # keys per lookup query, below sqlite's host parameter limit
+
+RECOUNT_AFTER = 100_000 # inserted rows before the running row count is checked against the table
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment (
+    key BLOB PRIMARY KEY,
+    version TEXT NOT NULL,
+    polarity REAL NOT NULL,
+    subjectivity REAL NOT NULL,
+    used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sentiment_used ON sentiment (used);
+"""
+
+_OPEN = {} # (pid, path) -> SentimentCache, see open_cache
+
+
+def backend_version(backend: str) -> str:
+    """
+    a function that returns the version string cache keys are built with,
+    so scores of another backend or another release never collide.
+    """
+    if backend == 'lexicon':
+        import lexicon_sentiment
+        return lexicon_sentiment.VERSION
+    if backend == 'textblob':
+        from importlib.metadata import version
+        return f"textblob-{version('textblob')}"
+    raise ValueError(f"unknown sentiment backend: {backend}")
+
+
+def normalise(text) -> str:
+    """
+    a function that collapses runs of whitespace, the only change to a
+    text that no backend's score depends on.
+    """
+    if text is None or text != text:
+        return ''
+    return ' '.join(str(text).split())
+
+
+def cache_key(text, version: str) -> bytes:
+    """
+    returns the 16 byte key of a text under a backend version.
+    """
+    data = f"{version}\x00{normalise(text)}".encode('utf-8', 'surrogatepass')
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class SentimentCache:
+    """
+    the sqlite backed cache. One instance may be shared between threads;
+    processes each open their own (see open_cache).
+    """
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES, touch_after: int = TOUCH_AFTER):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_after = touch_after
+        self.hits = 0
+        self.misses = 0
+        self._count = None # rows in the table as far as this instance knows, see put_many
+        self._since_count = 0 # rows inserted since _count was last read from the table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+    def get_many(self, keys: list) -> dict:
+        """
+        looks up keys, refreshing the last used time of stale hits.
+        returns {key: (polarity, subjectivity)} for the keys found.
+        """
+        now = int(time.time())
+        found, stale = {}, []
+        with self._lock:
+            for i in range(0, len(keys), _BATCH):
+                batch = keys[i:i + _BATCH]
+                marks = ', '.join('?' * len(batch))
+                for key, p, s, used in self._conn.execute(
+                        f"SELECT key, polarity, subjectivity, used FROM sentiment WHERE key IN ({marks})", batch):
+                    found[key] = (p, s)
+                    if now - used >= self.touch_after:
+                        stale.append((now, key))
+            if stale:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._conn.executemany("UPDATE sentiment SET used = ? WHERE key = ?", stale)
+
+        return found
+
+    def put_many(self, version: str, items: list):
+        """
+        stores (key, polarity, subjectivity) items in one transaction,
+        then evicts the least recently used rows above max_entries.
+        """
+        if not items:
+            return
+        now = int(time.time())
+        rows = [(key, version, float(p), float(s), now) for key, p, s in items]
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            inserted = self._conn.executemany("INSERT OR IGNORE INTO sentiment VALUES (?, ?, ?, ?, ?)",
+                                              rows).rowcount
+            self._since_count += inserted
+            if self._count is not None and self._since_count < RECOUNT_AFTER:
+                self._count += inserted
+            if self._count is None or self._since_count >= RECOUNT_AFTER or self._count > self.max_entries:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+                self._since_count = 0
+            excess = self._count - self.max_entries
+            if excess > 0:
+                self._count -= self._conn.execute("DELETE FROM sentiment WHERE key IN "
+                                                  "(SELECT key FROM sentiment ORDER BY used LIMIT ?)",
+                                                  (excess,)).rowcount
+
+    def score(self, texts: list, version: str, scorer) -> tuple:
+        """
+        scores texts through the cache. Only the distinct texts missing
+        from the cache are passed to scorer, which must return two
+        sequences (polarity, subjectivity); their scores are stored.
+        returns two lists of polarity and subjectivity in the order of texts.
+        """
+        keys = [cache_key(x, version) for x in texts]
+        found = self.get_many(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self.hits += len(keys) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            polarity, subjectivity = scorer(list(missing.values()))
+            items = [(key, p, s) for key, p, s in zip(missing, polarity, subjectivity)]
+            self.put_many(version, items)
+            found.update((key, (p, s)) for key, p, s in items)
+
+        return [found[key][0] for key in keys], [found[key][1] for key in keys]
+
+    def export(self, out) -> int:
+        """
+        writes the cache as csv (hex key, version, polarity, subjectivity, used).
+        returns the number of rows written.
+        """
+        import csv
+
+        writer = csv.writer(out)
+        writer.writerow(['key', 'version', 'polarity', 'subjectivity', 'used'])
+        n = 0
+        with self._lock:
+            for key, version, p, s, used in self._conn.execute("SELECT * FROM sentiment ORDER BY used"):
+                writer.writerow([key.hex(), version, p, s, used])
+                n += 1
+        return n
+
+    def stats(self) -> dict:
+        """
+        returns the number of rows per backend version and the file size.
+        """
+        with self._lock:
+            versions = dict(self._conn.execute("SELECT version, COUNT(*) FROM sentiment GROUP BY version"))
+        return {'path': self.path, 'bytes': os.path.getsize(self.path), 'versions': versions}
+
+
+def open_cache(path: str, max_entries: int = MAX_ENTRIES) -> SentimentCache:
+    """
+    a function that returns this process's cache for path, opening it
+    on first use. Pipelines pass the path to their worker processes and
+    every worker keeps one connection for all its chunks.
+    """
+    key = (os.getpid(), os.path.abspath(path))
+    if key not in _OPEN:
+        _OPEN[key] = SentimentCache(path, max_entries)
+    return _OPEN[key]
+
+
+def warm(json_file: str, cache: SentimentCache, backend: str = 'textblob', chunk_size: int = 5000) -> int:
+    """
+    a function that scores every tweet of a json dump into the cache,
+    using the same clean_text the extractor scores.
+    returns the number of tweets read.
+    """
+    from extract_dataframe import iter_json_chunks, TweetDfExtractor
+
+    n = 0
+    for tweets in iter_json_chunks(json_file, chunk_size):
+        extractor = TweetDfExtractor(tweets, sentiment_backend=backend, sentiment_cache=cache)
+        extractor.find_sentiments(extractor.find_full_text()[0])
+        n += len(tweets)
+    return n
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='persistent sentiment score cache')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('warm', help='score a json dump into the cache')
+    p.add_argument('json_file')
+    p.add_argument('--backend', choices=['textblob', 'lexicon'], default='textblob')
+    p.add_argument('--chunk-size', type=int, default=5000)
+
+    p = sub.add_parser('export', help='write the cache as csv')
+    p.add_argument('--out', default=None, help='csv path, stdout by default')
+
+    sub.add_parser('stats', help='rows per backend version')
+
+    for p in sub.choices.values():
+        p.add_argument('--cache', default='sentiment_cache.sqlite')
+        p.add_argument('--max-entries', type=int, default=MAX_ENTRIES)
+    args = parser.parse_args(argv)
+
+    cache = SentimentCache(args.cache, args.max_entries)
+    try:
+        if args.command == 'warm':
+            n = warm(args.json_file, cache, args.backend, args.chunk_size)
+            print(f"{n} tweets scored: {cache.hits} cache hits, {cache.misses} new texts")
+        elif args.command == 'export':
+            if args.out:
+                with open(args.out, 'w', newline='') as fd:
+                    n = cache.export(fd)
+                print(f"{n} rows written to {args.out}")
+            else:
+                cache.export(sys.stdout)
+        else:
+            print(cache.stats())
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
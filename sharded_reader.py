@@ -0,0 +1,187 @@
+from __future__ import annotations
+import collections
+import json
+import mmap
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+BLOCK_SIZE = 64 * 2 ** 20 # bytes scanned per step while indexing
+
+
+def _index_path(json_file: str) -> str:
+    return json_file + '.idx.npz'
+
+
+def build_line_index(json_file: str, save: bool = True) -> np.ndarray:
+    """
+    a function that finds the byte offset of every line of a json lines file.
+    the file is memory mapped and scanned for newlines in blocks, so the
+    index of a very large file is built without reading it into memory.
+    returns an int64 array of line start offsets followed by the file size,
+    so line i spans offsets[i]:offsets[i + 1].
+    """
+    size = os.path.getsize(json_file)
+    starts = [np.zeros(1, dtype=np.int64)]
+    if size:
+        with open(json_file, 'rb') as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = np.frombuffer(mm, dtype=np.uint8)
+            for pos in range(0, size, BLOCK_SIZE):
+                newlines = np.flatnonzero(buf[pos:pos + BLOCK_SIZE] == 10)
+                starts.append(newlines.astype(np.int64) + pos + 1)
+            del buf
+    offsets = np.concatenate(starts)
+    # a trailing newline does not start another line
+    if offsets[-1] != size:
+        offsets = np.append(offsets, size)
+
+    if save:
+        stat = os.stat(json_file)
+        np.savez(_index_path(json_file), offsets=offsets, size=stat.st_size, mtime=stat.st_mtime_ns)
+
+    return offsets
+
+
+def load_line_index(json_file: str) -> np.ndarray:
+    """
+    a function that loads the persisted line index of a file,
+    rebuilding it when missing or when the file changed since.
+    returns the line offsets as in build_line_index.
+    """
+    path = _index_path(json_file)
+    if os.path.exists(path):
+        stat = os.stat(json_file)
+        with np.load(path) as saved:
+            if int(saved['size']) == stat.st_size and int(saved['mtime']) == stat.st_mtime_ns:
+                return saved['offsets']
+    return build_line_index(json_file)
+
+
+def split_ranges(offsets: np.ndarray, n: int) -> list:
+    """
+    a function that splits a file into at most n line aligned byte ranges
+    of about equal size.
+    returns a list of (start, end) byte offsets.
+    """
+    size = int(offsets[-1])
+    if size == 0:
+        return []
+    targets = np.linspace(0, size, n + 1)[1:-1]
+    cuts = np.unique(offsets[np.searchsorted(offsets, targets)])
+    bounds = [0] + [int(x) for x in cuts if 0 < x < size] + [size]
+
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def chunk_ranges(offsets: np.ndarray, chunk_size: int, n: int = 1) -> list:
+    """
+    a function that splits a file into line aligned byte ranges of about
+    chunk_size lines each, and at least n of them.
+    returns a list of (start, end) byte offsets.
+    """
+    lines = len(offsets) - 1
+    return split_ranges(offsets, max(n, -(-lines // chunk_size)))
+
+
+def can_shard(json_file: str) -> bool:
+    """
+    a function that tells whether a dump can be read by byte ranges:
+    compressed dumps cannot, they are only read from the start.
+    """
+    from compressed_input import detect_compression
+
+    return detect_compression(json_file) is None
+
+
+def read_range(json_file: str, start: int, end: int, func=None):
+    """
+    a function that parses the tweets in one line aligned byte range.
+    the file is memory mapped, so workers reading different ranges share the
+    page cache and only the bytes of each line are copied for decoding.
+    returns the list of tweets, or func(tweets) when func is given.
+    """
+    tweets = []
+    with open(json_file, 'rb') as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = start
+        while pos < end:
+            nl = mm.find(b'\n', pos, end)
+            stop = end if nl == -1 else nl
+            if stop > pos:
+                line = mm[pos:stop]
+                if line.strip():
+                    tweets.append(json.loads(line))
+            pos = stop + 1
+
+    return func(tweets) if func is not None else tweets
+
+
+def iter_parallel(json_file: str, workers: int = None, func=None, chunk_size: int = None):
+    """
+    a function that parses a json lines file across worker processes and
+    yields the per-range results in file order as they complete. Without
+    chunk_size there is one range per worker; with it, ranges of about
+    chunk_size lines, at most two per worker in flight, so memory stays
+    bounded however large the file. func is as in parallel_read.
+    """
+    workers = workers or os.cpu_count() or 1
+    offsets = load_line_index(json_file)
+    ranges = split_ranges(offsets, workers) if chunk_size is None else chunk_ranges(offsets, chunk_size, workers)
+    if workers == 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield read_range(json_file, start, end, func)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        try:
+            for start, end in ranges:
+                pending.append(pool.submit(read_range, json_file, start, end, func))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # a consumer that stops early does not wait for the ranges it never takes
+            for future in pending:
+                future.cancel()
+
+
+def parallel_read(json_file: str, workers: int = None, func=None) -> list:
+    """
+    a function that parses a json lines file across worker processes,
+    one line aligned byte range per worker. func, if given, runs inside the
+    worker on each range's tweets (it must be a picklable top level function),
+    so only its result is sent back.
+    returns the per-range results in file order.
+    """
+    return list(iter_parallel(json_file, workers, func))
+
+
+def read_lines(json_file: str, line_numbers: list, offsets: np.ndarray = None) -> list:
+    """
+    a function that reads tweets by their line number without scanning the file.
+    returns the list of tweets in the order of line_numbers.
+    """
+    offsets = load_line_index(json_file) if offsets is None else offsets
+    tweets = []
+    with open(json_file, 'rb') as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in line_numbers:
+            tweets.append(json.loads(mm[int(offsets[i]):int(offsets[i + 1])]))
+
+    return tweets
+
+
+def sample(json_file: str, k: int, seed: int = None) -> list:
+    """
+    a function that draws k random tweets from the file without replacement.
+    returns the list of sampled tweets in file order.
+    """
+    offsets = load_line_index(json_file)
+    n_lines = len(offsets) - 1
+    lines = sorted(random.Random(seed).sample(range(n_lines), min(k, n_lines)))
+
+    return read_lines(json_file, lines, offsets)
@@ -0,0 +1,465 @@
+"""
+mergeable, serialisable sketches for tweet streams too large to group exactly.
+
+    python sketches.py ../data/Economic_Twitter_Data.json --processes 4 --out tweets.sketch
+
+- HyperLogLog counts distinct users and hashtags in 2**p bytes,
+  with a relative standard error of 1.04 / sqrt(2**p) (less while
+  the count is small next to 2**p and linear counting is used).
+- CountMinSketch counts authors and hashtags in depth x width counters
+  and keeps the heaviest values as candidates. A count overestimates the
+  true one by at most e / width * total, with probability 1 - exp(-depth).
+- TDigest keeps about compression / 2 centroids of follower counts and
+  polarity; quantiles are most precise in the tails and report the rank
+  error of the centroid they fall in.
+
+every sketch is updated with whole numpy arrays, merged with another of
+the same parameters (merge(a, b) is the sketch of both streams), and
+round-trips through to_bytes/from_bytes, so workers sketch their chunks
+and the parent merges what they send back.
+"""
+from __future__ import annotations
+import argparse
+import io
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+
+def _hash(values) -> np.ndarray:
+    """
+    stable 64 bit hashes of values, equal across processes and runs.
+    """
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(s))
+        n += s * big
+        x = np.where(big, x >> np.uint64(s), x)
+    return n + (x > 0)
+
+
+def _dump(**arrays) -> bytes:
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def _load(data: bytes) -> dict:
+    with np.load(io.BytesIO(data), allow_pickle=False) as saved:
+        return {name: saved[name] for name in saved.files}
+
+
+class HyperLogLog:
+    """
+    distinct count estimator with 2**p registers.
+    """
+    def __init__(self, p: int = 14):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    def add_many(self, values):
+        """
+        adds an array of values; repeated values change nothing.
+        """
+        if len(values) == 0:
+            return
+        h = _hash(values)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64(2 ** (64 - self.p) - 1)
+        rho = (64 - self.p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, idx, rho.astype(np.uint8))
+
+    def merge(self, other: HyperLogLog) -> HyperLogLog:
+        if other.p != self.p:
+            raise ValueError("cannot merge HyperLogLogs of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def _estimate(self) -> tuple:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # linear counting while most registers are empty
+            n = m * math.log(m / zeros)
+            t = n / m
+            return n, math.sqrt(m * (math.exp(t) - t - 1)) / n if n else 0.0
+        return float(raw), 1.04 / math.sqrt(m)
+
+    def estimate(self) -> float:
+        return self._estimate()[0]
+
+    def summary(self) -> dict:
+        """
+        returns the estimate with its relative standard error and a
+        three sigma interval.
+        """
+        n, err = self._estimate()
+        return {'estimate': round(n), 'relative_error': round(err, 5),
+                'low': math.floor(n * (1 - 3 * err)), 'high': math.ceil(n * (1 + 3 * err))}
+
+    def to_bytes(self) -> bytes:
+        return _dump(kind=np.array('hll'), p=np.array(self.p), registers=self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> HyperLogLog:
+        saved = _load(data)
+        sketch = cls(int(saved['p']))
+        sketch.registers = saved['registers']
+        return sketch
+
+
+class CountMinSketch:
+    """
+    frequency estimator with depth rows of width counters, plus the
+    capacity values with the highest estimates seen so far (heavy hitters).
+    """
+    def __init__(self, width: int = 2 ** 14, depth: int = 5, capacity: int = 100):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        self.candidates = np.array([], dtype=str)
+
+    def _columns(self, values) -> np.ndarray:
+        # depth hash functions from one 64 bit hash (Kirsch-Mitzenmacher)
+        h = _hash(values)
+        h1 = h & np.uint64(0xffffffff)
+        h2 = (h >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def add_many(self, values):
+        """
+        counts an array of values, then refreshes the heavy hitter candidates.
+        """
+        if len(values) == 0:
+            return
+        counts = pd.Series(np.asarray(values, dtype=object)).astype(str).value_counts()
+        cols = self._columns(counts.index)
+        for row in range(self.depth):
+            np.add.at(self.table[row], cols[row], counts.to_numpy())
+        self.total += int(counts.sum())
+        self._keep_heaviest(np.concatenate([self.candidates, counts.index.to_numpy(dtype=str)]))
+
+    def _keep_heaviest(self, values: np.ndarray):
+        values = np.unique(values)
+        if len(values) > self.capacity:
+            estimates = self.estimate(values)
+            values = values[np.argsort(-estimates, kind='stable')[:self.capacity]]
+        self.candidates = values.astype(str)
+
+    def estimate(self, values) -> np.ndarray:
+        """
+        returns the estimated counts of values, never below the true counts.
+        """
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int64)
+        cols = self._columns(np.asarray(values, dtype=object).astype(str))
+        return self.table[np.arange(self.depth)[:, None], cols].min(axis=0)
+
+    def merge(self, other: CountMinSketch) -> CountMinSketch:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge count-min sketches of different shape")
+        self.table += other.table
+        self.total += other.total
+        self._keep_heaviest(np.concatenate([self.candidates, other.candidates]))
+        return self
+
+    @property
+    def error(self) -> float:
+        """
+        the largest overestimate of any count, with probability confidence.
+        """
+        return math.e / self.width * self.total
+
+    @property
+    def confidence(self) -> float:
+        return 1 - math.exp(-self.depth)
+
+    def heavy_hitters(self, k: int = 10) -> pd.DataFrame:
+        """
+        returns the k values with the highest estimates, their estimated
+        count and the lower bound count - error of the true count.
+        """
+        estimates = self.estimate(self.candidates)
+        order = np.argsort(-estimates, kind='stable')[:k]
+        error = self.error
+        return pd.DataFrame({'value': self.candidates[order], 'count': estimates[order],
+                             'low': np.maximum(estimates[order] - error, 0).round().astype(np.int64)})
+
+    def to_bytes(self) -> bytes:
+        return _dump(kind=np.array('cms'), shape=np.array([self.width, self.depth, self.capacity, self.total]),
+                     table=self.table, candidates=self.candidates)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> CountMinSketch:
+        saved = _load(data)
+        width, depth, capacity, total = (int(x) for x in saved['shape'])
+        sketch = cls(width, depth, capacity)
+        sketch.table = saved['table']
+        sketch.total = total
+        sketch.candidates = saved['candidates']
+        return sketch
+
+
+class TDigest:
+    """
+    quantile estimator keeping weighted centroids, small near the tails.
+    centroids are merged with the arcsine scale function, so each spans
+    at most one unit of k(q) = compression / (2 pi) * asin(2q - 1).
+    """
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q - 1)
+        _, bins = np.unique(np.floor(k - k[0]), return_inverse=True)
+        self.weights = np.bincount(bins, weights=weights)
+        self.means = np.bincount(bins, weights=weights * means) / self.weights
+
+    def add_many(self, values):
+        """
+        adds an array of numbers, ignoring missing values.
+        """
+        v = np.asarray(values, dtype=np.float64)
+        v = v[~np.isnan(v)]
+        if not len(v):
+            return
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        self._compress(np.concatenate([self.means, v]), np.concatenate([self.weights, np.ones(len(v))]))
+
+    def merge(self, other: TDigest) -> TDigest:
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _positions(self) -> tuple:
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return (np.concatenate([[0.0], centers, [self.count]]),
+                np.concatenate([[self.min], self.means, [self.max]]))
+
+    def quantile(self, q) -> np.ndarray:
+        """
+        returns the estimated values at quantiles q (a number or array in [0, 1]).
+        """
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan)
+        positions, values = self._positions()
+        return np.interp(np.asarray(q, dtype=np.float64) * self.count, positions, values)
+
+    def rank_error(self, q) -> np.ndarray:
+        """
+        returns the bound on |estimated rank - q| at quantiles q: half the
+        weight share of the centroid the quantile falls in.
+        """
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan)
+        edges = np.cumsum(self.weights)
+        idx = np.minimum(np.searchsorted(edges, np.asarray(q) * self.count), len(edges) - 1)
+        return self.weights[idx] / self.count / 2
+
+    def quantiles(self, qs=(0.01, 0.25, 0.5, 0.75, 0.99)) -> pd.DataFrame:
+        qs = np.asarray(qs, dtype=np.float64)
+        return pd.DataFrame({'q': qs, 'value': self.quantile(qs), 'rank_error': self.rank_error(qs)})
+
+    def to_bytes(self) -> bytes:
+        return _dump(kind=np.array('tdigest'), params=np.array([self.compression, self.min, self.max]),
+                     means=self.means, weights=self.weights)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> TDigest:
+        saved = _load(data)
+        compression, low, high = saved['params']
+        sketch = cls(int(compression))
+        sketch.min, sketch.max = float(low), float(high)
+        sketch.means, sketch.weights = saved['means'], saved['weights']
+        return sketch
+
+
+_KINDS = {'hll': HyperLogLog, 'cms': CountMinSketch, 'tdigest': TDigest}
+
+
+def loads(data: bytes):
+    """
+    a function that rebuilds any sketch from its to_bytes output.
+    """
+    return _KINDS[str(_load(data)['kind'])].from_bytes(data)
+
+
+class TweetSketches:
+    """
+    the sketches of one tweet stream: distinct users and hashtags,
+    top authors and hashtags, follower count and polarity quantiles.
+    """
+    SKETCHES = ['users', 'hashtags', 'authors', 'hashtag_counts', 'followers', 'polarity']
+
+    def __init__(self, p: int = 14, width: int = 2 ** 14, depth: int = 5, capacity: int = 100,
+                 compression: int = 200):
+        self.users = HyperLogLog(p)
+        self.hashtags = HyperLogLog(p)
+        self.authors = CountMinSketch(width, depth, capacity)
+        self.hashtag_counts = CountMinSketch(width, depth, capacity)
+        self.followers = TDigest(compression)
+        self.polarity = TDigest(compression)
+        self.tweets = 0
+
+    def update(self, df: pd.DataFrame, hashtags: pd.DataFrame = None) -> TweetSketches:
+        """
+        adds one chunk: a get_tweet_df frame (screen_name, followers_count,
+        polarity columns, whichever are present) and its find_hashtag_rows.
+        """
+        self.tweets += len(df)
+        if 'screen_name' in df.columns:
+            names = df['screen_name'].dropna().to_numpy()
+            self.users.add_many(names)
+            self.authors.add_many(names)
+        if 'followers_count' in df.columns:
+            self.followers.add_many(pd.to_numeric(df['followers_count'], errors='coerce'))
+        if 'polarity' in df.columns:
+            self.polarity.add_many(pd.to_numeric(df['polarity'], errors='coerce'))
+        if hashtags is not None and len(hashtags):
+            tags = hashtags['tag'].to_numpy()
+            self.hashtags.add_many(tags)
+            self.hashtag_counts.add_many(tags)
+        return self
+
+    def merge(self, other: TweetSketches) -> TweetSketches:
+        for name in self.SKETCHES:
+            getattr(self, name).merge(getattr(other, name))
+        self.tweets += other.tweets
+        return self
+
+    def to_bytes(self) -> bytes:
+        parts = {name: np.frombuffer(getattr(self, name).to_bytes(), dtype=np.uint8) for name in self.SKETCHES}
+        return _dump(tweets=np.array(self.tweets), **parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> TweetSketches:
+        saved = _load(data)
+        sketches = cls()
+        for name in cls.SKETCHES:
+            setattr(sketches, name, loads(saved[name].tobytes()))
+        sketches.tweets = int(saved['tweets'])
+        return sketches
+
+    def report(self, k: int = 10, qs=(0.01, 0.25, 0.5, 0.75, 0.99)) -> dict:
+        """
+        returns every result with its error bound: distinct counts with
+        three sigma intervals, top k authors and hashtags with the lower
+        bound of their counts, and quantiles with their rank error.
+        """
+        return {'tweets': self.tweets,
+                'distinct_users': self.users.summary(),
+                'distinct_hashtags': self.hashtags.summary(),
+                'top_authors': self.authors.heavy_hitters(k),
+                'top_hashtags': self.hashtag_counts.heavy_hitters(k),
+                'count_error': {'authors': round(self.authors.error, 2),
+                                'hashtags': round(self.hashtag_counts.error, 2),
+                                'confidence': round(self.authors.confidence, 4)},
+                'followers_quantiles': self.followers.quantiles(qs),
+                'polarity_quantiles': self.polarity.quantiles(qs)}
+
+
+SKETCH_COLUMNS = ['screen_name', 'followers_count', 'polarity']
+
+
+def sketch_chunk(tweets: list, filters=None, sentiment_backend: str = 'textblob') -> bytes:
+    """
+    a function that sketches one chunk of raw tweets.
+    returns the serialised TweetSketches, small enough to send between processes.
+    """
+    from extract_dataframe import TweetDfExtractor
+
+    extractor = TweetDfExtractor(tweets, filters, sentiment_backend)
+    df = extractor.get_tweet_df(columns=SKETCH_COLUMNS)
+    return TweetSketches().update(df, extractor.find_hashtag_rows()).to_bytes()
+
+
+def sketch_file(json_file: str, chunk_size: int = 5000, processes: int = 0, filters=None,
+                sentiment_backend: str = 'textblob') -> TweetSketches:
+    """
+    a function that streams a tweet dump through TweetDfExtractor chunk by
+    chunk, sketching each chunk (in worker processes when processes > 0)
+    and merging the results, so memory does not grow with the dump.
+    returns the merged TweetSketches.
+    """
+    from extract_dataframe import iter_json_chunks
+
+    merged = TweetSketches()
+    chunks = iter_json_chunks(json_file, chunk_size)
+    if not processes:
+        for tweets in chunks:
+            merged.merge(TweetSketches.from_bytes(sketch_chunk(tweets, filters, sentiment_backend)))
+        return merged
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = []
+        for tweets in chunks:
+            pending.append(pool.submit(sketch_chunk, tweets, filters, sentiment_backend))
+            if len(pending) >= 2 * processes:
+                merged.merge(TweetSketches.from_bytes(pending.pop(0).result()))
+        for future in pending:
+            merged.merge(TweetSketches.from_bytes(future.result()))
+    return merged
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='sketch a tweet dump: distinct counts, top values, quantiles')
+    parser.add_argument('json_file', nargs='+', help='tweet dumps, or saved sketches with --merge')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--processes', type=int, default=0)
+    parser.add_argument('--sentiment-backend', choices=['textblob', 'lexicon'], default='textblob')
+    parser.add_argument('--merge', action='store_true', help='merge saved sketch files instead of reading dumps')
+    parser.add_argument('--out', default=None, help='save the merged sketches to this file')
+    parser.add_argument('-k', type=int, default=10, help='number of top authors/hashtags')
+    args = parser.parse_args(argv)
+
+    merged = TweetSketches()
+    for path in args.json_file:
+        if args.merge:
+            with open(path, 'rb') as fd:
+                merged.merge(TweetSketches.from_bytes(fd.read()))
+        else:
+            merged.merge(sketch_file(path, args.chunk_size, args.processes,
+                                     sentiment_backend=args.sentiment_backend))
+
+    for name, value in merged.report(args.k).items():
+        print(f"{name}:\n{value}\n" if isinstance(value, pd.DataFrame) else f"{name}: {value}")
+    if args.out:
+        with open(args.out, 'wb') as fd:
+            fd.write(merged.to_bytes())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
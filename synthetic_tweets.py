@@ -0,0 +1,139 @@
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+WORDS = {
+    'en': ['inflation', 'prices', 'war', 'economy', 'is', 'rising', 'good', 'bad', 'terrible', 'great',
+           'not', 'very', 'the', 'market', 'today', 'energy', 'gas', 'happy', 'sad', 'crisis'],
+    'de': ['die', 'Inflation', 'steigt', 'Preise', 'sind', 'hoch', 'Krieg', 'Energie', 'heute', 'schlecht'],
+    'fr': ['les', 'prix', 'augmentent', 'guerre', 'inflation', 'marché', 'énergie', 'mauvais', 'bon'],
+    'es': ['los', 'precios', 'suben', 'guerra', 'inflación', 'mercado', 'energía', 'malo', 'bueno'],
+    'am': ['ዋጋ', 'ጦርነት', 'ኢኮኖሚ', 'ዛሬ', 'ገበያ'],
+}
+
+HASHTAGS = ['Inflation', 'Ukraine', 'Russia', 'Economy', 'Energy', 'Gas', 'Prices', 'Fed', 'Oil', 'Markets']
+
+SOURCES = ['<a href="http://twitter.com/download/android" rel="nofollow">Twitter for Android</a>',
+           '<a href="http://twitter.com/download/iphone" rel="nofollow">Twitter for iPhone</a>',
+           '<a href="https://mobile.twitter.com" rel="nofollow">Twitter Web App</a>']
+
+LOCATIONS = ['', '', 'Deutschland', 'London, England', 'New York', 'Addis Ababa, Ethiopia', 'Paris']
+
+DEFAULT_LANGS = {'en': 0.6, 'de': 0.2, 'fr': 0.08, 'es': 0.07, 'am': 0.05}
+
+START = datetime(2022, 4, 1, tzinfo=timezone.utc)
+
+
+def _twitter_time(dt: datetime) -> str:
+    return dt.strftime('%a %b %d %H:%M:%S +0000 %Y')
+
+
+class SyntheticTweets:
+    """
+    deterministic generator of tweets shaped like the twitter v1.1 json
+    that TweetDfExtractor reads. The same seed and parameters always
+    produce the same tweets, so benchmark inputs are reproducible.
+
+    retweet_ratio is the share of tweets that are 'RT @...' retweets with
+    a retweeted_status; langs maps language codes to their share.
+    """
+    def __init__(self, seed: int = 42, retweet_ratio: float = 0.6, langs: dict = None,
+                 n_users: int = 5000, sensitive_ratio: float = 0.05):
+        self.seed = seed
+        self.retweet_ratio = retweet_ratio
+        self.langs = langs or DEFAULT_LANGS
+        self.n_users = n_users
+        self.sensitive_ratio = sensitive_ratio
+
+    def _user(self, uid: int) -> dict:
+        # user profiles depend only on the user id so they stay consistent across tweets
+        urng = random.Random(self.seed * 1000003 + uid)
+        return {'id': uid, 'id_str': str(uid), 'screen_name': f'user_{uid}',
+                'followers_count': int(urng.paretovariate(1.2) * 10),
+                'friends_count': urng.randint(0, 2000), 'statuses_count': urng.randint(1, 100000),
+                'favourites_count': urng.randint(0, 50000), 'location': urng.choice(LOCATIONS)}
+
+    def _text(self, rng: random.Random, lang: str) -> tuple:
+        words = rng.choices(WORDS[lang], k=rng.randint(5, 18))
+        tags = rng.sample(HASHTAGS, k=rng.choice([0, 0, 1, 1, 2, 3]))
+        text = ' '.join(words)
+        hashtags = []
+        for tag in tags:
+            start = len(text) + 1
+            text += f' #{tag}'
+            hashtags.append({'text': tag, 'indices': [start, start + len(tag) + 1]})
+        return text, hashtags
+
+    def tweets(self, n: int):
+        """
+        yields n tweet dicts.
+        """
+        rng = random.Random(self.seed)
+        langs, weights = list(self.langs), list(self.langs.values())
+        for i in range(n):
+            tweet_id = 1500000000000000000 + i
+            lang = rng.choices(langs, weights)[0]
+            user = self._user(rng.randrange(self.n_users))
+            created = START + timedelta(seconds=i * 7 + rng.randrange(7))
+            text, hashtags = self._text(rng, lang)
+            tweet = {'created_at': _twitter_time(created), 'id': tweet_id, 'id_str': str(tweet_id),
+                     'source': rng.choice(SOURCES), 'lang': lang, 'user': user,
+                     'retweet_count': 0, 'favorite_count': rng.randint(0, 50),
+                     'entities': {'hashtags': hashtags, 'user_mentions': []}}
+            if rng.random() < self.sensitive_ratio:
+                tweet['possibly_sensitive'] = True
+            elif rng.random() < 0.5:
+                tweet['possibly_sensitive'] = False
+
+            if rng.random() < self.retweet_ratio:
+                # retweets of a small pool of popular originals, like real dumps
+                orig_no = rng.randrange(max(n // 20, 1))
+                orig_id = 1400000000000000000 + orig_no
+                orig_rng = random.Random(self.seed * 7919 + orig_no)
+                orig_user = self._user(orig_rng.randrange(self.n_users))
+                orig_text, orig_tags = self._text(orig_rng, lang)
+                mention = {'screen_name': orig_user['screen_name'], 'name': orig_user['screen_name'],
+                           'id': orig_user['id'], 'id_str': orig_user['id_str'],
+                           'indices': [3, 4 + len(orig_user['screen_name'])]}
+                tweet['text'] = f"RT @{orig_user['screen_name']}: {orig_text}"[:140]
+                tweet['retweet_count'] = orig_rng.randint(1, 5000)
+                tweet['entities'] = {'hashtags': orig_tags, 'user_mentions': [mention]}
+                tweet['retweeted_status'] = {
+                    'created_at': _twitter_time(START - timedelta(seconds=orig_no)), 'id': orig_id,
+                    'id_str': str(orig_id), 'text': orig_text, 'lang': lang, 'source': SOURCES[0],
+                    'user': orig_user, 'retweet_count': tweet['retweet_count'],
+                    'entities': {'hashtags': orig_tags, 'user_mentions': []}}
+            else:
+                tweet['text'] = text
+            yield tweet
+
+    def write_jsonl(self, path: str, n: int) -> str:
+        """
+        writes n tweets to path, one json object per line.
+        returns the path.
+        """
+        with open(path, 'w') as fd:
+            for tweet in self.tweets(n):
+                fd.write(json.dumps(tweet) + '\n')
+        return path
+
+
+def _parse_langs(text: str) -> dict:
+    langs = {}
+    for item in text.split(','):
+        code, share = item.split('=')
+        langs[code.strip()] = float(share)
+    return langs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='write a deterministic synthetic tweet dump')
+    parser.add_argument('path')
+    parser.add_argument('-n', type=int, default=1000, help='number of tweets')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--retweet-ratio', type=float, default=0.6)
+    parser.add_argument('--langs', type=_parse_langs, default=None, help='e.g. en=0.6,de=0.3,am=0.1')
+    args = parser.parse_args()
+
+    SyntheticTweets(seed=args.seed, retweet_ratio=args.retweet_ratio, langs=args.langs).write_jsonl(args.path, args.n)
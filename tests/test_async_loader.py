@@ -0,0 +1,76 @@
+import unittest
+import asyncio
+import sqlite3
+import tempfile
+import sys, os
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from async_loader import SqlitePool, AsyncTweetWriter, load_batches
+
+
+def make_batch(start, n):
+    df = pd.DataFrame({'tweet_id': list(range(start, start + n)), 'clean_text': ['some text'] * n,
+                       'polarity': [0.1] * n})
+    hashtags = pd.DataFrame({'tweet_id': [start], 'tag': ['inflation'], 'position': [0]})
+    return df, hashtags, hashtags.iloc[0:0]
+
+
+class TestAsyncLoader(unittest.TestCase):
+    """
+		A class for unit-testing the concurrent batch writer
+		against the sqlite pool stand-in.
+	"""
+
+    def setUp(self):
+        fd, self.db_file = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_file)
+        conn.execute('CREATE TABLE TweetInformation (tweet_id INTEGER PRIMARY KEY, clean_text, polarity)')
+        conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        conn.execute('CREATE TABLE TweetMentions (tweet_id, screen_name, position)')
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        os.remove(self.db_file)
+
+    def count(self, table):
+        conn = sqlite3.connect(self.db_file)
+        n = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        conn.close()
+        return n
+
+    def test_load_batches(self):
+        async def run():
+            pool = SqlitePool(self.db_file, size=3)
+            try:
+                return await load_batches(pool, [make_batch(i * 10, 10) for i in range(8)], max_in_flight=3)
+            finally:
+                pool.close()
+
+        self.assertEqual(asyncio.run(run()), 80)
+        self.assertEqual(self.count('TweetInformation'), 80)
+        self.assertEqual(self.count('TweetHashtags'), 8)
+
+    def test_failed_batch_is_rolled_back(self):
+        async def run():
+            pool = SqlitePool(self.db_file, size=2)
+            writer = AsyncTweetWriter(pool, max_in_flight=2)
+            try:
+                await writer.write(*make_batch(0, 5))
+                # same tweet ids again violate the primary key
+                await writer.write(*make_batch(0, 5))
+            finally:
+                pool.close()
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            asyncio.run(run())
+        self.assertEqual(self.count('TweetInformation'), 5)
+        self.assertEqual(self.count('TweetHashtags'), 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import gzip
+import shutil
+import tempfile
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+import pandas as pd
+
+from synthetic_tweets import SyntheticTweets
+from batch_ingest import discover, ingest, read_manifest, MANIFEST
+
+
+class TestBatchIngest(unittest.TestCase):
+    """
+		A class for unit-testing the parallel multi-file ingestion
+		and its resumable manifest.
+	"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.dir, 'dumps')
+        self.out = os.path.join(self.dir, 'processed')
+        os.makedirs(os.path.join(self.src, 'late'))
+        self.sizes = {'a': 120, 'b': 40, 'c': 80}
+        for i, (name, n) in enumerate(self.sizes.items()):
+            SyntheticTweets(seed=i).write_jsonl(os.path.join(self.src, f'{name}.json'), n)
+        with open(os.path.join(self.src, 'c.json'), 'rb') as f, \
+                gzip.open(os.path.join(self.src, 'late', 'd.json.gz'), 'wb') as g:
+            shutil.copyfileobj(f, g)
+        open(os.path.join(self.src, 'notes.txt'), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_discover(self):
+        files = [os.path.basename(p) for p, _ in discover(self.src)]
+        self.assertEqual(files, ['a.json', 'c.json', 'b.json', 'd.json.gz'])
+        self.assertEqual(len(discover(os.path.join(self.src, '*.json'))), 3)
+
+    def test_ingest_and_resume(self):
+        results = ingest(self.src, self.out, processes=2, chunk_size=25, sentiment_backend='lexicon')
+        self.assertEqual(sorted(results['tweets']), [40, 80, 80, 120])
+        self.assertEqual(len(read_manifest(self.out)), 4)
+
+        outputs = [p for entry in read_manifest(self.out).values() for p in entry['outputs']]
+        self.assertTrue(all(os.path.exists(os.path.join(self.out, p)) for p in outputs))
+        self.assertFalse([p for p in outputs if p.endswith('.part')])
+        tweets = pd.concat(pd.read_csv(os.path.join(self.out, p)) for p in outputs if p.startswith('tweets'))
+        self.assertEqual(len(tweets), 320)
+        day = next(p for p in outputs if p.startswith('tweets')).split(os.sep)[1]
+        self.assertRegex(day, r'^day=\d{4}-\d{2}-\d{2}$')
+
+        # only new or changed files are extracted again
+        self.assertEqual(len(ingest(self.src, self.out, processes=1)), 0)
+        SyntheticTweets(seed=9).write_jsonl(os.path.join(self.src, 'b.json'), 10)
+        rerun = ingest(self.src, self.out, processes=1, sentiment_backend='lexicon')
+        self.assertEqual(rerun['tweets'].tolist(), [10])
+        outputs = [p for entry in read_manifest(self.out).values() for p in entry['outputs']]
+        tweets = pd.concat(pd.read_csv(os.path.join(self.out, p)) for p in outputs if p.startswith('tweets'))
+        self.assertEqual(len(tweets), 290)
+        written = [os.path.relpath(os.path.join(root, name), self.out) for root, _, names in os.walk(self.out)
+                   for name in names if name != MANIFEST]
+        self.assertEqual(sorted(written), sorted(outputs))
+        with open(os.path.join(self.out, MANIFEST)) as fd:
+            self.assertEqual(len(fd.readlines()), 5)
+
+    def test_failed_file_keeps_siblings(self):
+        with open(os.path.join(self.src, 'broken.json'), 'w') as f:
+            f.write('{"id": 1, "text": \n')
+        for processes in (2, 1):
+            with self.assertRaises(ValueError):
+                ingest(self.src, self.out, processes=processes, chunk_size=25, sentiment_backend='lexicon')
+            manifest = read_manifest(self.out)
+            self.assertEqual(sorted(os.path.basename(p) for p in manifest),
+                             ['a.json', 'b.json', 'c.json', 'd.json.gz'])
+
+
+if __name__ == '__main__':
+	unittest.main()
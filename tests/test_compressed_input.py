@@ -0,0 +1,61 @@
+import unittest
+import bz2
+import gzip
+import tempfile
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import read_json, iter_json_chunks
+from compressed_input import detect_compression, open_tweet_file
+from synthetic_tweets import SyntheticTweets
+
+
+class TestCompressedInput(unittest.TestCase):
+    """
+		A class for unit-testing reading of compressed tweet dumps.
+	"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.json_file = SyntheticTweets(seed=5).write_jsonl(os.path.join(self.dir, 'tweets.json'), 200)
+        with open(self.json_file, 'rb') as fd:
+            data = fd.read()
+        with gzip.open(self.json_file + '.gz', 'wb') as fd:
+            fd.write(data)
+        with bz2.open(self.json_file + '.bz2', 'wb') as fd:
+            fd.write(data)
+        self.expected = read_json(self.json_file)
+
+    def test_detect_compression(self):
+        self.assertIsNone(detect_compression(self.json_file))
+        self.assertEqual(detect_compression(self.json_file + '.gz'), 'gzip')
+        self.assertEqual(detect_compression(self.json_file + '.bz2'), 'bz2')
+
+    def test_read_json(self):
+        self.assertEqual(read_json(self.json_file + '.gz'), self.expected)
+        self.assertEqual(read_json(self.json_file + '.bz2'), self.expected)
+
+    def test_iter_json_chunks(self):
+        chunks = list(iter_json_chunks(self.json_file + '.gz', 64))
+        self.assertEqual([len(c) for c in chunks], [64, 64, 64, 8])
+
+    def test_threaded_matches_inline(self):
+        with open_tweet_file(self.json_file + '.gz', threaded=True) as fd:
+            threaded = fd.read()
+        with open_tweet_file(self.json_file + '.gz', threaded=False) as fd:
+            inline = fd.read()
+        self.assertEqual(threaded, inline)
+
+    def test_zstd(self):
+        try:
+            import zstandard
+        except ImportError:
+            self.skipTest('zstandard not installed')
+        with open(self.json_file, 'rb') as fd, open(self.json_file + '.zst', 'wb') as out:
+            out.write(zstandard.ZstdCompressor().compress(fd.read()))
+        self.assertEqual(read_json(self.json_file + '.zst'), self.expected)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+import database_manager
+import dashboard_data
+from benchmarks.bench_dashboard import run, seed_database, standin, WIDGETS
+
+
+class TestDashboardLoad(unittest.TestCase):
+    """
+		A class for unit-testing the dashboard load-test harness
+		on a small sqlite stand-in.
+	"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir = tempfile.mkdtemp()
+        cls.db_file = os.path.join(cls.workdir, 'tweets.db')
+        cls.loaded = seed_database(cls.db_file, 300, seed=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.db_file)
+        os.rmdir(cls.workdir)
+
+    def test_seeded(self):
+        self.assertEqual(self.loaded, 300)
+        with standin(self.db_file):
+            counts = database_manager.language_counts('tweets')
+        self.assertEqual(counts['tweet_count'].sum(), 300)
+
+    def test_data_functions(self):
+        # the functions dashboard_manager renders and the harness times
+        with standin(self.db_file):
+            self.assertEqual(dashboard_data.language_share()['Tweet_count'].sum(), 300)
+            df, total, _ = dashboard_data.table_page(0, 25, dashboard_data.DEFAULT_VIEW_COLUMNS)
+            self.assertEqual((len(df), total), (25, 300))
+            self.assertLessEqual(len(dashboard_data.author_ranking(5)), 5)
+            self.assertEqual(dashboard_data.sentiment_timeline()['tweet_count'].sum(), 300)
+
+    def test_standin_restores_dbconnect(self):
+        original = database_manager.DBConnect
+        with standin(self.db_file):
+            self.assertIsNot(database_manager.DBConnect, original)
+        self.assertIs(database_manager.DBConnect, original)
+
+    def test_run(self):
+        doc = run(n=300, sessions=3, renders=2, seed=5, db_file=self.db_file)
+        results = doc['results']
+        self.assertEqual(set(results), set(WIDGETS) | {'render'})
+        for res in results.values():
+            self.assertLessEqual(res['p50_ms'], res['p95_ms'])
+            self.assertLessEqual(res['p95_ms'], res['p99_ms'])
+        self.assertEqual(results['langPie']['queries_per_render'], 1)
+        self.assertEqual(results['selectLocAndAuth']['queries_per_render'], 4)
+        # the word cloud reads the whole table, every other widget reads a page or a rollup
+        self.assertGreater(results['wordCloud']['bytes_per_render'],
+                           sum(res['bytes_per_render'] for name, res in results.items()
+                               if name not in ('wordCloud', 'render')))
+        # per widget figures are rounded down
+        self.assertAlmostEqual(results['render']['bytes_per_render'],
+                               sum(res['bytes_per_render'] for name, res in results.items() if name != 'render'),
+                               delta=len(WIDGETS))
+
+    def test_skip_widgets(self):
+        doc = run(n=300, sessions=2, renders=1, seed=5, widgets=['langPie', 'stBarChart'], db_file=self.db_file)
+        self.assertEqual(set(doc['results']), {'langPie', 'stBarChart', 'render'})
+        self.assertEqual(doc['results']['render']['queries_per_render'], 2)
+
+
+if __name__ == '__main__':
+	unittest.main()
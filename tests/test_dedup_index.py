@@ -0,0 +1,235 @@
+import unittest
+import json
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import sys, os
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from synthetic_tweets import SyntheticTweets
+from extract_dataframe import iter_json_chunks, TweetFilter
+from dedup_index import DedupIndex, fingerprint
+import batch_ingest
+from batch_ingest import ingest, read_manifest
+import pipeline_runner
+from pipeline_runner import PipelineRunner
+from database_manager import TWEET_COLUMNS, ROLLUPS, load_batch
+
+
+def write_dump(path, tweets):
+    with open(path, 'w') as f:
+        for tweet in tweets:
+            f.write(json.dumps(tweet) + '\n')
+
+
+def make_tweets(n, seed=0, first_id=0):
+    # synthetic ids restart at the same number for every seed, shift them apart
+    tweets = list(SyntheticTweets(seed=seed).tweets(n))
+    for i, tweet in enumerate(tweets):
+        tweet['id'] = 1500000000000000000 + first_id + i
+    return tweets
+
+
+class TestDedupIndex(unittest.TestCase):
+    """
+		A class for unit-testing the persistent index of ingested
+		tweets and the dropping of duplicates when dumps are read.
+	"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'seen.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_fingerprint(self):
+        tweet = make_tweets(1)[0]
+        self.assertEqual(fingerprint(tweet), tweet['id'])
+        del tweet['id']
+        key = fingerprint(tweet)
+        self.assertLess(key, 0)
+        self.assertGreaterEqual(key, -2 ** 63)
+        self.assertEqual(fingerprint(dict(tweet)), key)
+        self.assertNotEqual(fingerprint(dict(tweet, text=tweet['text'] + '!')), key)
+
+    def test_across_runs(self):
+        tweets = make_tweets(50)
+        index = DedupIndex(self.path)
+        self.assertEqual(len(index.filter_new(tweets[:30] + tweets[:5])), 30)
+        index.commit()
+        index.close()
+
+        index = DedupIndex(self.path)
+        new = index.filter_new(tweets)
+        self.assertEqual([x['id'] for x in new], [x['id'] for x in tweets[30:]])
+        self.assertEqual((index.kept, index.dropped), (20, 30))
+        index.commit()
+        self.assertEqual(len(index), 50)
+        self.assertEqual(index.stats()['committed_runs'], 2)
+        index.close()
+
+    def test_abandon_and_forget(self):
+        tweets = make_tweets(20)
+        index = DedupIndex(self.path)
+        index.filter_new(tweets[:10])
+        index.abandon()
+        self.assertEqual(len(index.filter_new(tweets)), 20)
+        run = index.run
+        index.commit()
+        index.forget(run)
+        self.assertEqual(len(index), 0)
+        index.close()
+
+    def test_dead_run_is_recovered(self):
+        tweets = make_tweets(10)
+        # a process that reads the dump and dies before committing
+        code = ("import sys, json, os; sys.path.insert(0, sys.argv[1]); from dedup_index import DedupIndex; "
+                "DedupIndex(sys.argv[2]).filter_new([json.loads(x) for x in open(sys.argv[3])]); os._exit(1)")
+        dump = os.path.join(self.dir, 'a.json')
+        write_dump(dump, tweets)
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        subprocess.run([sys.executable, '-c', code, root, self.path, dump])
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0], 10)
+        conn.close()
+
+        index = DedupIndex(self.path)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.filter_new(tweets)), 10)
+        index.close()
+
+    def test_iter_json_chunks(self):
+        tweets = make_tweets(40)
+        dump = os.path.join(self.dir, 'a.json')
+        write_dump(dump, tweets[:25] + tweets)
+        index = DedupIndex(self.path)
+        chunks = list(iter_json_chunks(dump, 10, dedup=index))
+        self.assertEqual([len(x) for x in chunks], [10, 10, 5, 10, 5])
+        self.assertEqual(list(iter_json_chunks(dump, 10, dedup=index)), [])
+        index.close()
+
+
+class TestDedupIngest(unittest.TestCase):
+    """
+		A class for unit-testing the dedup index in the multi-file
+		ingestion and the streaming pipeline.
+	"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.dir, 'dumps')
+        self.out = os.path.join(self.dir, 'processed')
+        self.index = os.path.join(self.dir, 'seen.sqlite')
+        os.makedirs(self.src)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_batch_ingest(self):
+        a, b = make_tweets(60, seed=1), make_tweets(40, seed=2, first_id=1000)
+        write_dump(os.path.join(self.src, 'a.json'), a)
+        # b overlaps a, and c is a copy of b
+        write_dump(os.path.join(self.src, 'b.json'), b + a[:30])
+        write_dump(os.path.join(self.src, 'c.json'), b)
+        results = ingest(self.src, self.out, processes=2, chunk_size=25, sentiment_backend='lexicon',
+                         dedup_index=self.index)
+        self.assertEqual(results['tweets'].sum(), 100)
+        self.assertEqual(results['duplicates'].sum(), 70)
+
+        # a changed file is extracted again, its previous tweets included
+        write_dump(os.path.join(self.src, 'a.json'), a + make_tweets(5, seed=3, first_id=2000))
+        rerun = ingest(self.src, self.out, processes=1, sentiment_backend='lexicon', dedup_index=self.index)
+        self.assertEqual(rerun['tweets'].tolist(), [65])
+        entries = read_manifest(self.out)
+        self.assertEqual(len({entry['dedup_run'] for entry in entries.values()}), 3)
+
+    def test_run_committed_with_manifest(self):
+        write_dump(os.path.join(self.src, 'a.json'), make_tweets(30))
+        with mock.patch.object(batch_ingest, '_append_manifest', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                ingest(self.src, self.out, processes=1, sentiment_backend='lexicon', dedup_index=self.index)
+        index = DedupIndex(self.index)
+        self.assertEqual((len(index), index.stats()['open_runs']), (0, 0))
+        index.close()
+
+        # the file is not in the manifest, so it is extracted whole again
+        rerun = ingest(self.src, self.out, processes=2, sentiment_backend='lexicon', dedup_index=self.index)
+        self.assertEqual(rerun['tweets'].tolist(), [30])
+        self.assertEqual(rerun['duplicates'].tolist(), [0])
+        index = DedupIndex(self.index)
+        self.assertEqual(index.stats()['committed_runs'], 1)
+        index.close()
+
+    def make_db(self):
+        db_file = os.path.join(self.dir, 'tweets.db')
+        conn = sqlite3.connect(db_file)
+        conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        conn.execute('CREATE TABLE TweetMentions (tweet_id, screen_name, position)')
+        for table, (keys, counters) in ROLLUPS.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+        conn.commit()
+        conn.close()
+        return db_file
+
+    def run_pipeline(self, db_file, tweets, **kwargs):
+        dump = os.path.join(self.src, 'a.json')
+        write_dump(dump, tweets)
+        PipelineRunner(dump, lambda: sqlite3.connect(db_file, check_same_thread=False), chunk_size=7,
+                       sentiment_backend='lexicon', dedup_index=self.index, **kwargs).run()
+
+    def count_tweets(self, db_file):
+        conn = sqlite3.connect(db_file)
+        n, distinct = conn.execute('SELECT COUNT(*), COUNT(DISTINCT tweet_id) FROM TweetInformation').fetchone()
+        conn.close()
+        self.assertEqual(n, distinct)
+        return n
+
+    def test_pipeline(self):
+        db_file = self.make_db()
+        tweets = [x for x in make_tweets(60) if x['lang'] == 'en' and 'retweeted_status' not in x]
+        half = len(tweets) // 2
+        self.run_pipeline(db_file, tweets[:half])
+        self.assertEqual(self.count_tweets(db_file), half)
+        self.run_pipeline(db_file, tweets)
+        self.assertEqual(self.count_tweets(db_file), len(tweets))
+        self.run_pipeline(db_file, tweets)
+        self.assertEqual(self.count_tweets(db_file), len(tweets))
+
+    def test_pipeline_failure(self):
+        # the chunks loaded before a failure stay ingested, the others are loaded by the rerun
+        db_file = self.make_db()
+        tweets = [x for x in make_tweets(150) if x['lang'] == 'en' and 'retweeted_status' not in x]
+        calls = []
+
+        def failing(*args):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError('connection lost')
+            return load_batch(*args)
+
+        with mock.patch.object(pipeline_runner, 'load_batch', failing):
+            with self.assertRaises(RuntimeError):
+                self.run_pipeline(db_file, tweets)
+        self.assertEqual(self.count_tweets(db_file), 14)
+        self.run_pipeline(db_file, tweets)
+        self.assertEqual(self.count_tweets(db_file), len(tweets))
+        self.assertEqual(DedupIndex(self.index).stats()['open_runs'], 0)
+
+    def test_filtered_tweets_not_recorded(self):
+        db_file = self.make_db()
+        tweets = [x for x in make_tweets(60) if 'retweeted_status' not in x]
+        english = [x for x in tweets if x['lang'] == 'en']
+        self.assertLess(len(english), len(tweets))
+        self.run_pipeline(db_file, tweets, filters=TweetFilter(langs={'en'}))
+        self.assertEqual(self.count_tweets(db_file), len(english))
+        # a later run keeping every language loads the tweets the first one filtered out
+        self.run_pipeline(db_file, tweets, filters=None)
+        self.assertEqual(self.count_tweets(db_file), len(tweets))
+
+if __name__ == '__main__':
+	unittest.main()
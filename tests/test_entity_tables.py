@@ -0,0 +1,66 @@
+import unittest
+import sqlite3
+import pandas as pd
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor
+from database_manager import insert_entity_table, load_batch
+
+tweet_list = [
+    {'id': 1, 'entities': {'hashtags': [{'text': 'Inflation', 'indices': [0, 10]}, {'text': 'Ukraine', 'indices': [11, 19]}],
+                           'user_mentions': [{'screen_name': 'WRi007', 'indices': [3, 10]}]}},
+    {'id': 2, 'entities': {'hashtags': [], 'user_mentions': []}},
+    {'id': 3, 'entities': {'hashtags': [{'text': 'inflation', 'indices': [5, 15]}]}},
+    {'id': 4},
+    {'entities': {'hashtags': [{'text': 'noid', 'indices': [0, 5]}], 'user_mentions': [{'screen_name': 'x'}]}},
+]
+
+
+class TestEntityTables(unittest.TestCase):
+    """
+		A class for unit-testing the hashtag and mention explosion
+		and the bulk load into the entity child tables.
+	"""
+
+    def setUp(self):
+        self.df = TweetDfExtractor(tweet_list)
+
+    def test_find_hashtag_rows(self):
+        rows = self.df.find_hashtag_rows()
+        self.assertEqual(rows['tweet_id'].tolist(), [1, 1, 3])
+        self.assertEqual(rows['tag'].tolist(), ['inflation', 'ukraine', 'inflation'])
+        self.assertEqual(rows['position'].tolist(), [0, 1, 0])
+
+    def test_find_mention_rows(self):
+        rows = self.df.find_mention_rows()
+        self.assertEqual(rows['tweet_id'].tolist(), [1])
+        self.assertEqual(rows['tag'].tolist(), ['wri007'])
+
+    def test_insert_entity_table(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE TweetHashtags (tweet_id INTEGER, hashtag TEXT, position INTEGER)')
+        n = insert_entity_table('tweets', self.df.find_hashtag_rows(), 'TweetHashtags', 'hashtag', conn=conn)
+        self.assertEqual(n, 3)
+        top = conn.execute('SELECT hashtag, COUNT(*) FROM TweetHashtags GROUP BY hashtag ORDER BY 2 DESC').fetchall()
+        self.assertEqual(top[0], ('inflation', 2))
+
+    def test_reload(self):
+        # the child tables key on (tweet_id, position); loading a tweet again keeps one copy
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE TweetInformation (tweet_id INTEGER)')
+        for table, column in [('TweetHashtags', 'hashtag'), ('TweetMentions', 'screen_name')]:
+            conn.execute(f'CREATE TABLE {table} (tweet_id INTEGER NOT NULL, {column} TEXT NOT NULL, '
+                         'position INTEGER NOT NULL, PRIMARY KEY (tweet_id, position))')
+        df = pd.DataFrame({'tweet_id': self.df.find_tweet_id()})
+        for _ in range(2):
+            load_batch(conn, df, self.df.find_hashtag_rows(), self.df.find_mention_rows())
+            insert_entity_table(None, self.df.find_hashtag_rows(), 'TweetHashtags', 'hashtag', conn=conn)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation').fetchone()[0], 10)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetHashtags').fetchone()[0], 3)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetMentions').fetchone()[0], 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
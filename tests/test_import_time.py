@@ -0,0 +1,41 @@
+import unittest
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from benchmarks.bench_import_time import import_profile
+
+HEAVY = ['pandas', 'numpy', 'textblob', 'nltk', 'mysql', 'altair', 'plotly', 'wordcloud']
+
+
+class TestImportTime(unittest.TestCase):
+    """
+		A class checking that importing the pipeline modules does not
+		load the heavy dependencies; they must load on first use.
+		It checks what gets imported rather than timings, so it does
+		not depend on the speed of the machine.
+	"""
+
+    def assertLight(self, module):
+        profile = import_profile(module)
+        self.assertIn(module, profile)
+        self.assertEqual([x for x in HEAVY if x in profile], [])
+
+    def test_cli(self):
+        self.assertLight('cli')
+
+    def test_extract_dataframe(self):
+        self.assertLight('extract_dataframe')
+
+    def test_clean_tweets_dataframe(self):
+        self.assertLight('clean_tweets_dataframe')
+
+    def test_database_manager(self):
+        self.assertLight('database_manager')
+
+    def test_pipeline_runner(self):
+        self.assertLight('pipeline_runner')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor, TWEET_DF_COLUMNS
+from synthetic_tweets import SyntheticTweets
+
+
+class CountingExtractor(TweetDfExtractor):
+    calls = 0
+
+    def find_sentiments(self, text):
+        CountingExtractor.calls += 1
+        return super().find_sentiments(text)
+
+
+class TestLazyColumns(unittest.TestCase):
+    """
+		A class for unit-testing column selection and the lazily
+		computed, cached columns of TweetDfExtractor.
+	"""
+
+    def setUp(self):
+        CountingExtractor.calls = 0
+        self.tweets = list(SyntheticTweets(seed=11).tweets(30))
+        self.df = CountingExtractor(self.tweets)
+
+    def test_default_columns(self):
+        self.assertEqual(list(self.df.get_tweet_df().columns), TWEET_DF_COLUMNS)
+
+    def test_selected_columns_skip_sentiment(self):
+        df = self.df.get_tweet_df(columns=['created_at', 'retweet_count'])
+        self.assertEqual(list(df.columns), ['created_at', 'retweet_count'])
+        self.assertEqual(len(df), 30)
+        self.assertEqual(CountingExtractor.calls, 0)
+
+    def test_sentiment_cached(self):
+        polarity = self.df.get_column('polarity')
+        self.df.get_tweet_df(columns=['subjectivity', 'polarity'])
+        self.assertEqual(CountingExtractor.calls, 1)
+        self.assertEqual(len(polarity), 30)
+
+    def test_derived_columns(self):
+        extractor = TweetDfExtractor([
+            {'source': '<a href="http://twitter.com/download/android" rel="nofollow">Twitter for Android</a>',
+             'user': {'location': 'Addis Ababa, Ethiopia'}},
+            {'source': 'web', 'user': {'location': 'somewhere'}},
+        ])
+        self.assertEqual(extractor.get_column('source_name'), ['Twitter for Android', 'web'])
+        self.assertEqual(extractor.get_column('country'), ['Ethiopia', None])
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            self.df.get_tweet_df(columns=['nope'])
+
+
+if __name__ == '__main__':
+	unittest.main()
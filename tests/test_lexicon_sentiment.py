@@ -0,0 +1,128 @@
+import unittest
+import sys, os
+
+import numpy as np
+from textblob import TextBlob
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+import lexicon_sentiment
+from extract_dataframe import TweetDfExtractor
+from synthetic_tweets import SyntheticTweets
+
+# hand-written tweets with contractions, intensifiers, mentions and links
+REAL_TWEETS = [
+    "This isn't great",
+    "The market is really not doing well today!",
+    "I don't think inflation is going down anytime soon #inflation",
+    "RT @business: Stocks can't catch a break as rates climb https://t.co/AbC123xyz",
+    "Honestly the Fed's decision wasn't bad at all :)",
+    "It's absolutely terrible what's happening to crypto right now!!! https://t.co/q9ZzLm",
+    "@elonmusk you're really not helping the situation",
+    "Wow, what a fantastic quarter for $AAPL. Very very impressed!",
+    "Gas prices are so high I can't even afford to drive to work :(",
+    "not sure why everyone's so happy, the economy isn't recovering",
+    "We've never seen a market this volatile... scary times",
+    "I'm not very optimistic about the jobs report tbh",
+    "Great news!! Unemployment dropped again #economy #jobs",
+    "Rent is ridiculously expensive and wages aren't keeping up",
+    "The new policy is pretty good, but it won't fix everything",
+    "Why is nobody talking about the housing bubble? It's really bad.",
+    "Such a beautiful day to buy the dip lol",
+    "Inflation at 8.5% is NOT good news for anyone",
+    "They said it'd be transitory... it wasn't. https://t.co/xyz",
+    "So proud of our team for hitting record sales this year!",
+    "Can't believe how cheap groceries used to be. Sad.",
+    "Bitcoin crashed again?! Worst investment ever",
+    "Honestly I'm not too worried, markets always recover",
+    "The recession isn't coming, it's already here",
+    "Happy Friday everyone! Markets closed green today :D",
+    "That interview was incredibly boring, didn't learn anything new",
+    "@CNBC your coverage is extremely biased and unfair",
+    "Supply chains are finally improving, good sign for Q3",
+    "I wouldn't call this a recovery, more like a pause",
+    "Very disappointing earnings from $TSLA today",
+    "Really really love the new budget proposal!!",
+    "Mortgage rates at 7%? That's insane, nobody can afford a house",
+    "It's not the worst outcome but definitely not the best",
+    "Thanks @federalreserve, prices are totally under control now (!)",
+    "The dollar is strong, which isn't always a good thing for exports",
+    "Not bad for a Monday, portfolio up 2%",
+    "Fuel costs doubled and my salary didn't. Terrible.",
+    "Interest rates hikes are necessary but painful",
+    "I'm so tired of hearing about the debt ceiling",
+    "What an amazing rally, never seen anything like it!",
+    "Food banks are seeing record demand, it's heartbreaking https://t.co/foodbank",
+    "Wages grew faster than expected, that's a positive surprise",
+    "Don't panic sell, stay calm and hold",
+    "The economy's doing fine, it's the people who aren't",
+    "Extremely bullish on renewable energy stocks right now",
+    "Layoffs everywhere... this doesn't look good at all",
+    "Nice to see small businesses doing well again",
+    "I really don't understand how anyone can afford anything anymore",
+    "Prices going up, quality going down. Classic.",
+    "Cautiously optimistic about next quarter",
+]
+
+
+class TestLexiconSentiment(unittest.TestCase):
+    """
+		A class for unit-testing the batch lexicon sentiment backend
+		against TextBlob's PatternAnalyzer.
+	"""
+
+    def assertMatchesTextBlob(self, texts):
+        polarity, subjectivity = lexicon_sentiment.score(texts)
+        for text, p, s in zip(texts, polarity, subjectivity):
+            expected = TextBlob(text).sentiment
+            self.assertAlmostEqual(p, expected.polarity, places=9, msg=text)
+            self.assertAlmostEqual(s, expected.subjectivity, places=9, msg=text)
+
+    def test_rules(self):
+        self.assertMatchesTextBlob(['good', 'not good', 'very good', 'good!', 'not a good day',
+                                    'good bad great', 'I am very very happy!!', 'it is great :)',
+                                    'Worst day ever :(', 'nothing here', ''])
+
+    def test_negated_modifiers(self):
+        # the negation carries through the modifiers to the word they modify
+        self.assertMatchesTextBlob(['not very good', 'it is not really great', 'never really very bad',
+                                    'really not bad at all!', 'really not very good', 'very not good',
+                                    'very no good', 'not very', 'this is not the best but not bad either'])
+        polarity, _ = lexicon_sentiment.score(['not very good', 'it is not really great'])
+        self.assertTrue((polarity < 0).all())
+
+    def test_exclamation_intensity(self):
+        # exclamation marks boost the last scored word, across unknown words
+        self.assertMatchesTextBlob(['really really well !!!', 'good ! bad !!', 'not so very good !'])
+
+    def test_contractions(self):
+        # pattern splits "n't" into "n ' t", so contractions never negate
+        self.assertMatchesTextBlob(["This isn't great", "The market is really not doing well today!",
+                                    "Honestly I'm not too worried, markets always recover",
+                                    "Can't believe how cheap groceries used to be. Sad."])
+
+    def test_real_tweets(self):
+        polarity, subjectivity = lexicon_sentiment.score(REAL_TWEETS)
+        expected = [TextBlob(x).sentiment for x in REAL_TWEETS]
+        self.assertLess(np.abs(polarity - [x.polarity for x in expected]).mean(), lexicon_sentiment.TOLERANCE)
+        self.assertLess(np.abs(subjectivity - [x.subjectivity for x in expected]).mean(), lexicon_sentiment.TOLERANCE)
+
+    def test_tolerance(self):
+        texts, _ = TweetDfExtractor(list(SyntheticTweets(seed=9, langs={'en': 1.0}).tweets(500))).find_full_text()
+        polarity, subjectivity = lexicon_sentiment.score(texts)
+        expected = [TextBlob(x).sentiment for x in texts]
+        self.assertLess(np.abs(polarity - [x.polarity for x in expected]).mean(), lexicon_sentiment.TOLERANCE)
+        self.assertLess(np.abs(subjectivity - [x.subjectivity for x in expected]).mean(), lexicon_sentiment.TOLERANCE)
+
+    def test_backend(self):
+        tweets = [{'text': 'a very good day'}, {'text': None}]
+        polarity, subjectivity = TweetDfExtractor(tweets, sentiment_backend='lexicon').find_sentiments(['a very good day', None])
+        self.assertEqual(len(polarity), 2)
+        self.assertAlmostEqual(polarity[0], TextBlob('a very good day').sentiment.polarity)
+        self.assertEqual(polarity[1], 0.0)
+        with self.assertRaises(ValueError):
+            TweetDfExtractor(tweets, sentiment_backend='nope')
+
+
+if __name__ == '__main__':
+	unittest.main()
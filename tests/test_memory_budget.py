@@ -0,0 +1,121 @@
+import unittest
+import gc
+import glob
+import os
+import tempfile
+import sys
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from synthetic_tweets import SyntheticTweets
+from extract_dataframe import TweetDfExtractor
+from memory_budget import SpillBuffer, parse_size, frame_bytes, extract_within_budget, write_result
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow not installed')
+class TestMemoryBudget(unittest.TestCase):
+    """
+		A class for unit-testing the memory budgeted extraction
+		and its spilling to arrow files.
+	"""
+
+    def setUp(self):
+        self.tweets = list(SyntheticTweets(seed=3).tweets(3000))
+        self.expected = TweetDfExtractor(self.tweets, sentiment_backend='lexicon').get_tweet_df()
+        self.spill_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for path in glob.glob(os.path.join(self.spill_dir, '*')):
+            os.remove(path)
+        os.rmdir(self.spill_dir)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('512MB'), 512 << 20)
+        self.assertEqual(parse_size('1.5g'), 3 << 29)
+        self.assertEqual(parse_size(4096), 4096)
+        with self.assertRaises(ValueError):
+            parse_size('a lot')
+
+    def test_fits_in_budget(self):
+        df = TweetDfExtractor(self.tweets, sentiment_backend='lexicon').get_tweet_df(memory_budget='1GB')
+        self.assertEqual(len(df), len(self.expected))
+        self.assertEqual(df['polarity'].tolist(), self.expected['polarity'].tolist())
+        self.assertEqual(df['hashtags'].tolist(), self.expected['hashtags'].map(str).tolist())
+
+    def test_spills_beyond_budget(self):
+        budget = frame_bytes(self.expected) // 4
+        with SpillBuffer(budget, self.spill_dir) as buffer:
+            for i in range(0, len(self.tweets), 500):
+                buffer.add(TweetDfExtractor(self.tweets[i:i + 500], sentiment_backend='lexicon').get_tweet_df())
+                self.assertLess(buffer.buffered, budget)
+            table = buffer.result()
+            self.assertGreaterEqual(len(buffer.spills), 3)
+            self.assertLess(buffer.peak, budget + frame_bytes(self.expected) // 6)
+
+        # the closed buffer leaves the spill files to the table mapping them
+        self.assertEqual(len(glob.glob(os.path.join(self.spill_dir, '*.arrow'))), len(buffer.spills))
+        self.assertIsInstance(table, pyarrow.Table)
+        df = table.to_pandas()
+        self.assertEqual(df['tweet_id'].tolist(), self.expected['tweet_id'].tolist())
+        self.assertEqual(df['clean_text'].tolist(), self.expected['clean_text'].tolist())
+        self.assertEqual(df['polarity'].tolist(), self.expected['polarity'].tolist())
+        del table
+        gc.collect()
+        self.assertEqual(glob.glob(os.path.join(self.spill_dir, '*.arrow')), [])
+
+    def test_extract_and_clean_within_budget(self):
+        fd, json_file = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        SyntheticTweets(seed=3).write_jsonl(json_file, 3000)
+        try:
+            table = extract_within_budget(json_file, '200KB', chunk_size=400, clean=True,
+                                          sentiment_backend='lexicon', spill_dir=self.spill_dir)
+            self.assertIsInstance(table, pyarrow.Table)
+            english = self.expected[self.expected['language'] == 'en']
+            self.assertEqual(table.num_rows, len(english))
+            self.assertEqual(set(table.column('language').to_pylist()), {'en'})
+
+            out = os.path.join(self.spill_dir, 'out.csv')
+            self.assertEqual(write_result(table, out), len(english))
+            self.assertEqual(len(pd.read_csv(out)), len(english))
+            os.remove(out)
+            del table
+            gc.collect()
+            self.assertEqual(glob.glob(os.path.join(self.spill_dir, '*.arrow')), [])
+        finally:
+            os.remove(json_file)
+
+
+
+class TestWithinBudgetWithoutArrow(unittest.TestCase):
+    """
+		A class for unit-testing that extraction within the budget
+		does not need pyarrow.
+	"""
+
+    def test_no_pyarrow_import(self):
+        tweets = list(SyntheticTweets(seed=3).tweets(300))
+        saved = {name: module for name, module in sys.modules.items() if name.split('.')[0] == 'pyarrow'}
+        for name in saved:
+            del sys.modules[name]
+        sys.modules['pyarrow'] = None # makes any import of pyarrow fail
+        out = os.path.join(tempfile.mkdtemp(), 'out.csv')
+        try:
+            df = TweetDfExtractor(tweets, sentiment_backend='lexicon').get_tweet_df(memory_budget='1GB')
+            self.assertIsInstance(df, pd.DataFrame)
+            self.assertEqual(write_result(df, out), 300)
+        finally:
+            del sys.modules['pyarrow']
+            sys.modules.update(saved)
+            os.remove(out)
+            os.rmdir(os.path.dirname(out))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import json
+import sqlite3
+import tempfile
+import tracemalloc
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor
+from metrics import Metrics, instrument_pipeline, uninstrument_pipeline
+from database_manager import TWEET_COLUMNS, ROLLUPS
+import pipeline_runner
+
+tweet_list = [{'id': i, 'created_at': 'Fri Apr 22 22:20:18 +0000 2022', 'source': '<a>web</a>',
+               'text': 'a good day', 'lang': 'en', 'retweet_count': 0, 'entities': {'hashtags': [], 'user_mentions': []},
+               'user': {'screen_name': 'a', 'friends_count': 1, 'statuses_count': 1, 'followers_count': 1,
+                        'favourites_count': 1, 'location': ''}} for i in range(6)]
+
+
+class TestMetrics(unittest.TestCase):
+    """
+		A class for unit-testing the stage instrumentation.
+	"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.jsonl = os.path.join(self.dir, 'metrics.jsonl')
+        self.metrics = Metrics(jsonl_path=self.jsonl, profile_stage='TweetDfExtractor.find_sentiments',
+                               profile_dir=self.dir)
+        instrument_pipeline(self.metrics)
+
+    def tearDown(self):
+        uninstrument_pipeline(self.metrics)
+
+    def test_summary(self):
+        TweetDfExtractor(tweet_list).get_tweet_df()
+        summary = self.metrics.summary().set_index('stage')
+        self.assertEqual(summary.loc['TweetDfExtractor.get_tweet_df', 'rows'], 6)
+        self.assertEqual(summary.loc['TweetDfExtractor.find_lang', 'calls'], 1)
+        self.assertGreater(summary.loc['TweetDfExtractor.get_tweet_df', 'peak_rss_mb'], 0)
+
+        with open(self.jsonl) as fd:
+            stages = [json.loads(line)['stage'] for line in fd]
+        self.assertIn('TweetDfExtractor.find_sentiments', stages)
+        self.assertTrue(any(name.endswith('.prof') for name in os.listdir(self.dir)))
+
+    def test_pipeline_load(self):
+        # the pipeline writes through load_batch, imported by name into pipeline_runner
+        uninstrument_pipeline(self.metrics)
+        instrument_pipeline(self.metrics, modules=[pipeline_runner])
+        dump, db_file = os.path.join(self.dir, 'tweets.json'), os.path.join(self.dir, 'tweets.db')
+        with open(dump, 'w') as fd:
+            for tweet in tweet_list:
+                fd.write(json.dumps(dict(tweet, text=f"a good day number {tweet['id']}")) + '\n')
+        conn = sqlite3.connect(db_file)
+        conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        for table, (keys, counters) in ROLLUPS.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+        conn.commit()
+        conn.close()
+        try:
+            pipeline_runner.PipelineRunner(dump, lambda: sqlite3.connect(db_file, check_same_thread=False),
+                                           chunk_size=4, sentiment_backend='lexicon').run()
+        finally:
+            uninstrument_pipeline(self.metrics, modules=[pipeline_runner])
+        summary = self.metrics.summary().set_index('stage')
+        self.assertEqual(summary.loc['database_manager.load_batch', 'calls'], 2)
+        self.assertEqual(summary.loc['database_manager.load_batch', 'rows'], 6)
+
+    def test_prometheus_text(self):
+        TweetDfExtractor(tweet_list).find_lang()
+        text = self.metrics.prometheus_text()
+        self.assertIn('tweet_stage_rows_total{stage="TweetDfExtractor.find_lang"} 6', text)
+
+    def test_tracemalloc_left_running(self):
+        metrics = Metrics(profile_stage='stage', profile_mode='tracemalloc', profile_dir=self.dir)
+        metrics.timed('stage', sum, [1, 2])
+        self.assertFalse(tracemalloc.is_tracing())
+        # tracing the caller started is left on
+        tracemalloc.start()
+        try:
+            metrics.timed('stage', sum, [1, 2])
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len([x for x in os.listdir(self.dir) if x.endswith('.txt')]), 2)
+
+    def test_uninstrument(self):
+        uninstrument_pipeline(self.metrics)
+        TweetDfExtractor(tweet_list).find_lang()
+        self.assertEqual(len(self.metrics.records), 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import sqlite3
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from database_manager import TWEET_COLUMNS, fetch_page, count_estimate, distinct_values
+
+
+class TestPagination(unittest.TestCase):
+    """
+		A class for unit-testing the keyset paginated tweet views
+		on a sqlite stand-in database.
+	"""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute(f"CREATE TABLE TweetInformation (id INTEGER PRIMARY KEY, {', '.join(TWEET_COLUMNS)})")
+        self.conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        rows = [(i, 'en' if i % 3 else 'fr', f'text {i}', 'Nairobi' if i % 2 else 'Addis') for i in range(1, 101)]
+        self.conn.executemany('INSERT INTO TweetInformation (tweet_id, language, clean_text, location) '
+                              'VALUES (?, ?, ?, ?)', rows)
+        self.conn.executemany('INSERT INTO TweetHashtags VALUES (?, ?, 0)',
+                              [(i, 'inflation') for i in range(1, 101, 10)])
+
+    def test_pages(self):
+        seen, after = [], 0
+        while True:
+            page = fetch_page('tweets', after_id=after, limit=30, columns=['tweet_id'], conn=self.conn)
+            if page.empty:
+                break
+            self.assertEqual(list(page.columns), ['id', 'tweet_id'])
+            seen.extend(page['tweet_id'])
+            after = page['id'].iloc[-1]
+        self.assertEqual(seen, list(range(1, 101)))
+
+    def test_filters(self):
+        page = fetch_page('tweets', limit=100, columns=['language', 'location'], conn=self.conn,
+                          filters={'language': ['fr'], 'location': ['Addis'], 'source': []})
+        self.assertEqual(page['id'].tolist(), list(range(6, 101, 6)))
+        page = fetch_page('tweets', limit=100, columns=['clean_text'], hashtags=['Inflation'], conn=self.conn)
+        self.assertEqual(page['clean_text'].tolist(), [f'text {i}' for i in range(1, 101, 10)])
+        with self.assertRaises(ValueError):
+            fetch_page('tweets', columns=['id; DROP TABLE TweetInformation'], conn=self.conn)
+
+    def test_count_estimate(self):
+        self.assertEqual(count_estimate('tweets', conn=self.conn), (100, False))
+        self.assertEqual(count_estimate('tweets', filters={'language': ['fr']}, conn=self.conn), (33, True))
+        self.assertEqual(count_estimate('tweets', filters={'language': ['en']}, cap=50, conn=self.conn), (50, False))
+        self.conn.execute('DELETE FROM TweetInformation')
+        self.assertEqual(count_estimate('tweets', conn=self.conn), (0, True))
+
+    def test_distinct_values(self):
+        self.assertEqual(distinct_values('tweets', 'language', conn=self.conn), ['en', 'fr'])
+
+
+if __name__ == '__main__':
+	unittest.main()
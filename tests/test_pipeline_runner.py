@@ -0,0 +1,92 @@
+import unittest
+import json
+import sqlite3
+import tempfile
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from database_manager import TWEET_COLUMNS, ROLLUPS
+from pipeline_runner import PipelineRunner
+from extract_dataframe import TweetFilter
+from async_loader import SqlitePool
+
+
+def make_tweet(i, lang='en'):
+    return {'id': i, 'created_at': 'Fri Apr 22 22:20:18 +0000 2022',
+            'source': '<a href="http://twitter.com/download/android" rel="nofollow">Twitter for Android</a>',
+            'text': f'RT @someone: tweet number {i} is great #Inflation', 'lang': lang, 'retweet_count': i,
+            'entities': {'hashtags': [{'text': 'Inflation', 'indices': [0, 10]}], 'user_mentions': []},
+            'user': {'screen_name': f'user{i % 3}', 'friends_count': 1, 'statuses_count': 2,
+                     'followers_count': 3, 'favourites_count': 4, 'location': ''}}
+
+
+class TestPipelineRunner(unittest.TestCase):
+    """
+		A class for unit-testing the streaming pipeline runner
+		against a sqlite stand-in database.
+	"""
+
+    def setUp(self):
+        fd, self.json_file = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            for i in range(25):
+                f.write(json.dumps(make_tweet(i, 'en' if i % 5 else 'de')) + '\n')
+        fd, self.db_file = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_file)
+        conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        conn.execute('CREATE TABLE TweetMentions (tweet_id, screen_name, position)')
+        for table, (keys, counters) in ROLLUPS.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        os.remove(self.json_file)
+        os.remove(self.db_file)
+
+    def test_run(self):
+        runner = PipelineRunner(self.json_file, lambda: sqlite3.connect(self.db_file, check_same_thread=False),
+                                chunk_size=4, queue_size=1)
+        stats = runner.run()
+        self.assertEqual(stats['stage'].tolist(), ['read', 'extract', 'clean', 'load'])
+        self.assertEqual(stats.loc[0, 'rows'], 25)
+        self.assertEqual(stats.loc[0, 'chunks'], 7)
+
+        conn = sqlite3.connect(self.db_file)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation').fetchone()[0], 20)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetHashtags').fetchone()[0], 20)
+        self.assertEqual(conn.execute('SELECT SUM(tweet_count) FROM TweetsPerHourLanguage').fetchone()[0], 20)
+        conn.close()
+
+    def test_run_async(self):
+        async def pool():
+            return SqlitePool(self.db_file, size=2)
+
+        runner = PipelineRunner(self.json_file, chunk_size=4, queue_size=1, async_pool=pool, async_in_flight=2)
+        stats = runner.run()
+        self.assertEqual(stats.loc[3, 'rows'], 20)
+
+        conn = sqlite3.connect(self.db_file)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation').fetchone()[0], 20)
+        self.assertEqual(conn.execute('SELECT SUM(tweet_count) FROM HashtagsPerDay').fetchone()[0], 20)
+        conn.close()
+
+    def test_clean_follows_filters(self):
+        # the clean stage keeps what the pushed down filters keep
+        for filters, expected in [(TweetFilter(langs=['de'], start='2019-01-01'), 5), (None, 25),
+                                  (TweetFilter(start='2022-04-23'), 0)]:
+            conn = sqlite3.connect(self.db_file)
+            conn.execute('DELETE FROM TweetInformation')
+            conn.commit()
+            runner = PipelineRunner(self.json_file, lambda: sqlite3.connect(self.db_file, check_same_thread=False),
+                                    chunk_size=4, filters=filters)
+            runner.run()
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation').fetchone()[0], expected)
+            conn.close()
+
+
+if __name__ == '__main__':
+	unittest.main()
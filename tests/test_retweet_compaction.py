@@ -0,0 +1,201 @@
+import unittest
+import json
+import sqlite3
+import tempfile
+from unittest import mock
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor, ORIGINAL_COLUMNS
+from database_manager import TWEET_COLUMNS, ROLLUPS, insert_original_batch, load_batch
+from pipeline_runner import PipelineRunner
+from async_loader import SqlitePool
+import cli
+
+
+def make_original(i):
+    return {'id': 1000 + i, 'created_at': 'Fri Apr 22 20:00:00 +0000 2022',
+            'source': '<a href="http://twitter.com/download/android" rel="nofollow">Twitter for Android</a>',
+            'text': f'original number {i} is a great and wonderful read about #Inflation', 'lang': 'en',
+            'retweet_count': 10 + i, 'entities': {'hashtags': [{'text': 'Inflation', 'indices': [0, 10]}],
+                                                  'user_mentions': []},
+            'user': {'screen_name': f'author{i}', 'friends_count': 1, 'statuses_count': 2,
+                     'followers_count': 3, 'favourites_count': 4, 'location': ''}}
+
+
+def make_tweet(i, original=None):
+    tweet = {'id': i, 'created_at': 'Fri Apr 22 22:20:18 +0000 2022',
+             'source': '<a href="http://twitter.com/download/android" rel="nofollow">Twitter for Android</a>',
+             'text': f'tweet number {i} is bad #Inflation', 'lang': 'en', 'retweet_count': 0,
+             'entities': {'hashtags': [{'text': 'Inflation', 'indices': [0, 10]}], 'user_mentions': []},
+             'user': {'screen_name': f'user{i % 3}', 'friends_count': 1, 'statuses_count': 2,
+                      'followers_count': 3, 'favourites_count': 4, 'location': ''}}
+    if original is not None:
+        tweet['text'] = f"RT @{original['user']['screen_name']}: {original['text'][:30]}"
+        tweet['retweeted_status'] = original
+        tweet['retweet_count'] = original['retweet_count']
+    return tweet
+
+
+def make_tweets(n):
+    # every third tweet is the author's own, the others retweet one of two originals
+    originals = [make_original(0), make_original(1)]
+    return [make_tweet(i) if i % 3 == 0 else make_tweet(i, originals[i % 2]) for i in range(n)]
+
+
+class TestRetweetCompaction(unittest.TestCase):
+    """
+		A class for unit-testing the retweet compaction of
+		TweetDfExtractor and its loading into a sqlite stand-in database.
+	"""
+
+    def setUp(self):
+        self.tweets = make_tweets(12)
+
+    def test_compact_df(self):
+        df, originals = TweetDfExtractor(self.tweets).get_compact_df()
+        self.assertEqual(len(df), 12)
+        self.assertEqual(list(originals.columns), ORIGINAL_COLUMNS)
+        self.assertEqual(sorted(originals['tweet_id']), [1000, 1001])
+        self.assertTrue(originals['original_text'].str.contains('wonderful').all())
+
+        retweets = df[df['retweeted_id'].notna()]
+        self.assertEqual(len(retweets), 8)
+        self.assertTrue(retweets['original_text'].isna().all())
+        self.assertTrue(retweets['clean_text'].isna().all())
+        self.assertTrue(df.loc[df['retweeted_id'].isna(), 'clean_text'].notna().all())
+
+        # retweets carry the score of the full original text, not of their truncated copy
+        scores = originals.set_index('tweet_id')['polarity']
+        for _, row in retweets.iterrows():
+            self.assertEqual(row['polarity'], scores[row['retweeted_id']])
+
+    def test_own_tweets_scored_as_before(self):
+        df, _ = TweetDfExtractor(self.tweets).get_compact_df()
+        full = TweetDfExtractor(self.tweets).get_tweet_df()
+        own = df['retweeted_id'].isna()
+        self.assertEqual(df.loc[own, 'polarity'].tolist(), full.loc[own, 'polarity'].tolist())
+        self.assertEqual(df.loc[own, 'clean_text'].tolist(), full.loc[own, 'clean_text'].tolist())
+
+    def test_originals_scored_once(self):
+        scored = []
+        score = TweetDfExtractor._score_sentiments
+
+        def counting(extractor, text):
+            scored.extend(text)
+            return score(extractor, text)
+
+        with mock.patch.object(TweetDfExtractor, '_score_sentiments', counting):
+            TweetDfExtractor(self.tweets, sentiment_backend='lexicon').get_compact_df()
+        # 4 own tweets and 2 originals instead of 12 tweets
+        self.assertEqual(len(scored), 6)
+
+    def test_insert_original_batch_ignores_repeats(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute(f"CREATE TABLE OriginalTweets ({', '.join(ORIGINAL_COLUMNS)}, PRIMARY KEY (tweet_id))")
+        _, originals = TweetDfExtractor(self.tweets).get_compact_df()
+        insert_original_batch(conn, originals)
+        insert_original_batch(conn, originals)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM OriginalTweets').fetchone()[0], 2)
+        conn.close()
+
+    def test_real_size_ids(self):
+        # ids beyond 2**53 must survive the missing ids of own tweets and id-less users
+        originals = [dict(make_original(i), id=1517000000000000123 + i) for i in range(2)]
+        tweets = [dict(make_tweet(i, originals[i % 2] if i % 3 else None), id=1517000000000001001 + i)
+                  for i in range(6)]
+        for i, tweet in enumerate(tweets):
+            tweet['user'] = dict(tweet['user'], id=1400000000000000007 + i)
+        del tweets[1]['user']['id']
+        df, original_df = TweetDfExtractor(tweets).get_compact_df(columns=['tweet_id', 'user_id'])
+        self.assertEqual(df['tweet_id'].tolist(), [x['id'] for x in tweets])
+        self.assertEqual(df['retweeted_id'].dropna().tolist()[:2], [originals[1]['id'], originals[0]['id']])
+        self.assertEqual(df['user_id'].isna().tolist()[:3], [False, True, False])
+        self.assertEqual(df['user_id'][2], 1400000000000000009)
+
+        conn = sqlite3.connect(':memory:')
+        conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        conn.execute(f"CREATE TABLE OriginalTweets ({', '.join(ORIGINAL_COLUMNS)}, PRIMARY KEY (tweet_id))")
+        load_batch(conn, df, originals=original_df)
+        joined = conn.execute('SELECT COUNT(*) FROM TweetInformation t JOIN OriginalTweets o '
+                              'ON t.retweeted_id = o.tweet_id').fetchone()[0]
+        self.assertEqual(joined, 4)
+        conn.close()
+
+
+class TestCompactPipeline(unittest.TestCase):
+    """
+		A class for unit-testing the pipeline runner loading
+		compacted retweets into a sqlite stand-in database.
+	"""
+
+    def setUp(self):
+        fd, self.json_file = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            for tweet in make_tweets(30):
+                f.write(json.dumps(tweet) + '\n')
+        fd, self.db_file = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_file)
+        conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        conn.execute(f"CREATE TABLE OriginalTweets ({', '.join(ORIGINAL_COLUMNS)}, PRIMARY KEY (tweet_id))")
+        conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        conn.execute('CREATE TABLE TweetMentions (tweet_id, screen_name, position)')
+        for table, (keys, counters) in ROLLUPS.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        os.remove(self.json_file)
+        os.remove(self.db_file)
+
+    def check_db(self):
+        conn = sqlite3.connect(self.db_file)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation').fetchone()[0], 30)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM OriginalTweets').fetchone()[0], 2)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation '
+                                      'WHERE retweeted_id IS NOT NULL AND clean_text IS NULL').fetchone()[0], 20)
+        orphans = conn.execute('SELECT COUNT(*) FROM TweetInformation t LEFT JOIN OriginalTweets o '
+                               'ON t.retweeted_id = o.tweet_id '
+                               'WHERE t.retweeted_id IS NOT NULL AND o.tweet_id IS NULL').fetchone()[0]
+        self.assertEqual(orphans, 0)
+        polarity = conn.execute('SELECT SUM(polarity) FROM TweetInformation').fetchone()[0]
+        rollup = conn.execute('SELECT SUM(polarity_sum) FROM TweetsPerHourLanguage').fetchone()[0]
+        self.assertAlmostEqual(polarity, rollup)
+        conn.close()
+
+    def test_run(self):
+        runner = PipelineRunner(self.json_file, lambda: sqlite3.connect(self.db_file, check_same_thread=False),
+                                chunk_size=7, queue_size=1, compact_retweets=True)
+        runner.run()
+        self.check_db()
+
+    def test_cli_load(self):
+        # extract --compact-retweets output loaded with load --originals
+        df, originals = TweetDfExtractor(make_tweets(30)).get_compact_df()
+        tweets_csv, originals_csv = self.db_file + '.csv', self.db_file + '_originals.csv'
+        df.to_csv(tweets_csv, index=False)
+        originals.to_csv(originals_csv, index=False)
+        conn = sqlite3.connect(self.db_file)
+        try:
+            with mock.patch('database_manager.DBConnect', return_value=(conn, conn.cursor())):
+                cli.main(['load', tweets_csv, '--originals', originals_csv, '--batch-size', '7'])
+        finally:
+            os.remove(tweets_csv)
+            os.remove(originals_csv)
+        self.check_db()
+
+    def test_run_async(self):
+        async def pool():
+            return SqlitePool(self.db_file, size=2)
+
+        runner = PipelineRunner(self.json_file, chunk_size=7, queue_size=1, async_pool=pool, async_in_flight=2,
+                                compact_retweets=True)
+        runner.run()
+        self.check_db()
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import sqlite3
+import warnings
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+import pandas as pd
+
+from database_manager import (TWEET_COLUMNS, ROLLUPS, insert_tweet_batch, insert_entity_table, update_rollups,
+                              rebuild_rollups, hourly_sentiment, language_counts, top_authors, top_hashtags,
+                              load_batch, explode_entity_column, rollup_rows)
+
+
+def make_batch(start, n):
+    df = pd.DataFrame({'tweet_id': range(start, start + n),
+                       'created_at': pd.Timestamp('2022-08-17 22:00', tz='UTC') +
+                                     pd.to_timedelta([7 * i for i in range(start, start + n)], unit='min'),
+                       'language': ['en' if i % 4 else 'fr' for i in range(start, start + n)],
+                       'screen_name': ['user0' if i % 3 else 'user1' for i in range(start, start + n)],
+                       'polarity': [(i % 5) / 5 for i in range(start, start + n)],
+                       'subjectivity': [0.5] * n})
+    hashtags = pd.DataFrame({'tweet_id': [i for i in range(start, start + n) for _ in range(2)],
+                             'tag': [t for i in range(start, start + n) for t in ('inflation', f'tag{i % 2}')],
+                             'position': [0, 1] * n})
+    return df, hashtags
+
+
+class TestRollups(unittest.TestCase):
+    """
+		A class for unit-testing the rollup tables kept by the loader
+		on a sqlite stand-in database.
+	"""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        self.conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        for table, (keys, counters) in ROLLUPS.items():
+            self.conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+        for start in (0, 30, 60):
+            df, hashtags = make_batch(start, 30)
+            insert_tweet_batch(self.conn, df)
+            insert_entity_table(None, hashtags, 'TweetHashtags', 'hashtag', conn=self.conn)
+            update_rollups(self.conn, df, hashtags)
+
+    def snapshot(self):
+        return {table: [tuple(round(x, 9) if isinstance(x, float) else x for x in row)
+                        for row in self.conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2")] for table in ROLLUPS}
+
+    def test_incremental(self):
+        hourly = hourly_sentiment('tweets', conn=self.conn)
+        self.assertEqual(hourly['tweet_count'].sum(), 90)
+        self.assertEqual(hourly['hour'].iloc[0], '2022-08-17 22')
+        df, _ = make_batch(0, 90)
+        expected = df.groupby(df['created_at'].dt.strftime('%Y-%m-%d %H'))['polarity'].mean()
+        self.assertTrue(((hourly.set_index('hour')['polarity'] - expected).abs() < 1e-9).all())
+
+        self.assertEqual(language_counts('tweets', conn=self.conn).values.tolist(), [['en', 67], ['fr', 23]])
+        self.assertEqual(top_authors('tweets', 1, conn=self.conn).values.tolist(), [['user0', 60]])
+        days = self.conn.execute("SELECT day, tweet_count FROM HashtagsPerDay WHERE hashtag = 'inflation'").fetchall()
+        self.assertEqual(sum(n for _, n in days), 90)
+
+    def test_rebuild(self):
+        incremental = self.snapshot()
+        rebuild_rollups('tweets', conn=self.conn)
+        self.assertEqual(self.snapshot(), incremental)
+
+        self.conn.execute("UPDATE TweetsPerAuthorDay SET tweet_count = 0")
+        rebuild_rollups('tweets', start='2022-08-18', end='2022-08-19', conn=self.conn)
+        rebuilt = self.snapshot()['TweetsPerAuthorDay']
+        self.assertTrue(all(n == 0 for day, _, n in rebuilt if day == '2022-08-17'))
+        self.assertEqual(rebuilt, [(day, name, 0) for day, name, _ in incremental['TweetsPerAuthorDay'] if day == '2022-08-17'] +
+                         [row for row in incremental['TweetsPerAuthorDay'] if row[0] == '2022-08-18'])
+
+    def test_load_batch_is_atomic(self):
+        before = self.snapshot()
+        df, hashtags = make_batch(90, 10)
+        # TweetMentions is missing: the tweets and their rollups are rolled back together
+        mentions = hashtags.assign(tag='someone')
+        with self.assertRaises(sqlite3.OperationalError):
+            load_batch(self.conn, df, hashtags, mentions)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM TweetInformation').fetchone()[0], 90)
+        self.assertEqual(self.snapshot(), before)
+
+        self.assertEqual(load_batch(self.conn, df, hashtags), 10)
+        incremental = self.snapshot()
+        rebuild_rollups('tweets', conn=self.conn)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_csv_batch(self):
+        # a batch read back from the extracted csv: text timestamps and entity lists
+        df, hashtags = make_batch(90, 10)
+        df = df.assign(created_at=df['created_at'].astype(str),
+                       hashtags=[str([{'text': 'Inflation', 'indices': [0, 10]}, {'text': f'Tag{i % 2}'}])
+                                 for i in range(90, 100)])
+        exploded = explode_entity_column(df, 'hashtags', 'text')
+        self.assertEqual(exploded.values.tolist(), hashtags.values.tolist())
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            rows = rollup_rows(df, exploded)
+        self.assertEqual(sum(row[2] for row in rows['HashtagsPerDay']), 20)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import io
+import tempfile
+import sys, os
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor
+from sentiment_cache import SentimentCache, open_cache, cache_key, backend_version
+
+
+def score_lengths(texts):
+    return [len(x) / 100 for x in texts], [0.5] * len(texts)
+
+
+def write_scores(path, start):
+    cache = open_cache(path)
+    texts = [f"text {i}" for i in range(start, start + 200)]
+    return cache.score(texts, 'test-1', score_lengths)[0]
+
+
+class TestSentimentCache(unittest.TestCase):
+    """
+		A class for unit-testing the persistent sentiment score cache.
+	"""
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'sentiment.sqlite')
+        self.calls = []
+
+    def scorer(self, texts):
+        self.calls.append(list(texts))
+        return score_lengths(texts)
+
+    def test_hits_and_misses(self):
+        cache = SentimentCache(self.path)
+        polarity, subjectivity = cache.score(['a b', 'a  b', 'cde', 'a b'], 'test-1', self.scorer)
+        self.assertEqual(self.calls, [['a b', 'cde']])
+        self.assertEqual(polarity, [0.03, 0.03, 0.03, 0.03])
+        self.assertEqual(subjectivity, [0.5] * 4)
+
+        cache.close()
+        cache = SentimentCache(self.path)
+        cache.score(['cde', 'xy'], 'test-1', self.scorer)
+        self.assertEqual(self.calls[1:], [['xy']])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_versions(self):
+        self.assertNotEqual(cache_key('good', 'lexicon-1'), cache_key('good', 'lexicon-2'))
+        self.assertNotEqual(backend_version('lexicon'), backend_version('textblob'))
+        cache = SentimentCache(self.path)
+        cache.score(['good'], 'v1', self.scorer)
+        cache.score(['good'], 'v2', self.scorer)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(cache.stats()['versions'], {'v1': 1, 'v2': 1})
+
+    def test_eviction(self):
+        cache = SentimentCache(self.path, max_entries=50)
+        cache.score([f"old {i}" for i in range(40)], 'v1', self.scorer)
+        cache._conn.execute("UPDATE sentiment SET used = used - 10")
+        cache.score([f"new {i}" for i in range(30)], 'v1', self.scorer)
+        self.assertEqual(len(cache), 50)
+        cache.score([f"new {i}" for i in range(30)], 'v1', self.scorer)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_running_count(self):
+        cache = SentimentCache(self.path, max_entries=50)
+        cache.score([f"a {i}" for i in range(20)], 'v1', self.scorer)
+        # rows added by another process are picked up once the running count exceeds the bound
+        other = SentimentCache(self.path, max_entries=50)
+        other.score([f"b {i}" for i in range(25)], 'v1', self.scorer)
+        cache.score(['a 0', 'c 0'], 'v1', self.scorer)
+        self.assertEqual(cache._count, 21)
+        cache.score([f"c {i}" for i in range(1, 31)], 'v1', self.scorer)
+        self.assertEqual(cache._count, 50)
+        self.assertEqual(len(cache), 50)
+        other.close()
+
+    def test_processes(self):
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(write_scores, [self.path] * 8, [0, 100, 200, 300] * 2))
+        self.assertEqual(results[0], results[4])
+        self.assertEqual(len(SentimentCache(self.path)), 500)
+
+    def test_extractor(self):
+        tweets = [{'text': 'a very good day'}, {'text': 'RT @x: a very good day'}, {'text': 'bad'}]
+        plain = TweetDfExtractor(tweets).get_tweet_df(columns=['polarity', 'subjectivity'])
+        cache = SentimentCache(self.path)
+        for _ in range(2):
+            cached = TweetDfExtractor(tweets, sentiment_cache=cache).get_tweet_df(columns=['polarity', 'subjectivity'])
+            self.assertTrue(cached.equals(plain))
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+
+        out = io.StringIO()
+        self.assertEqual(cache.export(out), 2)
+        self.assertTrue(out.getvalue().startswith('key,version,polarity'))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import glob
+import sqlite3
+import tempfile
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+import pandas as pd
+
+from extract_dataframe import read_json
+from synthetic_tweets import SyntheticTweets
+from sharded_reader import (build_line_index, load_line_index, split_ranges, chunk_ranges, read_range,
+                            iter_parallel, parallel_read, read_lines, sample)
+from database_manager import TWEET_COLUMNS, ROLLUPS
+from pipeline_runner import PipelineRunner
+from batch_ingest import ingest
+
+
+def count_tweets(tweets):
+    return len(tweets)
+
+
+class TestShardedReader(unittest.TestCase):
+    """
+		A class for unit-testing the line-offset index and the
+		byte-range sharded reader.
+	"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.json_file = SyntheticTweets(seed=3).write_jsonl(os.path.join(self.dir, 'tweets.json'), 300)
+        _, self.tweets = read_json(self.json_file)
+
+    def test_index(self):
+        offsets = build_line_index(self.json_file)
+        self.assertEqual(len(offsets), 301)
+        self.assertEqual(offsets[-1], os.path.getsize(self.json_file))
+        self.assertTrue(os.path.exists(self.json_file + '.idx.npz'))
+        self.assertEqual(load_line_index(self.json_file).tolist(), offsets.tolist())
+
+    def test_ranges_cover_file(self):
+        offsets = build_line_index(self.json_file, save=False)
+        ranges = split_ranges(offsets, 7)
+        self.assertEqual(len(ranges), 7)
+        tweets = [t for start, end in ranges for t in read_range(self.json_file, start, end)]
+        self.assertEqual(tweets, self.tweets)
+
+    def test_parallel_read(self):
+        self.assertEqual(sum(parallel_read(self.json_file, workers=3, func=count_tweets)), 300)
+
+    def test_iter_parallel(self):
+        offsets = load_line_index(self.json_file)
+        self.assertEqual(len(chunk_ranges(offsets, 50)), 6)
+        chunks = list(iter_parallel(self.json_file, workers=2, chunk_size=50))
+        self.assertEqual(len(chunks), 6)
+        self.assertEqual([t for chunk in chunks for t in chunk], self.tweets)
+
+    def _pipeline_rows(self, shards: int) -> list:
+        db_file = os.path.join(self.dir, f'tweets-{shards}.db')
+        conn = sqlite3.connect(db_file)
+        conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        conn.execute('CREATE TABLE TweetMentions (tweet_id, screen_name, position)')
+        for table, (keys, counters) in ROLLUPS.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+        conn.commit()
+        PipelineRunner(self.json_file, lambda: sqlite3.connect(db_file, check_same_thread=False), chunk_size=40,
+                       filters=None, sentiment_backend='lexicon', shards=shards).run()
+        rows = [sorted(conn.execute(f'SELECT * FROM {table}').fetchall(), key=repr)
+                for table in ['TweetInformation', 'TweetHashtags', 'TweetMentions']]
+        conn.close()
+        return rows
+
+    def test_pipeline_shards(self):
+        # the extract processes read the byte ranges themselves and load the same rows
+        serial, sharded = self._pipeline_rows(0), self._pipeline_rows(3)
+        self.assertEqual(len(serial[0]), 300)
+        self.assertEqual(sharded, serial)
+
+    def test_ingest_shards(self):
+        tables = []
+        for shards in (0, 3):
+            out = os.path.join(self.dir, f'processed-{shards}')
+            results = ingest(self.json_file, out, processes=1, chunk_size=40, sentiment_backend='lexicon',
+                             shards=shards)
+            self.assertEqual(results['tweets'].tolist(), [300])
+            frames = {}
+            for table in ['tweets', 'hashtags', 'mentions']:
+                frame = pd.concat(pd.read_csv(p) for p in glob.glob(os.path.join(out, table, '*', '*')))
+                frames[table] = frame.sort_values(list(frame.columns)).reset_index(drop=True)
+            tables.append(frames)
+        for table, frame in tables[0].items():
+            pd.testing.assert_frame_equal(tables[1][table], frame)
+
+    def test_random_access(self):
+        self.assertEqual(read_lines(self.json_file, [299, 5]), [self.tweets[299], self.tweets[5]])
+        sampled = sample(self.json_file, 10, seed=1)
+        self.assertEqual(len(sampled), 10)
+        self.assertTrue(all(t in self.tweets for t in sampled))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import tempfile
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+import numpy as np
+import pandas as pd
+
+from extract_dataframe import read_json, TweetDfExtractor
+from synthetic_tweets import SyntheticTweets
+from sketches import HyperLogLog, CountMinSketch, TDigest, TweetSketches, loads, sketch_file
+
+
+class TestSketches(unittest.TestCase):
+    """
+		A class for unit-testing the mergeable hyperloglog, count-min
+		and t-digest sketches and their error bounds.
+	"""
+
+    def test_hyperloglog(self):
+        a, b = HyperLogLog(12), HyperLogLog(12)
+        a.add_many(np.arange(0, 60000).astype(str))
+        b.add_many(np.arange(40000, 100000).astype(str))
+        merged = loads(a.to_bytes()).merge(b).summary()
+        self.assertLessEqual(merged['low'], 100000)
+        self.assertGreaterEqual(merged['high'], 100000)
+        small = HyperLogLog(12)
+        small.add_many(['a', 'b', 'a', 'c'])
+        self.assertEqual(small.summary()['estimate'], 3)
+        with self.assertRaises(ValueError):
+            a.merge(HyperLogLog(10))
+
+    def test_count_min(self):
+        values = np.random.default_rng(1).zipf(1.6, 50000)
+        values = values[values < 5000].astype(str)
+        exact = pd.Series(values).value_counts()
+        halves = [CountMinSketch(width=2 ** 12, capacity=20) for _ in range(2)]
+        for sketch, part in zip(halves, np.array_split(values, 2)):
+            for chunk in np.array_split(part, 5):
+                sketch.add_many(chunk)
+        merged = loads(halves[0].to_bytes()).merge(halves[1])
+        top = merged.heavy_hitters(5)
+        self.assertEqual(top['value'].tolist(), exact.index[:5].tolist())
+        true = exact[top['value']].to_numpy()
+        self.assertTrue((top['count'] >= true).all() and (top['low'] <= true).all())
+        self.assertTrue((top['count'] - true <= merged.error).all())
+
+    def test_tdigest(self):
+        values = np.random.default_rng(2).lognormal(3, 1.5, 40000)
+        parts = [TDigest() for _ in range(4)]
+        for sketch, part in zip(parts, np.array_split(values, 4)):
+            sketch.add_many(part)
+        merged = loads(parts[0].to_bytes())
+        for sketch in parts[1:]:
+            merged.merge(sketch)
+        self.assertEqual(merged.count, 40000)
+        result = merged.quantiles([0.01, 0.5, 0.99])
+        ranks = np.searchsorted(np.sort(values), result['value']) / len(values)
+        self.assertTrue((np.abs(ranks - result['q']) <= result['rank_error'] + 1e-3).all())
+        self.assertEqual(merged.quantile(0.0), values.min())
+        self.assertEqual(merged.quantile(1.0), values.max())
+
+    def test_tweet_sketches(self):
+        json_file = os.path.join(tempfile.mkdtemp(), 'tweets.json')
+        SyntheticTweets(seed=4, n_users=300).write_jsonl(json_file, 1200)
+        sketches = sketch_file(json_file, chunk_size=200, processes=2, sentiment_backend='lexicon')
+        report = TweetSketches.from_bytes(sketches.to_bytes()).report(k=3)
+
+        _, tweets = read_json(json_file)
+        extractor = TweetDfExtractor(tweets)
+        df = extractor.get_tweet_df(columns=['screen_name'])
+        self.assertEqual(report['tweets'], 1200)
+        users = report['distinct_users']
+        self.assertTrue(users['low'] <= df['screen_name'].nunique() <= users['high'])
+        self.assertEqual(report['top_authors']['value'].tolist()[0], df['screen_name'].value_counts().index[0])
+        tags = extractor.find_hashtag_rows()['tag']
+        self.assertEqual(report['top_hashtags']['count'].tolist()[0], tags.value_counts().iloc[0])
+        self.assertEqual(len(report['followers_quantiles']), 5)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor
+from synthetic_tweets import SyntheticTweets
+from benchmarks.run_benchmarks import run, compare
+
+
+class TestSyntheticTweets(unittest.TestCase):
+    """
+		A class for unit-testing the synthetic tweet generator
+		and the benchmark result comparison.
+	"""
+
+    def test_deterministic(self):
+        first = list(SyntheticTweets(seed=7).tweets(50))
+        second = list(SyntheticTweets(seed=7).tweets(50))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, list(SyntheticTweets(seed=8).tweets(50)))
+
+    def test_ratios(self):
+        tweets = list(SyntheticTweets(retweet_ratio=0.5, langs={'en': 0.5, 'de': 0.5}).tweets(2000))
+        retweets = sum('retweeted_status' in t for t in tweets)
+        english = sum(t['lang'] == 'en' for t in tweets)
+        self.assertAlmostEqual(retweets / 2000, 0.5, delta=0.05)
+        self.assertAlmostEqual(english / 2000, 0.5, delta=0.05)
+        self.assertTrue(all(t['text'].startswith('RT @') for t in tweets if 'retweeted_status' in t))
+
+    def test_extractable(self):
+        df = TweetDfExtractor(list(SyntheticTweets().tweets(20))).get_tweet_df()
+        self.assertEqual(len(df), 20)
+
+    def test_run_and_compare(self):
+        doc = run(n=100, repeat=1, only=['find_lang', 'load'])
+        self.assertEqual(sorted(doc['results']), ['extract.find_lang', 'load.sqlite'])
+
+        slower = {'results': {name: dict(res, seconds=res['seconds'] * 2) for name, res in doc['results'].items()}}
+        self.assertEqual(compare(doc, slower), [])
+        self.assertEqual(len(compare(slower, doc)), 2)
+
+
+if __name__ == '__main__':
+	unittest.main()
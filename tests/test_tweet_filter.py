@@ -0,0 +1,42 @@
+import unittest
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor, TweetFilter
+
+tweet_list = [
+    {'id': 1, 'lang': 'en', 'created_at': 'Fri Apr 22 22:20:18 +0000 2022', 'user': {'followers_count': 10}},
+    {'id': 2, 'lang': 'de', 'created_at': 'Fri Apr 22 22:20:18 +0000 2022', 'user': {'followers_count': 10}},
+    {'id': 3, 'lang': 'en', 'created_at': 'Wed Dec 30 10:00:00 +0000 2020', 'user': {'followers_count': 10}},
+    {'id': 4, 'lang': 'en', 'created_at': 'Thu Dec 31 00:00:00 +0000 2020', 'possibly_sensitive': True,
+     'user': {'followers_count': 500}},
+]
+
+
+class TestTweetFilter(unittest.TestCase):
+    """
+		A class for unit-testing the predicates pushed down into TweetDfExtractor.
+	"""
+
+    def ids(self, **kwargs):
+        return TweetDfExtractor(tweet_list, TweetFilter(**kwargs)).find_tweet_id()
+
+    def test_langs(self):
+        self.assertEqual(self.ids(langs=['en']), [1, 3, 4])
+
+    def test_date_range(self):
+        self.assertEqual(self.ids(start='2020-12-31'), [1, 2, 4])
+        self.assertEqual(self.ids(start='2020-12-31', end='2021-01-01'), [4])
+
+    def test_sensitive_and_followers(self):
+        self.assertEqual(self.ids(sensitive=False), [1, 2, 3])
+        self.assertEqual(self.ids(min_followers=100), [4])
+
+    def test_callables(self):
+        extractor = TweetDfExtractor(tweet_list, [TweetFilter(langs=['en']), lambda x: x['id'] > 3])
+        self.assertEqual(extractor.find_tweet_id(), [4])
+
+
+if __name__ == '__main__':
+	unittest.main()
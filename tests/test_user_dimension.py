@@ -0,0 +1,138 @@
+import unittest
+import json
+import sqlite3
+import tempfile
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join('../..')))
+
+from extract_dataframe import TweetDfExtractor, USER_COLUMNS, TWEET_FACT_COLUMNS
+from database_manager import TWEET_COLUMNS, ROLLUPS, insert_user_batch, distinct_values, count_estimate
+from pipeline_runner import PipelineRunner
+from async_loader import SqlitePool
+
+
+def make_tweet(i, user_id, followers, minute):
+    return {'id': i, 'created_at': f'Fri Apr 22 22:{minute:02d}:18 +0000 2022',
+            'source': '<a href="http://twitter.com/download/android" rel="nofollow">Twitter for Android</a>',
+            'text': f'tweet number {i} is great #Inflation', 'lang': 'en', 'retweet_count': 0,
+            'entities': {'hashtags': [{'text': 'Inflation', 'indices': [0, 10]}], 'user_mentions': []},
+            'user': {'id': user_id, 'screen_name': f'user{user_id}', 'friends_count': 1, 'statuses_count': 2,
+                     'followers_count': followers, 'favourites_count': 4, 'location': 'Nairobi'}}
+
+
+def make_tweets(n):
+    # three users whose follower count grows with every tweet, written out of time order
+    return [make_tweet(i, i % 3, followers=100 + i, minute=(i * 7) % 60) for i in range(n)]
+
+
+def latest_followers(tweets):
+    # followers_count of each user's latest tweet, all tweets are of the same hour
+    latest = {}
+    for tweet in sorted(tweets, key=lambda x: x['created_at']):
+        latest[tweet['user']['id']] = tweet['user']['followers_count']
+    return latest
+
+
+def users_table(conn):
+    conn.execute(f"CREATE TABLE Users ({', '.join(USER_COLUMNS)}, PRIMARY KEY (user_id))")
+
+
+class TestUserDimension(unittest.TestCase):
+    """
+		A class for unit-testing the user dimension extracted
+		from the tweets and its upsert into a sqlite stand-in database.
+	"""
+
+    def setUp(self):
+        self.tweets = make_tweets(20)
+
+    def test_user_df(self):
+        users = TweetDfExtractor(self.tweets).get_user_df()
+        self.assertEqual(list(users.columns), USER_COLUMNS)
+        self.assertEqual(users['user_id'].tolist(), [0, 1, 2])
+        self.assertEqual(dict(zip(users['user_id'], users['followers_count'])), latest_followers(self.tweets))
+        self.assertTrue(users['updated_at'].str.match(r'2022-04-22 22:\d\d:18').all())
+
+    def test_fact_columns(self):
+        extractor = TweetDfExtractor(self.tweets)
+        df = extractor.get_tweet_df(columns=TWEET_FACT_COLUMNS)
+        self.assertEqual(len(df), 20)
+        self.assertNotIn('followers_count', df.columns)
+        self.assertEqual(df['user_id'].tolist(), [i % 3 for i in range(20)])
+        self.assertTrue(set(TWEET_FACT_COLUMNS) <= set(TWEET_COLUMNS))
+
+    def test_upsert_keeps_latest_snapshot(self):
+        conn = sqlite3.connect(':memory:')
+        users_table(conn)
+        # the newer half first: the older snapshots must not overwrite it
+        newer = [x for x in self.tweets if x['created_at'] >= 'Fri Apr 22 22:30']
+        older = [x for x in self.tweets if x['created_at'] < 'Fri Apr 22 22:30']
+        insert_user_batch(conn, TweetDfExtractor(newer).get_user_df())
+        insert_user_batch(conn, TweetDfExtractor(older).get_user_df())
+        stored = dict(conn.execute('SELECT user_id, followers_count FROM Users').fetchall())
+        self.assertEqual(stored, latest_followers(self.tweets))
+        conn.close()
+
+
+class TestUserDimensionPipeline(unittest.TestCase):
+    """
+		A class for unit-testing the pipeline runner loading
+		slim tweet rows and the Users table into a sqlite stand-in database.
+	"""
+
+    def setUp(self):
+        fd, self.json_file = tempfile.mkstemp(suffix='.json')
+        self.tweets = make_tweets(30)
+        with os.fdopen(fd, 'w') as f:
+            for tweet in self.tweets:
+                f.write(json.dumps(tweet) + '\n')
+        fd, self.db_file = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_file)
+        conn.execute(f"CREATE TABLE TweetInformation ({', '.join(TWEET_COLUMNS)})")
+        users_table(conn)
+        conn.execute('CREATE TABLE TweetHashtags (tweet_id, hashtag, position)')
+        conn.execute('CREATE TABLE TweetMentions (tweet_id, screen_name, position)')
+        for table, (keys, counters) in ROLLUPS.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(keys + counters)}, PRIMARY KEY ({', '.join(keys)}))")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        os.remove(self.json_file)
+        os.remove(self.db_file)
+
+    def check_db(self):
+        conn = sqlite3.connect(self.db_file)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation').fetchone()[0], 30)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM TweetInformation '
+                                      'WHERE followers_count IS NOT NULL').fetchone()[0], 0)
+        # the dashboard's location filter still reads the fact rows
+        self.assertEqual(distinct_values('tweets', 'location', conn=conn), ['Nairobi'])
+        self.assertEqual(count_estimate('tweets', filters={'location': ['Nairobi']}, conn=conn), (30, True))
+        joined = conn.execute('SELECT COUNT(*) FROM TweetInformation t JOIN Users u '
+                              'ON t.user_id = u.user_id').fetchone()[0]
+        self.assertEqual(joined, 30)
+        stored = dict(conn.execute('SELECT user_id, followers_count FROM Users').fetchall())
+        self.assertEqual(stored, latest_followers(self.tweets))
+        conn.close()
+
+    def test_run(self):
+        runner = PipelineRunner(self.json_file, lambda: sqlite3.connect(self.db_file, check_same_thread=False),
+                                chunk_size=7, queue_size=1, user_dimension=True)
+        runner.run()
+        self.check_db()
+
+    def test_run_async(self):
+        async def pool():
+            return SqlitePool(self.db_file, size=2)
+
+        runner = PipelineRunner(self.json_file, chunk_size=7, queue_size=1, async_pool=pool, async_in_flight=2,
+                                user_dimension=True)
+        runner.run()
+        self.check_db()
+
+
+if __name__ == '__main__':
+	unittest.main()